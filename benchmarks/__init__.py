@@ -0,0 +1,3 @@
+"""
+Benchmarks for the MILDA Campaign Support Bot.
+"""
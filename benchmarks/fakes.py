@@ -0,0 +1,321 @@
+"""
+In-process stand-ins for Google Sheets, SMTP and the Telegram Bot API.
+
+Each fake counts its calls in a shared CallCounter and can add latency, so the
+benchmarks exercise the real bot code without any network access.
+"""
+import re
+import time
+import asyncio
+import random
+import threading
+from collections import Counter
+from types import SimpleNamespace
+import gspread
+
+HEADERS = ['ticket_id', 'timestamp', 'chat_id', 'category', 'description', 'identifiant', 'priority', 'status']
+
+class CallCounter:
+    """Thread-safe count of external calls, keyed like 'sheets.append_rows'."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def total(self, prefix):
+        with self._lock:
+            return sum(count for name, count in self._counts.items() if name.startswith(prefix))
+
+class _QuotaResponse:
+    """Enough of a requests.Response for gspread.exceptions.APIError."""
+    status_code = 429
+    text = 'Quota exceeded'
+
+    def json(self):
+        return {'error': {'code': 429, 'message': 'Quota exceeded for quota metric', 'status': 'RESOURCE_EXHAUSTED'}}
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+_RANGE = re.compile(r'^(?:[^!]+!)?([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$')
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+        self._worksheets = [worksheet]
+
+    def get_lastUpdateTime(self):
+        self._worksheet._call('drive.get_lastUpdateTime')
+        return self._worksheet.modified_time
+
+    def worksheets(self):
+        self._worksheet._call('sheets.worksheets')
+        return list(self._worksheets)
+
+    def add_worksheet(self, title, rows, cols, **kwargs):
+        self._worksheet._call('sheets.add_worksheet')
+        worksheet = FakeWorksheet(counter=self._worksheet.counter, title=title, headers=None)
+        worksheet.id = len(self._worksheets)
+        worksheet.spreadsheet = self
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def batch_update(self, body):
+        """Structural updates; only deleteDimension on rows is supported."""
+        self._worksheet._call('sheets.spreadsheet_batch_update')
+        by_id = {worksheet.id: worksheet for worksheet in self._worksheets}
+        for request in body['requests']:
+            target = request['deleteDimension']['range']
+            worksheet = by_id[target['sheetId']]
+            with worksheet._lock:
+                del worksheet._rows[target['startIndex']:target['endIndex']]
+                worksheet._touch()
+        return {}
+
+class FakeWorksheet:
+    """The subset of gspread.Worksheet the bot uses, backed by a list of rows.
+
+    `latency` seconds are slept per call (blocking, like the real client) and
+    `quota_error_rate` is the fraction of calls failing with a 429 APIError.
+    """
+
+    def __init__(self, rows=None, latency=0.0, quota_error_rate=0.0, counter=None, seed=None, title='Sheet1',
+                 headers=HEADERS):
+        self.id = 0
+        self.title = title
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.counter = counter or CallCounter()
+        self.spreadsheet = FakeSpreadsheet(self)
+        self.modified_time = '2024-10-17T00:00:00.000Z'
+        self._rows = ([list(headers)] if headers else []) + [list(row) for row in rows or []]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._revision = 0
+
+    def _call(self, name):
+        self.counter.add(name)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self.quota_error_rate and self._random.random() < self.quota_error_rate
+        if failed:
+            self.counter.add('sheets.quota_errors')
+            raise gspread.exceptions.APIError(_QuotaResponse())
+
+    def _touch(self):
+        self._revision += 1
+        self.modified_time = f'2024-10-17T00:00:00.{self._revision:06d}Z'
+
+    def _cells(self, a1):
+        match = _RANGE.match(a1)
+        if not match:
+            raise ValueError(f'Unsupported range {a1}')
+        first_col, first_row, last_col, last_row = match.groups()
+        if not first_col:
+            # Whole rows, e.g. '1:1'
+            first_col, last_col = 'A', None
+        else:
+            last_col = last_col or first_col
+        first_col = _column_number(first_col)
+        last_col = _column_number(last_col) if last_col else None
+        first_row = int(first_row) if first_row else 1
+        last_row = int(last_row) if last_row else (first_row if match.group(3) is None else len(self._rows))
+        values = []
+        for row in self._rows[first_row - 1:last_row]:
+            values.append(row[first_col - 1:last_col])
+        # Sheets drops trailing empty rows
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+    def _set(self, row, column, value):
+        while len(self._rows) < row:
+            self._rows.append([])
+        cells = self._rows[row - 1]
+        if len(cells) < column:
+            cells.extend([''] * (column - len(cells)))
+        cells[column - 1] = value
+
+    # gspread API
+
+    def get_all_values(self, **kwargs):
+        self._call('sheets.get_all_values')
+        with self._lock:
+            return [list(row) for row in self._rows]
+
+    def batch_get(self, ranges, **kwargs):
+        self._call('sheets.batch_get')
+        with self._lock:
+            return [self._cells(a1) for a1 in ranges]
+
+    def row_values(self, row, **kwargs):
+        self._call('sheets.row_values')
+        with self._lock:
+            return list(self._rows[row - 1]) if row <= len(self._rows) else []
+
+    def append_rows(self, values, **kwargs):
+        self._call('sheets.append_rows')
+        with self._lock:
+            first = len(self._rows) + 1
+            self._rows.extend(list(row) for row in values)
+            self._touch()
+            last = len(self._rows)
+        last_letter = chr(64 + max(len(row) for row in values))
+        return {'updates': {'updatedRange': f'{self.title}!A{first}:{last_letter}{last}', 'updatedRows': len(values)}}
+
+    def update_cell(self, row, col, value):
+        self._call('sheets.update_cell')
+        with self._lock:
+            self._set(row, col, value)
+            self._touch()
+
+    def batch_update(self, data, **kwargs):
+        self._call('sheets.batch_update')
+        with self._lock:
+            for update in data:
+                match = _RANGE.match(update['range'])
+                row, column = int(match.group(2)), _column_number(match.group(1))
+                for row_offset, values in enumerate(update['values']):
+                    for column_offset, value in enumerate(values):
+                        self._set(row + row_offset, column + column_offset, value)
+            self._touch()
+
+    # Admin side, not counted as bot API calls
+
+    def set_status(self, ticket_ids, status):
+        """Change the status of tickets the way an admin editing the sheet would."""
+        wanted = set(ticket_ids)
+        column = HEADERS.index('status') + 1
+        with self._lock:
+            for number, row in enumerate(self._rows[1:], start=2):
+                if row and row[0] in wanted:
+                    self._set(number, column, status)
+            self._touch()
+
+    def statuses(self):
+        column = HEADERS.index('status')
+        with self._lock:
+            return {row[0]: row[column] for row in self._rows[1:] if row and len(row) > column}
+
+    def __len__(self):
+        return len(self._rows) - 1
+
+class SMTPSink:
+    """Drop-in for SMTPConnection that keeps messages in memory."""
+
+    def __init__(self, latency=0.0, counter=None):
+        self.latency = latency
+        self.counter = counter or CallCounter()
+        self.connects = 1
+        self.sent = 0
+        self.messages = []
+
+    def send(self, msg):
+        self.counter.add('smtp.send')
+        if self.latency:
+            time.sleep(self.latency)
+        self.messages.append(msg)
+        self.sent += 1
+
+    def close(self):
+        pass
+
+class FakeBot:
+    """The Telegram Bot methods the bot calls, recording every message per chat."""
+
+    def __init__(self, latency=0.0, counter=None, bot_id=4242):
+        self.id = bot_id
+        self.latency = latency
+        self.counter = counter or CallCounter()
+        self.messages = {}  # chat_id -> texts sent
+        self._file_ids = 0
+
+    async def _call(self, name):
+        self.counter.add(f'telegram.{name}')
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _record(self, chat_id, text):
+        self.messages.setdefault(str(chat_id), []).append(text)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._call('sendMessage')
+        self._record(chat_id, text)
+        return SimpleNamespace(chat_id=chat_id, text=text)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        await self._call('sendPhoto')
+        self._file_ids += 1
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f'fake-file-{self._file_ids}')])
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        await self._call('sendMediaGroup')
+        messages = []
+        for item in media:
+            self._file_ids += 1
+            messages.append(SimpleNamespace(photo=[SimpleNamespace(file_id=f'fake-file-{self._file_ids}')]))
+        return messages
+
+    async def edit_message_text(self, chat_id, text, **kwargs):
+        await self._call('editMessageText')
+        self._record(chat_id, text)
+
+    async def answer_callback_query(self, callback_query_id, **kwargs):
+        await self._call('answerCallbackQuery')
+
+class FakeMessage:
+    def __init__(self, bot, chat_id, text=None, username=None):
+        self._bot = bot
+        self.chat_id = chat_id
+        self.text = text
+        self.from_user = SimpleNamespace(id=chat_id, username=username)
+        self.chat = SimpleNamespace(id=chat_id)
+
+    async def reply_text(self, text, **kwargs):
+        return await self._bot.send_message(self.chat_id, text, **kwargs)
+
+    async def edit_text(self, text, **kwargs):
+        return await self._bot.edit_message_text(self.chat_id, text, **kwargs)
+
+class FakeCallbackQuery:
+    def __init__(self, bot, chat_id, data):
+        self._bot = bot
+        self.id = f'{chat_id}:{data}'
+        self.data = data
+        self.message = FakeMessage(bot, chat_id)
+
+    async def answer(self, *args, **kwargs):
+        return await self._bot.answer_callback_query(self.id)
+
+class FakeUpdate:
+    """A text message or a callback query from one chat."""
+
+    def __init__(self, bot, chat_id, text=None, callback_data=None, username=None):
+        self.effective_chat = SimpleNamespace(id=chat_id)
+        self.effective_user = SimpleNamespace(id=chat_id, username=username)  # Private chats share the user's ID
+        if callback_data is not None:
+            self.message = None
+            self.callback_query = FakeCallbackQuery(bot, chat_id, callback_data)
+            self.effective_message = self.callback_query.message
+        else:
+            self.message = FakeMessage(bot, chat_id, text, username)
+            self.callback_query = None
+            self.effective_message = self.message
+
+class FakeContext:
+    def __init__(self, bot, args=None):
+        self.bot = bot
+        self.args = args or []
+        self.error = None
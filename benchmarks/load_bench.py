@@ -0,0 +1,242 @@
+"""
+Load benchmark: simulated users run the whole ticket flow against in-process fakes.
+
+Every user goes through /start → category → description → identifiant →
+priority → confirm and then /status. A share of the tickets is then marked
+resolved in the fake sheet, the resolved-ticket sweep notifies their chats and
+each of them answers the resolution callback. Google Sheets, SMTP and Telegram
+are replaced by the fakes in benchmarks/fakes.py, nothing leaves the process.
+
+Run with: python -m benchmarks.load_bench --users 500 --concurrency 50
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from collections import defaultdict
+
+CATEGORY_TEXTS = [
+    "Problèmes d'Utilisateur & d'Accès",
+    'Problèmes de Collecte & Soumission de Données',
+    'Problèmes de Synchronisation & Connectivité',
+    "Problèmes de Performance d'Appareil & d'Application",
+    'Problèmes de Rapports & Tableaux de Bord',
+]
+
+DESCRIPTION = "Impossible de synchroniser depuis ce matin (erreur 503) - l'application reste bloquée à 80%!"
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=200, help='simulated users, one ticket each')
+    parser.add_argument('--concurrency', type=int, default=50, help='users active at the same time')
+    parser.add_argument('--think-time', type=float, default=0.0, help='seconds a user waits between messages')
+    parser.add_argument('--sheets-latency', type=float, default=0.15, help='seconds per Sheets call')
+    parser.add_argument('--quota-error-rate', type=float, default=0.0, help='fraction of Sheets calls failing with 429')
+    parser.add_argument('--sheets-rpm', type=int, default=6000,
+                        help='rate limiter budget per minute (the bot default is 50)')
+    parser.add_argument('--smtp-latency', type=float, default=0.2, help='seconds per SMTP send')
+    parser.add_argument('--telegram-latency', type=float, default=0.03, help='seconds per Telegram call')
+    parser.add_argument('--existing-tickets', type=int, default=1000, help='rows already in the sheet')
+    parser.add_argument('--resolve-fraction', type=float, default=0.5, help='share of new tickets resolved by admins')
+    parser.add_argument('--verbose', action='store_true', help='show the bot logs')
+    return parser.parse_args(argv)
+
+class LoadBenchmark:
+    def __init__(self, options):
+        # Imported here so the environment set up in main() is in place first
+        from benchmarks.fakes import CallCounter, FakeWorksheet, SMTPSink, FakeBot, FakeContext
+        from src.utils import sheets
+        from src.utils.email import email_dispatcher
+        from src.utils.leader import get_leader
+
+        self.options = options
+        self.counter = CallCounter()
+        existing = [
+            [f'T240901-{number:04d}', '2024-09-01 08:00:00', str(900000 + number), CATEGORY_TEXTS[number % 5],
+             DESCRIPTION, f'agent_{number}', 'Moyen', 'Résolu Confirmé']
+            for number in range(options.existing_tickets)
+        ]
+        self.worksheet = FakeWorksheet(
+            existing, latency=options.sheets_latency, quota_error_rate=options.quota_error_rate,
+            counter=self.counter, seed=1
+        )
+        self.smtp = SMTPSink(latency=options.smtp_latency, counter=self.counter)
+        self.bot = FakeBot(latency=options.telegram_latency, counter=self.counter)
+        self.context = FakeContext(self.bot)
+
+        # Point the shared clients at the fakes
+        sheets.get_session()._worksheet = self.worksheet
+        sheets.rate_limiter = sheets.TokenBucket(options.sheets_rpm)
+        email_dispatcher.connection = self.smtp
+        # The periodic jobs only run in the process holding the leader lease
+        get_leader().renew()
+
+        self.latencies = defaultdict(list)
+        self.ticket_ids = {}  # chat_id -> ticket_id
+        self.errors = 0
+
+    async def timed(self, name, handler, *args):
+        start = time.perf_counter()
+        try:
+            return await handler(*args)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+    async def user(self, number, bot_handlers, slots):
+        from benchmarks.fakes import FakeUpdate
+        from src.bot import check_status
+
+        chat_id = 100000 + number
+        steps = [
+            ('start', bot_handlers.start, '/start'),
+            ('category', bot_handlers.category, CATEGORY_TEXTS[number % len(CATEGORY_TEXTS)]),
+            ('description', bot_handlers.description, f'{DESCRIPTION} #{number}'),
+            ('identifiant', bot_handlers.identifiant, f'agent_{chat_id}'),
+            ('priority', bot_handlers.priority, 'Urgent' if number % 10 == 0 else 'Moyen'),
+            ('confirm', bot_handlers.confirm, 'oui'),
+        ]
+        async with slots:
+            for name, handler, text in steps:
+                update = FakeUpdate(self.bot, chat_id, text, username=f'user{number}')
+                await self.timed(name, handler, update, self.context)
+                if self.options.think_time:
+                    await asyncio.sleep(self.options.think_time)
+
+            ticket_id = self._created_ticket(chat_id)
+            if ticket_id:
+                self.ticket_ids[chat_id] = ticket_id
+                update = FakeUpdate(self.bot, chat_id, f'/status {ticket_id}')
+                await self.timed('status', check_status, update, self.context)
+
+    def _created_ticket(self, chat_id):
+        for text in reversed(self.bot.messages.get(str(chat_id), [])):
+            match = re.search(r'/status (\S+)', text)
+            if match:
+                return match.group(1).replace('\\', '')
+        return None
+
+    async def drain(self, timeout=120):
+        """Wait for the outbox, email queue, notifier and Sheets executor to go idle."""
+        from src.utils.sheets import flush_outbox, sheets_executor
+        from src.utils.outbox import get_outbox
+        from src.utils.email import email_dispatcher
+        from src.utils.notifier import notifier
+
+        deadline = time.monotonic() + timeout
+        idle_checks = 0
+        while time.monotonic() < deadline and idle_checks < 3:
+            await flush_outbox()
+            busy = (
+                len(get_outbox()) or email_dispatcher.pending() or notifier.stats()['inflight']
+                or sheets_executor.queue_depth()
+            )
+            idle_checks = 0 if busy else idle_checks + 1
+            await asyncio.sleep(0.1)
+
+    async def run(self):
+        from benchmarks.fakes import FakeUpdate
+        from src.bot import TicketBot, check_resolved_tickets, handle_resolution_confirmation
+
+        options = self.options
+        bot_handlers = TicketBot()
+        slots = asyncio.Semaphore(options.concurrency)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(self.user(number, bot_handlers, slots) for number in range(options.users)))
+        conversations_elapsed = time.perf_counter() - start
+        await self.drain()
+        settled_elapsed = time.perf_counter() - start
+
+        # Admins resolve part of the new tickets, the sweep notifies their chats
+        resolved = dict(list(self.ticket_ids.items())[:int(len(self.ticket_ids) * options.resolve_fraction)])
+        self.worksheet.set_status(resolved.values(), 'Résolu')
+        sweep_start = time.perf_counter()
+        await self.timed('check_resolved_tickets', check_resolved_tickets, self.context)
+        await self.drain()
+        sweep_elapsed = time.perf_counter() - sweep_start
+
+        # Every notified user confirms the resolution
+        async def confirm(chat_id, ticket_id):
+            async with slots:
+                update = FakeUpdate(self.bot, chat_id, callback_data=f'resolved_yes_{ticket_id}')
+                await self.timed('resolution_callback', handle_resolution_confirmation, update, self.context)
+        await asyncio.gather(*(confirm(chat_id, ticket_id) for chat_id, ticket_id in resolved.items()))
+        await self.drain()
+
+        statuses = self.worksheet.statuses()
+        return {
+            'conversations_elapsed': conversations_elapsed,
+            'settled_elapsed': settled_elapsed,
+            'sweep_elapsed': sweep_elapsed,
+            'tickets': len(self.ticket_ids),
+            'stored': sum(1 for ticket_id in self.ticket_ids.values() if ticket_id in statuses),
+            'resolved': len(resolved),
+            'confirmed': sum(1 for ticket_id in resolved.values() if statuses.get(ticket_id) == 'Résolu Confirmé'),
+        }
+
+    def report(self, results):
+        from src.utils.sheets import rate_limiter, sheets_executor
+        from src.utils.email import email_dispatcher
+        from src.utils.notifier import notifier
+
+        options = self.options
+        tickets = max(results['tickets'], 1)
+        print(f"Users: {options.users}  concurrency: {options.concurrency}  "
+              f"existing rows: {options.existing_tickets}  sheets latency: {options.sheets_latency * 1000:.0f} ms  "
+              f"quota errors: {options.quota_error_rate:.0%}  rate limit: {options.sheets_rpm}/min")
+        print(f"Tickets created: {results['tickets']} (in sheet: {results['stored']}), "
+              f"resolved: {results['resolved']}, confirmed: {results['confirmed']}, handler errors: {self.errors}")
+        print(f"Conversations: {results['conversations_elapsed']:.2f} s "
+              f"({results['tickets'] / results['conversations_elapsed']:.1f} tickets/s), "
+              f"all writes settled after {results['settled_elapsed']:.2f} s")
+        print(f"Resolution sweep and notifications: {results['sweep_elapsed']:.2f} s")
+        print()
+        print(f"{'handler':<24}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, values in self.latencies.items():
+            print(f"{name:<24}{len(values):>7}"
+                  f"{percentile(values, 0.50) * 1000:>10.2f}{percentile(values, 0.95) * 1000:>10.2f}"
+                  f"{percentile(values, 0.99) * 1000:>10.2f}{max(values) * 1000:>10.2f}")
+        print()
+        print(f"{'external call':<32}{'total':>7}{'per ticket':>12}")
+        for name, count in sorted(self.counter.snapshot().items()):
+            print(f"{name:<32}{count:>7}{count / tickets:>12.3f}")
+        for prefix in ('sheets.', 'smtp.', 'telegram.'):
+            total = self.counter.total(prefix)
+            print(f"{prefix + '*':<32}{total:>7}{total / tickets:>12.3f}")
+        print()
+        print(f"Rate limiter: {rate_limiter.stats()}")
+        print(f"Sheets executor: {sheets_executor.stats()}")
+        print(f"Email: {email_dispatcher.stats()}")
+        print(f"Telegram notifier: {notifier.stats()}")
+
+def main(argv=None):
+    options = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO if options.verbose else logging.CRITICAL)
+
+    # Keep the benchmark's local state away from the real data/ directory
+    workdir = tempfile.mkdtemp(prefix='load_bench_')
+    os.environ['BOT_STATE_DB'] = os.path.join(workdir, 'bot_state.sqlite3')
+    os.environ.setdefault('EMAIL_DIGEST_WINDOW', '1')
+
+    benchmark = LoadBenchmark(options)
+    loop = asyncio.get_event_loop()
+    results = loop.run_until_complete(benchmark.run())
+    benchmark.report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Startup benchmark: import time of each bot module, measured in fresh interpreters.
+
+Also checks that importing the bot does not load clients that are only needed
+later (gspread on the first Sheets call, aiohttp in webhook mode) or never.
+
+Run with: python -m benchmarks.startup_bench
+Exit status is 1 when a module exceeds --budget-ms or a deferred client is loaded.
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+MODULES = [
+    'src.config',
+    'src.utils.render',
+    'src.utils.ticket_index',
+    'src.utils.sheets',
+    'src.utils.poller',
+    'src.utils.email',
+    'src.utils.notifier',
+    'src.utils.snapshot',
+    'src.bot',
+]
+
+# Loaded on first use, importing the bot must not pull them in
+DEFERRED = ['gspread', 'googleapiclient', 'google.oauth2.service_account', 'aiohttp']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _python(code, *flags):
+    return subprocess.run(
+        [sys.executable, '-W', 'ignore', *flags, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+def import_time(module):
+    """Cumulative import time of `module` in microseconds, from -X importtime."""
+    result = _python(f'import {module}', '-X', 'importtime')
+    pattern = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| ' + re.escape(module) + r'$')
+    for line in reversed(result.stderr.splitlines()):
+        match = pattern.match(line)
+        if match:
+            return int(match.group(1))
+    return 0
+
+def loaded_deferred(module):
+    code = f'import sys, {module}; print(" ".join(name for name in {DEFERRED!r} if name in sys.modules))'
+    return _python(code).stdout.split()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the import time of the bot modules.')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module, the fastest counts')
+    parser.add_argument('--budget-ms', type=float, default=None, help='fail when a module imports slower than this')
+    options = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    failed = False
+    print(f"{'module':<28}{'import ms':>10}")
+    for module in MODULES:
+        best = min(import_time(module) for _ in range(options.repeat)) / 1000
+        over = options.budget_ms is not None and best > options.budget_ms
+        failed = failed or over
+        print(f"{module:<28}{best:>10.1f}{'  over budget' if over else ''}")
+
+    loaded = loaded_deferred('src.bot')
+    if loaded:
+        failed = True
+        print(f"Importing src.bot loaded deferred modules: {', '.join(loaded)}")
+    else:
+        print(f"Importing src.bot loads none of: {', '.join(DEFERRED)}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -25,11 +25,11 @@ def setup_environment():
             sys.path.insert(0, str(project_root))
             logger.info(f"Added {project_root} to Python path")
 
-        # Log environment information
-        logger.info(f"Python path: {sys.path}")
+        # Log environment information, the full dumps only when debugging
         logger.info(f"Current working directory: {os.getcwd()}")
         logger.info(f"Project root: {project_root}")
-        logger.info(f"Environment variables: {sorted(os.environ.keys())}")
+        logger.debug(f"Python path: {sys.path}")
+        logger.debug(f"Environment variables: {sorted(os.environ.keys())}")
 
         # Map environment variables to handle different naming conventions
         env_vars = {
@@ -50,7 +50,7 @@ def setup_environment():
         for key, value in env_vars.items():
             if value:
                 os.environ[key] = value
-                logger.info(f"Set environment variable: {key}")
+                logger.debug(f"Set environment variable: {key}")
 
     except Exception as e:
         logger.error(f"Error setting up environment: {e}", exc_info=True)
@@ -61,64 +61,55 @@ def main():
     try:
         # Setup environment first
         setup_environment()
+
+        # With BOT_WORKERS > 1 this process only supervises the workers
+        from src.cluster import clustered, in_worker, run_workers
+        if clustered() and not in_worker():
+            run_workers(main)
+            return
         
         # Import dependencies after environment is set up
         from telegram import Update
-        from telegram.ext import (
-            Application, CommandHandler, MessageHandler, 
-            filters, ConversationHandler, CallbackQueryHandler
-        )
+        from telegram.ext import Application, CommandHandler, CallbackQueryHandler
         from src.bot import (
-            TicketBot, check_status, 
+            TicketBot, conversation_handler, persistence, check_status, 
             handle_resolution_confirmation, 
-            check_resolved_tickets
+            setup_jobs, shutdown, start_servers, status_intake, search_tickets, list_clusters
         )
-        from src.config import TELEGRAM_BOT_TOKEN
+        from src.config import TELEGRAM_BOT_TOKEN, BOT_MODE
 
         # Log successful imports
         logger.info("Successfully imported all required modules")
         
         # Create the Application
-        application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+        application = (
+            Application.builder().token(TELEGRAM_BOT_TOKEN).persistence(persistence())
+            .post_init(start_servers).post_shutdown(shutdown).build()
+        )
         logger.info("Created Telegram application")
 
         # Create an instance of the bot
         bot = TicketBot()
         logger.info("Created TicketBot instance")
 
-        # Create conversation handler
-        conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('start', bot.start)],
-            states={
-                0: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.category)],
-                1: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.description)],
-                2: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.priority)],
-                3: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.confirm)],
-            },
-            fallbacks=[],
-        )
-
-        # Add handlers
-        application.add_handler(conv_handler)
+        # Add handlers, with the same ticket conversation as src.bot.main
+        application.add_handler(conversation_handler(bot))
         application.add_handler(CommandHandler('status', check_status))
+        application.add_handler(CommandHandler('search', search_tickets))
+        application.add_handler(CommandHandler('clusters', list_clusters))
         application.add_handler(CallbackQueryHandler(handle_resolution_confirmation, pattern='^resolved_'))
         logger.info("Added all handlers")
 
-        # Add job for checking resolved tickets
-        try:
-            job_queue = application.job_queue
-            if job_queue:
-                job_queue.run_repeating(check_resolved_tickets, interval=3600)  # Check every hour
-                logger.info("Added job queue for checking resolved tickets")
-            else:
-                logger.warning("Job queue is not available. Periodic ticket checking will not work.")
-        except Exception as e:
-            logger.error(f"Error setting up job queue: {e}", exc_info=True)
-            logger.warning("Continuing without job queue functionality")
+        # Add the periodic jobs, the same as src.bot.main
+        setup_jobs(application)
 
         # Start the Bot
-        logger.info("Starting bot...")
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        logger.info(f"Starting bot in {BOT_MODE} mode...")
+        if BOT_MODE == 'webhook':
+            from src.webhook import run_webhook
+            run_webhook(application, intake=status_intake(application))
+        else:
+            application.run_polling(allowed_updates=Update.ALL_TYPES)
 
     except Exception as e:
         logger.error(f"Error starting bot: {e}", exc_info=True)
@@ -10,7 +10,6 @@ setup(
     },
     install_requires=[
         "python-telegram-bot>=20.7",
-        "google-api-python-client>=2.108.0",
         "google-auth-httplib2>=0.1.1",
         "google-auth-oauthlib>=1.1.0",
         "gspread>=5.12.0",
@@ -3,23 +3,192 @@ from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
     filters, ConversationHandler, ContextTypes, CallbackQueryHandler
 )
+import time
+import asyncio
 import datetime
-import os
+import functools
 from src.config import (
     TELEGRAM_BOT_TOKEN, ADMIN_EMAILS, 
-    CATEGORIES, PRIORITIES, GOOGLE_SHEET_ID
+    PRIORITIES, OUTBOX_FLUSH_INTERVAL, DRAFT_TTL,
+    BOT_MODE, SNAPSHOT_INTERVAL, LEADER_RENEW_INTERVAL, ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL,
+    INTAKE_TOKEN, INTAKE_SWEEP_INTERVAL, SWEEP_MAX_INTERVAL,
+    ADMIN_TELEGRAM_IDS, SEARCH_API_TOKEN, SEARCH_REFRESH_INTERVAL, SEARCH_ENABLED,
+    DUPLICATE_DETECTION, DUPLICATE_REFRESH_INTERVAL
 )
-from src.utils.sheets import store_ticket, get_credentials, get_resolved_tickets, update_ticket_status
-from src.utils.email import send_admin_email
-import gspread
+from src.utils.sheets import (
+    store_ticket, flush_outbox, open_worksheet, get_session, sheets_executor,
+    update_ticket_status, get_ticket, find_ticket_row,
+    StatusBatcher, rate_limiter, is_quota_error, status_column
+)
+from src.utils.poller import get_resolved_tickets, RESOLVED_STATUSES
+from src.utils.intake import StatusIntake, start_intake_server
+from src.utils.scheduler import AdaptiveSchedule
+from src.utils.ticket_index import ticket_index
+from src.utils.drafts import DraftStore, SQLitePersistence
+from src.utils.leader import get_leader, leader_only
+from src.cluster import clustered, in_worker, run_workers
+from src.utils.ticket_ids import get_allocator, normalize_ticket_id
+from src.utils.notifier import notifier, Notification
+from src.utils.render import escape_markdown
+from src.utils.assets import send_start_images
+from src.utils.email import send_admin_email, email_dispatcher
+from src.utils.metrics import instrument, start_metrics_server
+from src.utils import metrics
+from src.utils.snapshot import warm_start, save_snapshot
+from src.utils.archive import ticket_archiver
+from src.utils.search import search_index, refresh_search_index, add_search_routes
+from src.utils.duplicates import duplicate_index, refresh_duplicate_index, CLOSED_STATUSES
+from src.utils.ticket_links import get_ticket_links
+from src.utils.resolution_rounds import get_resolution_rounds
+from src.utils.outbox import get_outbox
+from src.utils.ticket_feed import follow_ticket_feed
 import logging
 
+logger = logging.getLogger(__name__)
+
 # States for conversation
 CATEGORY = 0
 DESCRIPTION = 1
 IDENTIFIANT = 2
 PRIORITY = 3
 CONFIRMATION = 4
+DUPLICATE = 5
+
+# Answers offered when a description looks like an open ticket
+FOLLOW_TICKET = 'Suivre ce ticket'
+NEW_TICKET = 'Créer un nouveau ticket'
+CLUSTERS_LISTED = 10  # Groups per /clusters answer
+CLUSTER_TICKETS_LISTED = 8
+
+# Bot messages: each builder returns the MarkdownV2 text and the plain text sent if Telegram rejects it
+
+def confirmation_message(category, description, identifiant, priority):
+    markdown = (
+        "Veuillez confirmer les détails de votre ticket:\n\n"
+        f"*Catégorie*: {escape_markdown(category)}\n"
+        f"*Description*: {escape_markdown(description)}\n"
+        f"*Identifiant*: {escape_markdown(identifiant)}\n"
+        f"*Priorité*: {escape_markdown(priority)}\n\n"
+        "Répondez 'oui' pour confirmer ou 'non' pour annuler\\."
+    )
+    plain = (
+        "Veuillez confirmer les détails de votre ticket:\n\n"
+        f"Catégorie: {category}\n"
+        f"Description: {description}\n"
+        f"Identifiant: {identifiant}\n"
+        f"Priorité: {priority}\n\n"
+        "Répondez 'oui' pour confirmer ou 'non' pour annuler."
+    )
+    return markdown, plain
+
+def ticket_created_message(ticket_id):
+    escaped_ticket_id = escape_markdown(ticket_id)
+    return (
+        "✅ *Ticket créé avec succès\\!*\n"
+        f"Votre numéro de ticket est: *{escaped_ticket_id}*\n\n"
+        f"Pour vérifier le statut: /status {escaped_ticket_id}\n"
+        "Pour soumettre un nouveau ticket: /start"
+    )
+
+def duplicate_message(ticket_id, category, status):
+    # The similar ticket is another reporter's, so its description is not shown
+    markdown = (
+        "🔁 *Un ticket similaire est déjà ouvert*\n\n"
+        f"🎫 *Numéro de Ticket*: {escape_markdown(ticket_id)}\n"
+        f"📝 *Catégorie*: {escape_markdown(category)}\n"
+        f"📊 *Statut*: {escape_markdown(status)}\n\n"
+        "Voulez\\-vous suivre ce ticket et être notifié de sa résolution, au lieu d'en créer un nouveau?"
+    )
+    plain = (
+        "🔁 Un ticket similaire est déjà ouvert\n\n"
+        f"🎫 Numéro de Ticket: {ticket_id}\n"
+        f"📝 Catégorie: {category}\n"
+        f"📊 Statut: {status}\n\n"
+        "Voulez-vous suivre ce ticket et être notifié de sa résolution, au lieu d'en créer un nouveau?"
+    )
+    return markdown, plain
+
+def ticket_linked_message(ticket_id):
+    escaped_ticket_id = escape_markdown(ticket_id)
+    return (
+        f"✅ *Vous suivez le ticket {escaped_ticket_id}*\n"
+        "Vous serez notifié dès qu'il sera résolu\\.\n\n"
+        f"Pour vérifier le statut: /status {escaped_ticket_id}\n"
+        "Pour soumettre un nouveau ticket: /start"
+    )
+
+def status_message(ticket_id, ticket):
+    category = ticket.get('category', 'N/A')
+    description = ticket.get('description', 'N/A')
+    identifiant = ticket.get('identifiant', 'N/A')
+    priority = ticket.get('priority', 'N/A')
+    status = ticket.get('status', 'N/A')
+    markdown = (
+        "📋 Détails du Ticket:\n\n"
+        f"🎫 *Numéro de Ticket*: {escape_markdown(ticket_id)}\n"
+        f"📝 *Catégorie*: {escape_markdown(category)}\n"
+        f"📄 *Description*: {escape_markdown(description)}\n"
+        f"📄 *Identifiant*: {escape_markdown(identifiant)}\n"
+        f"⚡ *Priorité*: {escape_markdown(priority)}\n"
+        f"📊 *Statut*: {escape_markdown(status)}"
+    )
+    plain = (
+        "📋 Détails du Ticket:\n\n"
+        f"🎫 Numéro de Ticket: {ticket_id}\n"
+        f"📝 Catégorie: {category}\n"
+        f"📄 Description: {description}\n"
+        f"📄 Identifiant: {identifiant}\n"
+        f"⚡ Priorité: {priority}\n"
+        f"📊 Statut: {status}"
+    )
+    return markdown, plain
+
+def resolution_message(ticket_id, ticket):
+    timestamp = ticket.get('timestamp', 'N/A')
+    category = ticket.get('category', 'N/A')
+    description = ticket.get('description', 'N/A')
+    identifiant = ticket.get('identifiant', 'N/A')
+    priority = ticket.get('priority', 'N/A')
+    markdown = (
+        "🎉 *Mise à jour de votre ticket\\!*\n\n"
+        f"Votre ticket *{escape_markdown(ticket_id)}* a été marqué comme résolu par notre équipe\\.\n\n"
+        "*Détails du ticket:*\n"
+        f"📅 *Date de création* : {escape_markdown(timestamp)}\n"
+        f"📝 *Catégorie* : {escape_markdown(category)}\n"
+        f"📄 *Description* : {escape_markdown(description)}\n"
+        f"📄 *Identifiant* : {escape_markdown(identifiant)}\n"
+        f"⚡ *Priorité* : {escape_markdown(priority)}\n\n"
+        "Est\\-ce que votre problème est effectivement résolu?"
+    )
+    plain = (
+        "🎉 Mise à jour de votre ticket!\n\n"
+        f"Votre ticket {ticket_id} a été marqué comme résolu par notre équipe.\n\n"
+        "Détails du ticket:\n"
+        f"📅 Date de création : {timestamp}\n"
+        f"📝 Catégorie : {category}\n"
+        f"📄 Description : {description}\n"
+        f"📄 Identifiant : {identifiant}\n"
+        f"⚡ Priorité : {priority}\n\n"
+        "Est-ce que votre problème est effectivement résolu?"
+    )
+    return markdown, plain
+
+def linked_resolution_message(ticket_id, ticket):
+    category = ticket.get('category', 'N/A')
+    description = ticket.get('description', 'N/A')
+    markdown = (
+        f"🎉 *Le ticket {escape_markdown(ticket_id)} que vous suivez a été résolu\\!*\n\n"
+        f"📝 *Catégorie* : {escape_markdown(category)}\n"
+        f"📄 *Description* : {escape_markdown(description)}\n\n"
+        "Si le problème persiste, soumettez un nouveau ticket avec /start"
+    )
+    plain = (
+        f"🎉 Le ticket {ticket_id} que vous suivez a été résolu!\n\n"
+        f"📝 Catégorie : {category}\n"
+        f"📄 Description : {description}\n\n"
+        "Si le problème persiste, soumettez un nouveau ticket avec /start"
+    )
+    return markdown, plain
 
 class TicketBot:
     # States for conversation
@@ -28,38 +197,32 @@ class TicketBot:
     IDENTIFIANT = 2
     PRIORITY = 3
     CONFIRMATION = 4
+    DUPLICATE = 5
 
-    def __init__(self):
-        self.current_ticket = {}
+    def __init__(self, drafts=None):
+        # One draft per chat so concurrent conversations never share data
+        self.drafts = drafts if drafts is not None else DraftStore()
         self.language = 'fr'  # Default language is French only
 
+    async def _expired(self, update: Update):
+        """Tell the user their draft expired and end the conversation."""
+        await update.message.reply_text(
+            "⌛ Votre session a expiré. Pour recommencer, utilisez /start",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        return ConversationHandler.END
+
+    @instrument()
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Commence le processus de création de ticket."""
         logger = logging.getLogger(__name__)
         logger.info("Start command received")
+        self.drafts.start(update.effective_chat.id)
 
-        # Send images first using absolute paths
-        assets_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets')
-        logger.info(f"Assets directory path: {assets_dir}")
-
+        # Send images first, as one media group reusing cached file_ids
         try:
-            pnlp_path = os.path.join(assets_dir, 'pnlp.png')
-            commcare_path = os.path.join(assets_dir, 'commcare.png')
-            
-            logger.info(f"Attempting to send PNLP image from: {pnlp_path}")
-            if os.path.exists(pnlp_path):
-                await context.bot.send_photo(chat_id=update.effective_chat.id, photo=open(pnlp_path, 'rb'))
-                logger.info("PNLP image sent successfully")
-            else:
-                logger.error(f"PNLP image not found at: {pnlp_path}")
-            
-            logger.info(f"Attempting to send CommCare image from: {commcare_path}")
-            if os.path.exists(commcare_path):
-                await context.bot.send_photo(chat_id=update.effective_chat.id, photo=open(commcare_path, 'rb'))
-                logger.info("CommCare image sent successfully")
-            else:
-                logger.error(f"CommCare image not found at: {commcare_path}")
-
+            await send_start_images(context.bot, update.effective_chat.id)
+            logger.info("Start images sent successfully")
         except Exception as e:
             logger.error(f"Error sending images: {e}", exc_info=True)
             # Continue with the welcome message even if images fail
@@ -89,13 +252,17 @@ class TicketBot:
 
         return CATEGORY
 
+    @instrument()
     async def category(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Stores the category and asks for description."""
-        self.current_ticket['category'] = update.message.text
+        draft = self.drafts.get(update.effective_chat.id)
+        if draft is None:
+            return await self._expired(update)
+        draft.category = update.message.text
         # Store both username and chat_id
-        self.current_ticket['user'] = update.message.from_user.username
-        self.current_ticket['chat_id'] = str(update.message.chat_id)
-        self.current_ticket['timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        draft.user = update.message.from_user.username
+        draft.chat_id = str(update.message.chat_id)
+        draft.timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         await update.message.reply_text(
             'Veuillez décrire votre problème en détail:',
@@ -103,19 +270,67 @@ class TicketBot:
         )
         return DESCRIPTION
 
-    async def description(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Stores the description and asks for identifiant."""
-        self.current_ticket['description'] = update.message.text
-        
+    async def _ask_identifiant(self, update: Update):
         await update.message.reply_text(
             'Veuillez mettre votre identifiant CommCare:',
             reply_markup=ReplyKeyboardRemove()  
         )
         return IDENTIFIANT
 
+    @instrument()
+    async def description(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Stores the description and asks for identifiant, or offers a similar open ticket."""
+        draft = self.drafts.get(update.effective_chat.id)
+        if draft is None:
+            return await self._expired(update)
+        draft.description = update.message.text
+        # In-memory lookup, no Sheets call
+        matches = duplicate_index.find(draft.category, draft.description, exclude_chat=draft.chat_id) if DUPLICATE_DETECTION else []
+        draft.similar_to = matches[0]['ticket_id'] if matches else None
+        if not matches:
+            return await self._ask_identifiant(update)
+
+        metrics.duplicate_offers.inc(outcome='offered')
+        similar_to = matches[0]['ticket_id']
+        markdown, plain = duplicate_message(
+            similar_to, draft.category, ticket_index.value(similar_to, 'status').strip() or 'Ouvert'
+        )
+        reply_markup = ReplyKeyboardMarkup([[FOLLOW_TICKET], [NEW_TICKET]], one_time_keyboard=True)
+        try:
+            await update.message.reply_text(markdown, parse_mode='MarkdownV2', reply_markup=reply_markup)
+        except Exception as e:
+            logger.error(f"Error sending duplicate offer: {e}", exc_info=True)
+            await update.message.reply_text(plain, reply_markup=reply_markup)
+        return DUPLICATE
+
+    @instrument()
+    async def duplicate(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Links the chat to the similar open ticket, or carries on with a new ticket."""
+        draft = self.drafts.get(update.effective_chat.id)
+        if draft is None:
+            return await self._expired(update)
+        if update.message.text.strip().lower() not in (FOLLOW_TICKET.lower(), 'oui', 'yes') or not draft.similar_to:
+            metrics.duplicate_offers.inc(outcome='declined')
+            return await self._ask_identifiant(update)
+
+        self.drafts.pop(update.effective_chat.id)
+        ticket_id = draft.similar_to
+        # No new row, admin email or resolution notification of its own: the chat follows the open ticket
+        await asyncio.get_event_loop().run_in_executor(None, get_ticket_links().add, ticket_id, draft.chat_id, draft.user)
+        metrics.duplicate_offers.inc(outcome='linked')
+        logger.info(f"Chat {draft.chat_id} now follows ticket {ticket_id} instead of filing a duplicate")
+        await update.message.reply_text(
+            ticket_linked_message(ticket_id), parse_mode='MarkdownV2', reply_markup=ReplyKeyboardRemove()
+        )
+        return ConversationHandler.END
+
+    @instrument()
     async def identifiant(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Stores the identifiant and asks for priority."""
-        self.current_ticket['identifiant'] = update.message.text
+        draft = self.drafts.get(update.effective_chat.id)
+        if draft is None:
+            return await self._expired(update)
+        draft.identifiant = update.message.text
         
         keyboard = [[p] for p in PRIORITIES]
         reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True)
@@ -126,56 +341,42 @@ class TicketBot:
         )
         return PRIORITY
 
+    @instrument()
     async def priority(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Stores the priority and shows confirmation."""
         logger = logging.getLogger(__name__)
-        self.current_ticket['priority'] = update.message.text
+        draft = self.drafts.get(update.effective_chat.id)
+        if draft is None:
+            return await self._expired(update)
+        draft.priority = update.message.text
         
+        markdown, plain = confirmation_message(draft.category, draft.description, draft.identifiant, draft.priority)
         try:
-            # Escape all special characters for MarkdownV2
-            category = self.current_ticket['category'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('-', '\\-').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-            description = self.current_ticket['description'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('-', '\\-').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-            identifiant = self.current_ticket['identifiant'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('-', '\\-').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-            priority = self.current_ticket['priority'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('-', '\\-').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-        
-            confirmation_text = (
-                "Veuillez confirmer les détails de votre ticket\\:\n\n"
-                f"*Catégorie*\\: {category}\n"
-                f"*Description*\\: {description}\n"
-                f"*Identifiant*\\: {identifiant}\n"
-                f"*Priorité*\\: {priority}\n\n"
-                "Répondez 'oui' pour confirmer ou 'non' pour annuler\\."
-            )
-            
-            await update.message.reply_text(confirmation_text, parse_mode='MarkdownV2')
+            await update.message.reply_text(markdown, parse_mode='MarkdownV2')
         except Exception as e:
             logger.error(f"Error sending confirmation message: {e}", exc_info=True)
             # Fallback to plain text if Markdown parsing fails
-            plain_text = (
-                "Veuillez confirmer les détails de votre ticket:\n\n"
-                f"Catégorie: {self.current_ticket['category']}\n"
-                f"Description: {self.current_ticket['description']}\n"
-                f"Identifiant: {self.current_ticket['identifiant']}\n"
-                f"Priorité: {self.current_ticket['priority']}\n\n"
-                "Répondez 'oui' pour confirmer ou 'non' pour annuler."
-            )
-            await update.message.reply_text(plain_text)
+            await update.message.reply_text(plain)
         
         return CONFIRMATION
 
+    @instrument()
     async def confirm(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handles the ticket confirmation and creation."""
         logger = logging.getLogger(__name__)
+        draft = self.drafts.pop(update.effective_chat.id)
+        if draft is None:
+            return await self._expired(update)
         
         if update.message.text.lower() in ['oui', 'yes']:
-            # Generate a shorter ticket ID (4 characters)
-            current_time = int(datetime.datetime.now().strftime('%H%M'))
-            ticket_id = f"T{current_time:03d}"  # This will create IDs like T001, T002, etc.
-            self.current_ticket['ticket_id'] = ticket_id
+            # Allocate a unique ticket ID locally, no Sheets read needed
+            ticket_id = await asyncio.get_event_loop().run_in_executor(None, get_allocator().allocate)
+            ticket = draft.as_ticket()
+            ticket['ticket_id'] = ticket_id
             
             try:
-                # Store ticket in Google Sheets
-                stored = await store_ticket(self.current_ticket)
+                # Commit the ticket to the local outbox, it reaches Google Sheets in the background
+                stored = await store_ticket(ticket)
                 if not stored:
                     await update.message.reply_text(
                         "❌ *Erreur lors de la création du ticket\\.*\nVeuillez réessayer plus tard\\.",
@@ -184,22 +385,12 @@ class TicketBot:
                     return ConversationHandler.END
                 
                 # Send email to admins
-                email_sent = await send_admin_email(ADMIN_EMAILS, self.current_ticket)
+                email_sent = await send_admin_email(ADMIN_EMAILS, ticket)
                 if not email_sent:
                     logger.warning(f"Failed to send email notification for ticket {ticket_id}")
                 
-                # Escape special characters for MarkdownV2
-                escaped_ticket_id = ticket_id.replace('-', '\\-')
-                
-                success_message = (
-                    "✅ *Ticket créé avec succès\\!*\n"
-                    f"Votre numéro de ticket est\\: *{escaped_ticket_id}*\n\n"
-                    f"Pour vérifier le statut\\: /status {escaped_ticket_id}\n"
-                    "Pour soumettre un nouveau ticket\\: /start"
-                )
-                
                 await update.message.reply_text(
-                    success_message,
+                    ticket_created_message(ticket_id),
                     parse_mode='MarkdownV2'
                 )
             except Exception as e:
@@ -215,10 +406,10 @@ class TicketBot:
                 parse_mode='MarkdownV2'
             )
         
-        self.current_ticket = {}
         return ConversationHandler.END
 
 # Add this function to check ticket status
+@instrument()
 async def check_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Check the status of a ticket."""
     # Extract ticket ID from either command args or message text
@@ -230,145 +421,336 @@ async def check_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if len(parts) < 2:
             await update.message.reply_text("Veuillez fournir votre numéro de ticket. Exemple: /status <numéro_ticket>")
             return
-        ticket_id = parts[1].strip('<>')  # Remove any < > brackets if present
+        ticket_id = normalize_ticket_id(parts[1].strip('<>'))  # Remove any < > brackets if present
     else:
         await update.message.reply_text("Veuillez fournir votre numéro de ticket. Exemple: /status <numéro_ticket>")
         return
     
-    # Authenticate with Google Sheets
     try:
-        credentials = get_credentials()
-        client = gspread.authorize(credentials)
-        
-        # Open the Google Sheet
-        sheet = client.open_by_key(GOOGLE_SHEET_ID).worksheet("Sheet1")
-        
-        # Find the ticket
-        cell = sheet.find(ticket_id)
-        if cell:
-            row = sheet.row_values(cell.row)
-            # Get column headers to find the correct indices
-            headers = sheet.row_values(1)
-            
-            # Create a dictionary mapping headers to values
-            ticket_data = dict(zip(headers, row))
-            
-            # Format the response message
-            response = (
-                f"📋 Détails du Ticket:\n\n"
-                f"🎫 *Numéro de Ticket*: {ticket_id}\n"
-                f"📝 *Catégorie*: {ticket_data.get('category', 'N/A')}\n"
-                f"📄 *Description*: {ticket_data.get('description', 'N/A')}\n"
-                f"📄 *Identifiant*: {ticket_data.get('identifiant', 'N/A')}\n"
-                f"⚡ *Priorité*: {ticket_data.get('priority', 'N/A')}\n"
-                f"📊 *Statut*: {ticket_data.get('status', 'N/A')}"
-            )
-            
-            await update.message.reply_text(response, parse_mode='Markdown')
+        # Answer from the ticket index, with at most one Sheets call
+        ticket_data = await get_ticket(ticket_id)
+        if ticket_data:
+            markdown, plain = status_message(ticket_id, ticket_data)
+            try:
+                await update.message.reply_text(markdown, parse_mode='MarkdownV2')
+            except Exception as e:
+                logger.error(f"Error sending status message: {e}", exc_info=True)
+                await update.message.reply_text(plain)
         else:
             await update.message.reply_text("❌ Numéro de ticket non trouvé.")
     
     except Exception as e:
         print(f"Error checking status: {str(e)}")
+        get_session().report_error(e)
         await update.message.reply_text("❌ Erreur lors de la vérification du statut du ticket. Veuillez réessayer plus tard.")
 
+def resolution_key(ticket_id, round_=0):
+    """Notification key of a ticket's resolution; each reopen starts a new round."""
+    return f"resolved:{ticket_id}#{round_}" if round_ else f"resolved:{ticket_id}"
+
+def resolution_notification(ticket, round_=0):
+    """Build the message asking a user to confirm that their ticket is resolved."""
+    chat_id = str(ticket.get('chat_id', '')).strip()
+    ticket_id = ticket.get('ticket_id', 'NO_ID')
+    keyboard = [
+        [
+            InlineKeyboardButton("OUI", callback_data=f"resolved_yes_{ticket_id}"),
+            InlineKeyboardButton("NON", callback_data=f"resolved_no_{ticket_id}")
+        ]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    markdown, plain = resolution_message(ticket_id, ticket)
+    return Notification(
+        resolution_key(ticket_id, round_), chat_id, markdown,
+        plain_text=plain,
+        reply_markup=reply_markup,
+        parse_mode='MarkdownV2',
+        tag=ticket_id
+    )
+
+async def record_awaiting(updates):
+    """Remember which tickets now show 'En Attente de Confirmation', see ResolutionRounds.reopen_resolved_again()."""
+    written = [ticket_id for ticket_id, updated in updates.items() if updated]
+    if written:
+        await asyncio.get_event_loop().run_in_executor(None, get_resolution_rounds().awaiting, written)
+
+def notify_resolved(bot, notifications, sheet):
+    """Queue resolution notifications and return how many were queued.
+
+    Tickets whose notification went out are then marked 'En Attente de Confirmation'.
+    """
+    async def mark_notified(results):
+        batcher = StatusBatcher()
+        for notification in notifications:
+            if results.get(notification.key):
+                batcher.add(notification.tag, 'En Attente de Confirmation')
+        updates = await batcher.commit(sheet)
+        for ticket_id, updated in updates.items():
+            if not updated:
+                logger.error(f"Failed to update the status of ticket {ticket_id}, retrying on the next check")
+        await record_awaiting(updates)
+        logger.info(f"Notified {len(batcher)} of {len(results)} resolved tickets, {sum(updates.values())} statuses updated")
+    
+    # Hand the whole batch to the dispatcher and return without waiting for the sends
+    return notifier.enqueue_batch(bot, notifications, on_done=mark_notified)
+
+async def notify_followers(bot, tickets, rounds=None):
+    """Tell the chats that followed resolved tickets instead of filing duplicates; return how many were queued.
+
+    `rounds` maps reopened tickets to their resolution round, see resolution_key().
+    """
+    rounds = rounds or {}
+    followers = await asyncio.get_event_loop().run_in_executor(
+        None, get_ticket_links().chats, [ticket.get('ticket_id') for ticket in tickets]
+    )
+    notifications = []
+    for ticket in tickets:
+        ticket_id = ticket.get('ticket_id')
+        if ticket_id not in followers:
+            continue
+        markdown, plain = linked_resolution_message(ticket_id, ticket)
+        notifications.extend(
+            Notification(
+                f"{resolution_key(ticket_id, rounds.get(ticket_id, 0))}:{chat_id}", chat_id, markdown,
+                plain_text=plain,
+                parse_mode='MarkdownV2',
+                tag=ticket_id
+            )
+            for chat_id in followers[ticket_id]
+        )
+    return notifier.enqueue_batch(bot, notifications) if notifications else 0
+
+def is_admin(update: Update):
+    return update.effective_user is not None and update.effective_user.id in ADMIN_TELEGRAM_IDS
+
+@instrument()
+async def search_tickets(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin-only: list the tickets whose description, identifiant or category match a query."""
+    if not is_admin(update):
+        await update.message.reply_text("❌ Cette commande est réservée aux administrateurs.")
+        return
+    query = ' '.join(context.args or []).strip()
+    if not query:
+        await update.message.reply_text("Veuillez préciser votre recherche. Exemple: /search synchronisation")
+        return
+    if not search_index.built:
+        await update.message.reply_text("⏳ L'index de recherche est en cours de construction, réessayez dans quelques secondes.")
+        return
+
+    total, results = search_index.search(query)
+    if not results:
+        await update.message.reply_text(f"Aucun ticket ne correspond à « {query} ».")
+        return
+    # Tickets missing from the index were archived, unless they are still waiting in the outbox
+    unindexed = [result['ticket_id'] for result in results if not ticket_index.value(result['ticket_id'], 'status')]
+    queued = await asyncio.get_event_loop().run_in_executor(
+        None, lambda: {ticket_id for ticket_id in unindexed if get_outbox().find(ticket_id) is not None}
+    ) if unindexed else set()
+    lines = [f"🔎 {total} ticket(s) pour « {query} »" + (f", les {len(results)} plus récents :" if total > len(results) else " :")]
+    for result in results:
+        status = ticket_index.value(result['ticket_id'], 'status') or ('En Attente' if result['ticket_id'] in queued else 'Archivé')
+        lines.append(f"\n{result['ticket_id']} · {result['category']} · {status}")
+        lines.append(f"{result['identifiant']} — {result['description']}")
+    await update.message.reply_text('\n'.join(lines))
+
+@instrument()
+async def list_clusters(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin-only: list the groups of open tickets reporting the same problem, largest first."""
+    if not is_admin(update):
+        await update.message.reply_text("❌ Cette commande est réservée aux administrateurs.")
+        return
+    if not duplicate_index.built:
+        await update.message.reply_text("⏳ L'index des doublons est en cours de construction, réessayez dans quelques secondes.")
+        return
+
+    loop = asyncio.get_event_loop()
+    clusters = (await loop.run_in_executor(None, duplicate_index.clusters))[:CLUSTERS_LISTED]
+    if not clusters:
+        await update.message.reply_text("Aucun groupe de tickets similaires ouverts.")
+        return
+    followers = await loop.run_in_executor(
+        None, get_ticket_links().chats, [ticket_id for cluster in clusters for ticket_id in cluster['ticket_ids']]
+    )
+    lines = [f"🧩 {len(clusters)} groupe(s) de tickets similaires ouverts :"]
+    for cluster in clusters:
+        ticket_ids = cluster['ticket_ids']
+        reports = len(ticket_ids) + sum(len(followers.get(ticket_id, ())) for ticket_id in ticket_ids)
+        shown = ', '.join(ticket_ids[:CLUSTER_TICKETS_LISTED]) + (' …' if len(ticket_ids) > CLUSTER_TICKETS_LISTED else '')
+        lines.append(f"\n{len(ticket_ids)} tickets, {reports} signalements · {cluster['category']}")
+        lines.append(f"« {cluster['description']} »")
+        lines.append(shown)
+    await update.message.reply_text('\n'.join(lines))
+
+@leader_only
+@instrument()
 async def check_resolved_tickets(context):
-    """Check for resolved tickets and notify users."""
+    """Check for resolved tickets and notify users; return how many were queued."""
     logger = logging.getLogger(__name__)
     logger.info("Starting check for resolved tickets...")
     
     try:
         # Get resolved tickets
+        read_since = time.time()
         resolved_tickets, sheet = await get_resolved_tickets()
         if not sheet:
             logger.error("Failed to get sheet reference")
-            return
+            return None
             
-        resolved_count = 0
-        for ticket in resolved_tickets:
-            chat_id = str(ticket.get('chat_id', '')).strip()
+        loop = asyncio.get_event_loop()
+        ticket_ids = [ticket.get('ticket_id', 'NO_ID') for _, ticket in resolved_tickets]
+        # Tickets already moved to 'En Attente de Confirmation' that are resolved again were reopened by hand
+        reopened = await loop.run_in_executor(None, get_resolution_rounds().reopen_resolved_again, ticket_ids, read_since)
+        if reopened:
+            logger.info(f"Tickets resolved again after a reopen in the sheet: {', '.join(reopened)}")
+        rounds = await loop.run_in_executor(None, get_resolution_rounds().rounds, ticket_ids)
+        # Tickets already notified whose status write failed last time only need the write
+        pending_writes = StatusBatcher()
+        notifications = []
+        resolved = []
+        for _, ticket in resolved_tickets:
             ticket_id = ticket.get('ticket_id', 'NO_ID')
+            if notifier.delivered(resolution_key(ticket_id, rounds.get(ticket_id, 0))):
+                pending_writes.add(ticket_id, 'En Attente de Confirmation')
+                continue
             
             logger.info(f"Processing resolved ticket: {ticket_id}")
-            
-            keyboard = [
-                [
-                    InlineKeyboardButton("OUI", callback_data=f"resolved_yes_{ticket_id}"),
-                    InlineKeyboardButton("NON", callback_data=f"resolved_no_{ticket_id}")
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            try:
-                # Escape special characters for MarkdownV2
-                escaped_ticket_id = ticket_id.replace('-', '\\-')
-                category = ticket['category'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-                description = ticket['description'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-                identifiant = ticket['identifiant'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-                priority = ticket['priority'].replace('.', '\\.').replace('-', '\\-').replace('_', '\\_').replace('*', '\\*').replace('[', '\\[').replace(']', '\\]').replace('(', '\\(').replace(')', '\\)').replace('~', '\\~').replace('`', '\\`').replace('>', '\\>').replace('#', '\\#').replace('+', '\\+').replace('=', '\\=').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}').replace('!', '\\!')
-                timestamp = ticket['timestamp'].replace('-', '\\-').replace(':', '\\:')
-                
-                message = (
-                    "🎉 *Mise à jour de votre ticket\\!*\n\n"
-                    f"Votre ticket *{escaped_ticket_id}* a été marqué comme résolu par notre équipe\\.\n\n"
-                    "*Détails du ticket:*\n"
-                    f"📅 *Date de création* : {timestamp}\n"
-                    f"📝 *Catégorie* : {category}\n"
-                    f"📄 *Description* : {description}\n"
-                    f"📄 *Identifiant* : {identifiant}\n"
-                    f"⚡ *Priorité* : {priority}\n\n"
-                    "Est\\-ce que votre problème est effectivement résolu?"
-                )
-                
-                logger.info(f"Attempting to send notification to chat_id: {chat_id}")
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    reply_markup=reply_markup,
-                    parse_mode='MarkdownV2'
-                )
-                logger.info(f"Successfully sent notification for ticket {ticket_id}")
-                
-                # Update status to prevent multiple notifications
-                logger.info(f"Updating ticket {ticket_id} status to 'En Attente de Confirmation'")
-                row_index = resolved_tickets.index(ticket) + 2  # +2 because sheet is 1-indexed and we have headers
-                await update_ticket_status(sheet, row_index, 'En Attente de Confirmation')
-                resolved_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error sending notification for ticket {ticket_id}: {str(e)}", exc_info=True)
-                # Try sending without Markdown as fallback
-                try:
-                    plain_message = (
-                        "🎉 Mise à jour de votre ticket!\n\n"
-                        f"Votre ticket {ticket_id} a été marqué comme résolu par notre équipe.\n\n"
-                        "Détails du ticket:\n"
-                        f"📅 Date de création : {ticket['timestamp']}\n"
-                        f"📝 Catégorie : {ticket['category']}\n"
-                        f"📄 Description : {ticket['description']}\n"
-                        f"📄 Identifiant : {ticket['identifiant']}\n"
-                        f"⚡ Priorité : {ticket['priority']}\n\n"
-                        "Est-ce que votre problème est effectivement résolu?"
-                    )
-                    logger.info(f"Attempting to send plain text notification for ticket {ticket_id}")
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=plain_message,
-                        reply_markup=reply_markup
-                    )
-                    logger.info(f"Successfully sent plain text notification for ticket {ticket_id}")
-                    
-                    # Update status even if we had to fall back to plain text
-                    row_index = resolved_tickets.index(ticket) + 2
-                    await update_ticket_status(sheet, row_index, 'En Attente de Confirmation')
-                    resolved_count += 1
-                except Exception as e2:
-                    logger.error(f"Error sending plain notification for ticket {ticket_id}: {str(e2)}", exc_info=True)
+            notifications.append(resolution_notification(ticket, rounds.get(ticket_id, 0)))
+            resolved.append(ticket)
+        
+        if pending_writes:
+            await record_awaiting(await pending_writes.commit(sheet))
         
-        logger.info(f"Completed check. Processed {resolved_count} resolved tickets.")
+        queued = notify_resolved(context.bot, notifications, sheet)
+        followers = await notify_followers(context.bot, resolved, rounds)
+        logger.info(f"Completed check. Queued {queued} resolution notifications and {followers} for followers.")
+        return queued
     except Exception as e:
+        if is_quota_error(e):
+            raise  # The sweep scheduler pauses on quota errors
         logger.error(f"Error in check_resolved_tickets: {str(e)}", exc_info=True)
+        return None
+
+# Adaptive interval for the resolved-ticket sweep; with the status intake on it is only a safety net
+if INTAKE_TOKEN:
+    resolved_sweep = AdaptiveSchedule(
+        check_resolved_tickets,
+        initial_interval=INTAKE_SWEEP_INTERVAL,
+        min_interval=INTAKE_SWEEP_INTERVAL,
+        max_interval=max(SWEEP_MAX_INTERVAL, INTAKE_SWEEP_INTERVAL)
+    )
+else:
+    resolved_sweep = AdaptiveSchedule(check_resolved_tickets)
+
+@instrument()
+async def apply_status_change(bot, ticket_id, status):
+    """Apply a status change pushed through the intake, notifying the user at once when resolved."""
+    ticket = await get_ticket(ticket_id)
+    if ticket is None:
+        return 'unknown_ticket'
+    if ticket_id not in ticket_index:
+        return 'archived'
+    if ticket_index.row_of(ticket_id) is None:
+        # Still in the outbox, the sheet cannot have a status for it yet
+        return 'pending'
+    ticket_index.set_cell(ticket_id, status_column(), status)
+    loop = asyncio.get_event_loop()
+    round_ = (await loop.run_in_executor(None, get_resolution_rounds().rounds, [ticket_id])).get(ticket_id, 0)
+    delivered = notifier.delivered(resolution_key(ticket_id, round_))
+    if status not in RESOLVED_STATUSES:
+        if delivered and status not in CLOSED_STATUSES:
+            # Reopened in the sheet after the user was asked to confirm: the next resolution is a new one
+            await loop.run_in_executor(None, get_resolution_rounds().reopen, ticket_id)
+        return 'recorded'
+    if delivered:
+        return 'already_notified'
+
+    sheet = await open_worksheet()
+    ticket['status'] = status
+    queued = notify_resolved(bot, [resolution_notification(ticket, round_)], sheet)
+    await notify_followers(bot, [ticket], {ticket_id: round_})
+    return 'notified' if queued else 'already_notified'
+
+def status_intake(application):
+    """Build the status intake endpoint for an application."""
+    return StatusIntake(functools.partial(apply_status_change, application.bot))
+
+async def start_servers(application):
+    """post_init hook: metrics and, in polling mode, the status intake."""
+    await start_metrics_server(application)
+    await start_intake_server(status_intake(application), add_routes=[add_search_routes] if SEARCH_API_TOKEN else [])
+
+@leader_only
+@instrument()
+async def flush_ticket_outbox(context):
+    """Append queued tickets to Google Sheets."""
+    await flush_outbox()
+
+@leader_only
+@instrument()
+async def archive_closed_tickets(context):
+    """Move old confirmed-closed tickets to the monthly archive worksheets."""
+    try:
+        return await ticket_archiver.run()
+    except Exception as e:
+        logger.error(f"Error archiving tickets: {e}", exc_info=True)
+        get_session().report_error(e)
+
+async def refresh_index(index, refresh):
+    """Bring a process-local index up to date: the leader reads the sheet, the others follow the feed."""
+    if get_leader().is_leader():
+        await refresh()
+        return
+    await follow_ticket_feed()  # Before a first build, so nothing published during it is missed
+    if not index.built:
+        await refresh()
+
+async def refresh_search(context):
+    """Keep this process's search index up to date with tickets created elsewhere."""
+    try:
+        await refresh_index(search_index, refresh_search_index)
+    except Exception as e:
+        logger.error(f"Error refreshing the search index: {e}", exc_info=True)
+        get_session().report_error(e)
+
+async def refresh_duplicates(context):
+    """Keep this process's duplicate index in step with the tickets opened and closed elsewhere."""
+    try:
+        await refresh_index(duplicate_index, refresh_duplicate_index)
+    except Exception as e:
+        logger.error(f"Error refreshing the duplicate index: {e}", exc_info=True)
+        get_session().report_error(e)
+
+async def restore_ticket_index(context):
+    """Restore the ticket index from the warm-start snapshot, or download it."""
+    # The lease decides whether this process reconciles the snapshot with the sheet
+    await renew_leader_lease(context)
+    try:
+        if await warm_start():
+            logger.info(f"Ticket index ready with {len(ticket_index)} records")
+        logger.info(f"Google Sheets session stats: {get_session().stats()}")
+        logger.info(f"Google Sheets executor stats: {sheets_executor.stats()}")
+        logger.info(f"Google Sheets rate limiter stats: {rate_limiter.stats()}")
+    except Exception as e:
+        logger.error(f"Error restoring the ticket index: {e}", exc_info=True)
 
+@leader_only
+async def save_ticket_snapshot(context):
+    """Save the warm-start snapshot between restarts, in case the process is killed."""
+    await save_snapshot()
+
+async def renew_leader_lease(context):
+    """Keep (or take over) the lease that lets this process run the periodic jobs."""
+    await asyncio.get_event_loop().run_in_executor(None, get_leader().renew)
+
+async def shutdown(application):
+    """Send the queued admin emails, save the warm-start snapshot and hand the periodic jobs to another process."""
+    await email_dispatcher.close()
+    if get_leader().is_leader():
+        await save_snapshot()
+    await asyncio.get_event_loop().run_in_executor(None, get_leader().release)
+
+@instrument()
 async def handle_resolution_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle the user's confirmation of ticket resolution."""
     query = update.callback_query
@@ -379,15 +761,14 @@ async def handle_resolution_confirmation(update: Update, context: ContextTypes.D
     ticket_id = data[2]
     
     try:
-        credentials = get_credentials()
-        client = gspread.authorize(credentials)
-        sheet = client.open_by_key(GOOGLE_SHEET_ID).worksheet("Sheet1")
+        sheet = await open_worksheet()
         
-        # Find the ticket
-        cell = sheet.find(ticket_id)
-        if cell:
+        # Find the ticket row through the index
+        row = await find_ticket_row(ticket_id)
+        if row:
             if response == 'yes':
-                sheet.update_cell(cell.row, 7, 'Résolu Confirmé')
+                if not await update_ticket_status(sheet, ticket_id, 'Résolu Confirmé'):
+                    raise RuntimeError(f"Could not update ticket {ticket_id}")
                 try:
                     await query.message.edit_text(
                         "✅ *Ticket Fermé avec Succès*\n\n"
@@ -403,7 +784,10 @@ async def handle_resolution_confirmation(update: Update, context: ContextTypes.D
                         "Si vous rencontrez un nouveau problème, n'hésitez pas à créer un nouveau ticket avec /start"
                     )
             else:
-                sheet.update_cell(cell.row, 7, 'Ouvert')
+                if not await update_ticket_status(sheet, ticket_id, 'Ouvert'):
+                    raise RuntimeError(f"Could not update ticket {ticket_id}")
+                # The next resolution is a new one, to be confirmed again
+                await asyncio.get_event_loop().run_in_executor(None, get_resolution_rounds().reopen, ticket_id)
                 try:
                     await query.message.edit_text(
                         "🔄 *Ticket Rouvert*\n\n"
@@ -420,6 +804,7 @@ async def handle_resolution_confirmation(update: Update, context: ContextTypes.D
                     )
     except Exception as e:
         logger.error(f"Error updating ticket status: {e}", exc_info=True)
+        get_session().report_error(e)
         try:
             await query.message.edit_text(
                 "*Une erreur s'est produite\\.*\nVeuillez réessayer plus tard\\.",
@@ -430,6 +815,73 @@ async def handle_resolution_confirmation(update: Update, context: ContextTypes.D
                 "Une erreur s'est produite.\nVeuillez réessayer plus tard."
             )
 
+def conversation_handler(bot):
+    """The ticket conversation of a TicketBot, shared by every entry point."""
+    # Single conversation handler - removed LANGUAGE state
+    conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('start', bot.start)],
+        states={
+            CATEGORY: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.category)],
+            DESCRIPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.description)],
+            IDENTIFIANT: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.identifiant)],
+            PRIORITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.priority)],
+            CONFIRMATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.confirm)],
+            DUPLICATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.duplicate)]
+        },
+        fallbacks=[CommandHandler('status', check_status)],
+        # Matches the draft idle TTL; with persistence the expired draft ends the conversation instead
+        conversation_timeout=None if clustered() else DRAFT_TTL,
+        # With several workers the states survive a worker restart, see SQLitePersistence
+        name='ticket_conversation',
+        persistent=clustered()
+    )
+    return conv_handler
+
+def persistence():
+    """The Application persistence: conversation states in the state database with several workers."""
+    return SQLitePersistence() if clustered() else None
+
+def setup_jobs(application):
+    """Schedule the periodic jobs; the leader-only ones do nothing in the other workers."""
+    job_queue = application.job_queue
+    if not job_queue:
+        logger.error("Job queue is not available, periodic ticket checking will not work")
+        return
+    try:
+        # Compete for the periodic jobs lease
+        job_queue.run_repeating(renew_leader_lease, interval=LEADER_RENEW_INTERVAL, first=0, name='renew_leader_lease')
+
+        # Restore the ticket index right away, a warm start needs no full download
+        job_queue.run_once(restore_ticket_index, when=0, name='restore_ticket_index')
+
+        # Keep the warm-start snapshot recent
+        job_queue.run_repeating(
+            save_ticket_snapshot, interval=SNAPSHOT_INTERVAL, first=SNAPSHOT_INTERVAL, name='save_ticket_snapshot'
+        )
+
+        # Flush the ticket outbox to Google Sheets
+        job_queue.run_repeating(flush_ticket_outbox, interval=OUTBOX_FLUSH_INTERVAL, first=1, name='flush_ticket_outbox')
+
+        # Every process answers /search from its own index, the leader reads the sheet for it
+        if SEARCH_ENABLED:
+            job_queue.run_repeating(refresh_search, interval=SEARCH_REFRESH_INTERVAL, first=10, name='refresh_search')
+
+        # Every process checks new descriptions against its own duplicate index, kept like the search one
+        if DUPLICATE_DETECTION:
+            job_queue.run_repeating(
+                refresh_duplicates, interval=DUPLICATE_REFRESH_INTERVAL, first=15, name='refresh_duplicates'
+            )
+
+        # Keep the ticket sheet small by archiving old closed tickets
+        if ARCHIVE_AFTER_DAYS > 0:
+            job_queue.run_repeating(archive_closed_tickets, interval=ARCHIVE_INTERVAL, first=60, name='archive_closed_tickets')
+
+        # The resolved-ticket sweep, its interval follows the resolution rate
+        resolved_sweep.start(job_queue, first=5)
+        logger.info(f"Job queue setup completed successfully. Sweep: {resolved_sweep.stats()}")
+    except Exception as e:
+        logger.error(f"Error setting up job queue: {e}", exc_info=True)
+
 def main():
     """Start the bot."""
     # Configure logging
@@ -445,33 +897,22 @@ def main():
         application = (
             Application.builder()
             .token(TELEGRAM_BOT_TOKEN)
+            .persistence(persistence())
+            .post_init(start_servers)
+            .post_shutdown(shutdown)
             .build()
         )
         logger.info("Created Telegram application")
 
-        # Initialize job queue
-        job_queue = application.job_queue
-        logger.info("Job queue initialized")
-
+        # Each chat stays on one worker (see src.cluster.chat_owner), so its draft stays in that worker's memory
         bot = TicketBot()
         logger.info("Created TicketBot instance")
 
-        # Single conversation handler - removed LANGUAGE state
-        conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('start', bot.start)],
-            states={
-                CATEGORY: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.category)],
-                DESCRIPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.description)],
-                IDENTIFIANT: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.identifiant)],
-                PRIORITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.priority)],
-                CONFIRMATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.confirm)]
-            },
-            fallbacks=[CommandHandler('status', check_status)]
-        )
-
         # Add handlers
-        application.add_handler(conv_handler)
+        application.add_handler(conversation_handler(bot))
         application.add_handler(CommandHandler('status', check_status))
+        application.add_handler(CommandHandler('search', search_tickets))
+        application.add_handler(CommandHandler('clusters', list_clusters))
         application.add_handler(CallbackQueryHandler(handle_resolution_confirmation, pattern="^resolved_"))
         logger.info("Added all handlers")
 
@@ -490,87 +931,26 @@ def main():
         # Register the error handler
         application.add_error_handler(error_handler)
 
-        # Add job queue for checking resolved tickets
-        if job_queue:
-            try:
-                logger.info("Setting up job queue for checking resolved tickets...")
-                
-                # Add a one-time job to verify the job queue is working
-                async def verify_job_queue(context):
-                    logger.info("Job queue verification task running")
-                    try:
-                        # Test Google Sheets connection
-                        credentials = get_credentials()
-                        client = gspread.authorize(credentials)
-                        sheet = client.open_by_key(GOOGLE_SHEET_ID).worksheet("Sheet1")
-                        records = sheet.get_all_records()
-                        logger.info(f"Job queue verification: Successfully connected to Google Sheets. Found {len(records)} records.")
-                    except Exception as e:
-                        logger.error(f"Job queue verification: Error connecting to Google Sheets: {e}", exc_info=True)
-                
-                # Run verification job after 2 seconds
-                job_queue.run_once(verify_job_queue, when=2)
-                logger.info("Added verification job")
-                
-                # Run the main check_resolved_tickets job
-                job = job_queue.run_repeating(
-                    check_resolved_tickets,
-                    interval=30,  # Check every 30 seconds
-                    first=5,      # First run after 5 seconds
-                    name='check_resolved_tickets'
-                )
-                logger.info(f"Job queue setup completed successfully. Job: {job.name}, Interval: {job.interval}s")
-                
-            except Exception as e:
-                logger.error(f"Error setting up job queue: {e}", exc_info=True)
-        else:
-            logger.error("Job queue is not available!")
+        setup_jobs(application)
 
         # Start the Bot with graceful shutdown
-        logger.info("Starting bot...")
-        application.run_polling(
-            allowed_updates=Update.ALL_TYPES,
-            drop_pending_updates=True,
-            close_loop=False  # Prevent the event loop from being closed
-        )
+        logger.info(f"Starting bot in {BOT_MODE} mode...")
+        if BOT_MODE == 'webhook':
+            from src.webhook import run_webhook
+            run_webhook(application, intake=status_intake(application))
+        else:
+            application.run_polling(
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=True,
+                close_loop=False  # Prevent the event loop from being closed
+            )
 
     except Exception as e:
         logger.error(f"Critical error in main: {e}", exc_info=True)
         raise  # Re-raise the exception for proper handling
 
 if __name__ == '__main__':
-    # Ensure only one instance is running
-    import sys
-    import os
-    import tempfile
-    
-    # Create a lock file
-    lock_file = os.path.join(tempfile.gettempdir(), 'milda_bot.lock')
-    
-    try:
-        # Try to create the lock file
-        if os.path.exists(lock_file):
-            # Check if the process is still running
-            with open(lock_file, 'r') as f:
-                pid = int(f.read().strip())
-            try:
-                os.kill(pid, 0)  # Check if process is running
-                print(f"Bot is already running with PID {pid}")
-                sys.exit(1)
-            except OSError:
-                # Process is not running, we can remove the lock file
-                os.remove(lock_file)
-        
-        # Write current PID to lock file
-        with open(lock_file, 'w') as f:
-            f.write(str(os.getpid()))
-        
-        # Run the bot
+    if clustered() and not in_worker():
+        run_workers(main)
+    else:
         main()
-    finally:
-        # Clean up lock file when the bot exits
-        try:
-            if os.path.exists(lock_file):
-                os.remove(lock_file)
-        except Exception as e:
-            print(f"Error removing lock file: {e}")
@@ -0,0 +1,140 @@
+"""
+Multi-process mode: a supervisor runs BOT_WORKERS bot processes behind one webhook port.
+
+Workers share conversation states, the ticket outbox and ID sequences through
+the local state database. The kernel spreads webhook connections
+across them (SO_REUSEPORT); each chat belongs to one worker, which gets the
+chat's updates from the others through the update relay. A leader lease picks
+the one process that runs the periodic jobs.
+"""
+import os
+import time
+import signal
+import threading
+import multiprocessing
+import logging
+from src.config import BOT_WORKERS, BOT_MODE
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WORKER_ENV = 'BOT_WORKER_INDEX'
+CHECK_INTERVAL = 1  # Seconds between liveness checks of the workers
+STOP_TIMEOUT = 30  # Seconds a worker gets to shut down before it is killed
+RELAY_POLL = 0.05  # Seconds between checks for updates relayed by the other workers
+RELAY_BATCH = 100
+
+def in_worker():
+    """Whether this process was started by run_workers."""
+    return WORKER_ENV in os.environ
+
+def worker_index():
+    return int(os.getenv(WORKER_ENV, '0'))
+
+def clustered():
+    """Whether this process should share its state with sibling workers."""
+    return BOT_WORKERS > 1
+
+def chat_owner(update, count=BOT_WORKERS):
+    """Index of the worker that handles an update, so a conversation always stays in one process.
+
+    Updates without a chat or user (e.g. polls) can be handled anywhere: None.
+    """
+    if update.effective_chat is not None:
+        return update.effective_chat.id % count
+    if update.effective_user is not None:
+        return update.effective_user.id % count
+    return None
+
+class UpdateRelay:
+    """Webhook updates received by one worker for a chat owned by another, in the state database."""
+
+    def __init__(self, path=None):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS relayed_updates ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " worker INTEGER NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " relayed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS relayed_updates_worker ON relayed_updates (worker, id)")
+            self._conn.commit()
+
+    def put(self, worker, payload, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO relayed_updates (worker, payload, relayed_at) VALUES (?, ?, ?)", (worker, payload, now)
+            )
+            self._conn.commit()
+
+    def take(self, worker, limit=RELAY_BATCH):
+        """Remove and return the oldest updates relayed to `worker`, as JSON payloads."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, payload FROM relayed_updates WHERE worker = ? ORDER BY id LIMIT ?", (worker, limit)
+                ).fetchall()
+                if rows:
+                    self._conn.execute("DELETE FROM relayed_updates WHERE worker = ? AND id <= ?", (worker, rows[-1][0]))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return [payload for _, payload in rows]
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM relayed_updates").fetchone()
+        return count
+
+def run_workers(target, count=BOT_WORKERS):
+    """Run `target` in `count` processes, restarting any that exit, until SIGINT or SIGTERM."""
+    if BOT_MODE != 'webhook':
+        raise ValueError("BOT_WORKERS > 1 requires BOT_MODE=webhook, Telegram allows a single polling client")
+
+    # Spawned, not forked: the parent's event loop and threads must not leak into the workers
+    context = multiprocessing.get_context('spawn')
+    processes = {}
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    def start(index):
+        os.environ[WORKER_ENV] = str(index)
+        try:
+            process = context.Process(target=target, name=f'bot-worker-{index}')
+            process.start()
+        finally:
+            del os.environ[WORKER_ENV]
+        processes[index] = process
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for index in range(count):
+        start(index)
+
+    while not stopping:
+        time.sleep(CHECK_INTERVAL)
+        for index, process in list(processes.items()):
+            if not process.is_alive() and not stopping:
+                logger.warning(f"Worker {index} exited with code {process.exitcode}, restarting it")
+                start(index)
+
+    logger.info("Stopping workers...")
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + STOP_TIMEOUT
+    for process in processes.values():
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.warning(f"Worker {process.name} did not stop in time, killing it")
+            process.kill()
@@ -37,3 +37,104 @@ PRIORITIES = ['Urgent', 'Moyen', 'Faible']
 
 # Google Sheets Configuration
 SHEET_RANGE = 'Sheet1!A:H'  # Adjust based on your sheet structure
+
+# Local state database (SQLite) for the ticket outbox
+BOT_STATE_DB = os.getenv('BOT_STATE_DB', 'data/bot_state.sqlite3')
+
+# Ticket outbox flushing
+OUTBOX_FLUSH_INTERVAL = int(os.getenv('OUTBOX_FLUSH_INTERVAL', '5'))  # Seconds between flushes
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))  # Flush early once this many rows are pending
+OUTBOX_MAX_BACKOFF = int(os.getenv('OUTBOX_MAX_BACKOFF', '300'))  # Seconds
+
+# Ticket index: cached rows younger than this are served without a Sheets call
+INDEX_ROW_TTL = int(os.getenv('INDEX_ROW_TTL', '60'))  # Seconds
+
+# Resolved-ticket poller: above this many moved rows, rebuild the index instead of patching it
+POLL_FULL_RELOAD_ROWS = int(os.getenv('POLL_FULL_RELOAD_ROWS', '200'))
+
+# Dedicated thread pool for blocking Google Sheets I/O
+SHEETS_EXECUTOR_WORKERS = int(os.getenv('SHEETS_EXECUTOR_WORKERS', '4'))
+SHEETS_EXECUTOR_QUEUE = int(os.getenv('SHEETS_EXECUTOR_QUEUE', '100'))  # Calls waiting beyond the running ones
+
+# Per-chat ticket drafts
+DRAFT_MAX = int(os.getenv('DRAFT_MAX', '10000'))  # Drafts kept in memory at most
+DRAFT_TTL = int(os.getenv('DRAFT_TTL', '3600'))  # Seconds of inactivity before a draft is dropped
+
+# Ticket IDs: set a distinct node letter per host when running on several machines.
+# Crockford base32 letters only: typed IDs have I, L and O read as 1, 1 and 0
+TICKET_ID_NODE = os.getenv('TICKET_ID_NODE', '').strip().upper()
+if TICKET_ID_NODE.strip('0123456789ABCDEFGHJKMNPQRSTVWXYZ'):
+    raise ValueError(f"TICKET_ID_NODE={TICKET_ID_NODE!r} may not contain I, L, O, U or non-alphanumeric characters")
+
+# Admin email notifications
+EMAIL_DIGEST_WINDOW = float(os.getenv('EMAIL_DIGEST_WINDOW', '10'))  # Seconds to gather non-urgent tickets into one email
+EMAIL_DIGEST_MAX = int(os.getenv('EMAIL_DIGEST_MAX', '50'))  # Tickets per digest at most
+EMAIL_QUEUE_SIZE = int(os.getenv('EMAIL_QUEUE_SIZE', '1000'))
+
+# Outbound Telegram notifications
+TELEGRAM_WORKERS = int(os.getenv('TELEGRAM_WORKERS', '8'))
+TELEGRAM_GLOBAL_RATE = int(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))  # Messages per second, all chats
+TELEGRAM_CHAT_INTERVAL = float(os.getenv('TELEGRAM_CHAT_INTERVAL', '1'))  # Seconds between messages to one chat
+TELEGRAM_SEND_ATTEMPTS = int(os.getenv('TELEGRAM_SEND_ATTEMPTS', '5'))
+
+# Serving mode: 'polling' (default) or 'webhook'
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+
+# Webhook mode
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # Public base URL, e.g. https://milda-bot.onrender.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('PORT', os.getenv('WEBHOOK_PORT', '8080')))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))  # Updates waiting before we answer 503
+
+# Prometheus metrics, served at /metrics (on the webhook port in webhook mode); off unless enabled
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Optional, scrapers then send "Authorization: Bearer <token>"
+
+# Warm start: the ticket index and poll cursor are saved locally and restored on boot
+WARM_START_ENABLED = os.getenv('WARM_START_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+WARM_START_MAX_AGE = int(os.getenv('WARM_START_MAX_AGE', str(7 * 24 * 3600)))  # Older snapshots trigger a full read
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '600'))  # Seconds between periodic saves, besides shutdown
+
+# Multi-process mode (webhook only): workers share drafts and conversations through BOT_STATE_DB
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', '1'))
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL', '6'))  # Seconds before another process takes over the periodic jobs
+LEADER_RENEW_INTERVAL = float(os.getenv('LEADER_RENEW_INTERVAL', '2'))
+INDEX_MISS_RELOAD = int(os.getenv('INDEX_MISS_RELOAD', '30'))  # Seconds between index reloads caused by unknown ticket IDs
+
+# Resolved-ticket sweep: the interval follows how often admins resolve tickets
+SWEEP_INITIAL_INTERVAL = float(os.getenv('SWEEP_INITIAL_INTERVAL', '30'))  # Seconds
+SWEEP_MIN_INTERVAL = float(os.getenv('SWEEP_MIN_INTERVAL', '15'))
+SWEEP_MAX_INTERVAL = float(os.getenv('SWEEP_MAX_INTERVAL', '600'))
+SWEEP_EWMA_ALPHA = float(os.getenv('SWEEP_EWMA_ALPHA', '0.3'))  # Weight of the latest sweep in the resolution rate
+SWEEP_JITTER = float(os.getenv('SWEEP_JITTER', '0.1'))  # +/- fraction added to each delay
+SWEEP_QUOTA_PAUSE = float(os.getenv('SWEEP_QUOTA_PAUSE', '60'))  # First pause after a quota error, doubles while they last
+
+# Status intake: the sheet (or an admin tool) pushes status changes, the sweep becomes a safety net
+INTAKE_TOKEN = os.getenv('INTAKE_TOKEN')  # Callers send Authorization: Bearer <token>; unset disables the endpoint
+INTAKE_PATH = os.getenv('INTAKE_PATH', '/intake/status')
+INTAKE_HOST = os.getenv('INTAKE_HOST', '0.0.0.0')
+INTAKE_PORT = int(os.getenv('INTAKE_PORT', '8081'))  # Polling mode only, webhook mode uses the webhook port
+INTAKE_MAX_CHANGES = int(os.getenv('INTAKE_MAX_CHANGES', '100'))  # Per request
+INTAKE_SWEEP_INTERVAL = float(os.getenv('INTAKE_SWEEP_INTERVAL', '900'))  # Minimum sweep interval once the intake is on
+
+# Archiving: confirmed-closed tickets move to per-month worksheets once old enough
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '0'))  # Age from creation; 0, the default, disables archiving
+ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', '21600'))  # Seconds between runs
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))  # Tickets moved per run
+
+# Admin ticket search: /search in Telegram and GET {SEARCH_PATH}?q=... next to the status intake
+ADMIN_TELEGRAM_IDS = {int(user_id) for user_id in os.getenv('ADMIN_TELEGRAM_IDS', '').split(',') if user_id.strip()}
+SEARCH_API_TOKEN = os.getenv('SEARCH_API_TOKEN')  # Callers send Authorization: Bearer <token>; unset disables the endpoint
+SEARCH_PATH = os.getenv('SEARCH_PATH', '/search')
+SEARCH_RESULTS = int(os.getenv('SEARCH_RESULTS', '10'))  # Tickets listed per /search answer
+SEARCH_REFRESH_INTERVAL = int(os.getenv('SEARCH_REFRESH_INTERVAL', '60'))  # Seconds between checks for new tickets
+SEARCH_ENABLED = bool(ADMIN_TELEGRAM_IDS or SEARCH_API_TOKEN)  # Either way of searching needs the index
+
+# Near-duplicate detection: new descriptions are compared with the open tickets of the same category
+DUPLICATE_DETECTION = os.getenv('DUPLICATE_DETECTION', 'true').lower() in ('1', 'true', 'yes')
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', '0.5'))  # Estimated share of common words to offer a link
+DUPLICATE_REFRESH_INTERVAL = int(os.getenv('DUPLICATE_REFRESH_INTERVAL', '120'))  # Seconds between checks for new and closed tickets
@@ -0,0 +1,143 @@
+"""
+Archiving: confirmed-closed tickets older than ARCHIVE_AFTER_DAYS move from the
+ticket sheet to per-month worksheets ("Archive 2024-09"), so that every scan of
+the ticket sheet scales with open tickets rather than with the whole history.
+
+Archived tickets stay findable through the local archive index.
+"""
+import time
+import asyncio
+import datetime
+import logging
+from src.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from src.utils.sheets import (
+    sheets_call, open_worksheet, read_columns, delete_ticket_rows, row_runs, column_letter,
+    BACKGROUND, COST_CELL, COST_BATCH
+)
+from src.utils.archive_index import get_archive_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ARCHIVE_STATUS = 'Résolu Confirmé'
+ARCHIVE_PREFIX = 'Archive '
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def archive_title(timestamp):
+    """Archive worksheet of a ticket created at `timestamp`, one per month."""
+    return f'{ARCHIVE_PREFIX}{timestamp[:7]}'
+
+def _created_at(timestamp):
+    try:
+        return datetime.datetime.strptime(str(timestamp).strip(), TIMESTAMP_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+class TicketArchiver:
+    """Moves old confirmed-closed tickets to the archive worksheets in batches."""
+
+    def __init__(self, after_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.index_checked = False
+        # Metrics
+        self.runs = 0
+        self.archived = 0
+
+    async def run(self, now=None):
+        """Archive one batch of eligible tickets; return how many left the ticket sheet."""
+        if self.after_days <= 0:
+            return 0
+        self.runs += 1
+        sheet = await open_worksheet()
+        worksheets = {worksheet.title: worksheet for worksheet in await sheets_call(
+            sheet.spreadsheet.worksheets, cost=COST_CELL, lane=BACKGROUND
+        )}
+        if not self.index_checked:
+            await self._rebuild_index(worksheets)
+
+        columns = await read_columns(('ticket_id', 'timestamp', 'status'), lane=BACKGROUND, sheet=sheet)
+        cutoff = (time.time() if now is None else now) - self.after_days * 86400
+        candidates = {}  # Row -> ticket ID; an ID may appear on several rows
+        for offset, ticket_id in enumerate(columns['ticket_id']):
+            ticket_id = str(ticket_id).strip()
+            if not ticket_id or str(columns['status'][offset]).strip() != ARCHIVE_STATUS:
+                continue
+            created_at = _created_at(columns['timestamp'][offset])
+            if created_at is not None and created_at < cutoff:
+                candidates[offset + 2] = ticket_id
+                if len(candidates) >= self.batch_size:
+                    break
+        if not candidates:
+            logger.info("No tickets to archive")
+            return 0
+
+        # Copy first, delete last: an interrupted run leaves duplicates, never lost tickets
+        done = await asyncio.get_event_loop().run_in_executor(None, get_archive_index().archived, set(candidates.values()))
+        tickets = await self._fetch(sheet, columns.headers, [row for row, ticket_id in candidates.items() if ticket_id not in done])
+        by_month = {}
+        for ticket in tickets:
+            by_month.setdefault(archive_title(ticket.get('timestamp', '')), []).append(ticket)
+        for title, month_tickets in sorted(by_month.items()):
+            await self._append(sheet.spreadsheet, worksheets, title, columns.headers, month_tickets)
+            await asyncio.get_event_loop().run_in_executor(None, get_archive_index().add, title, month_tickets)
+
+        archived = {ticket['ticket_id'] for ticket in tickets} | done
+        # Only the rows selected above, and only if they still hold the same closed ticket
+        deleted = await delete_ticket_rows(
+            {row: ticket_id for row, ticket_id in candidates.items() if ticket_id in archived}, ARCHIVE_STATUS
+        )
+        self.archived += deleted
+        logger.info(f"Archived {deleted} tickets into {len(by_month)} worksheets")
+        return deleted
+
+    async def _fetch(self, sheet, headers, rows):
+        """Read the full rows to archive, one range per run of consecutive rows."""
+        if not rows:
+            return []
+        last_letter = column_letter(len(headers))
+        runs = row_runs(rows)
+        results = await sheets_call(
+            sheet.batch_get, [f'A{first}:{last_letter}{last}' for first, last in runs], cost=COST_BATCH, lane=BACKGROUND
+        )
+        wanted = set(rows)
+        tickets = []
+        for (first, _), values in zip(runs, results):
+            for row, cells in enumerate(values, start=first):
+                if row in wanted and cells and str(cells[0]).strip():
+                    ticket = dict(zip(headers, cells + [''] * (len(headers) - len(cells))))
+                    ticket['ticket_id'] = str(cells[0]).strip()
+                    tickets.append(ticket)
+        return tickets
+
+    async def _append(self, spreadsheet, worksheets, title, headers, tickets):
+        rows = [[ticket.get(header, '') for header in headers] for ticket in tickets]
+        worksheet = worksheets.get(title)
+        if worksheet is None:
+            worksheet = await sheets_call(
+                spreadsheet.add_worksheet, title=title, rows=1, cols=len(headers), cost=COST_CELL, lane=BACKGROUND
+            )
+            worksheets[title] = worksheet
+            rows.insert(0, list(headers))
+            logger.info(f"Created archive worksheet {title}")
+        await sheets_call(worksheet.append_rows, rows, cost=COST_BATCH, lane=BACKGROUND)
+
+    async def _rebuild_index(self, worksheets):
+        """Refill an empty archive index from the archive worksheets, e.g. after the state database was lost."""
+        loop = asyncio.get_event_loop()
+        archives = [worksheet for title, worksheet in sorted(worksheets.items()) if title.startswith(ARCHIVE_PREFIX)]
+        if archives and await loop.run_in_executor(None, len, get_archive_index()) == 0:
+            logger.warning(f"Archive index is empty, rebuilding it from {len(archives)} archive worksheets")
+            for worksheet in archives:
+                values = await sheets_call(worksheet.get_all_values, cost=COST_BATCH, lane=BACKGROUND)
+                if not values:
+                    continue
+                headers = values[0]
+                tickets = [dict(zip(headers, row)) for row in values[1:] if row and str(row[0]).strip()]
+                await loop.run_in_executor(None, get_archive_index().add, worksheet.title, tickets)
+        self.index_checked = True
+
+    def stats(self):
+        return {'runs': self.runs, 'archived': self.archived}
+
+ticket_archiver = TicketArchiver()
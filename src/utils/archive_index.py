@@ -0,0 +1,150 @@
+import json
+import time
+import threading
+import logging
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class ArchiveIndex:
+    """Local index of archived tickets: the archive worksheet of each and a copy of its row.
+
+    Also holds the layout version of the ticket sheet, bumped whenever rows are
+    deleted from it, so every process knows when its row numbers are stale, and
+    the holds that keep rows in place while another process writes to them.
+    """
+
+    def __init__(self, path=None):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS archived_tickets ("
+                " ticket_id TEXT PRIMARY KEY,"
+                " worksheet TEXT NOT NULL,"
+                " archived_at REAL NOT NULL,"
+                " ticket TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_layout ("
+                " name TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS layout_holds ("
+                " holder TEXT PRIMARY KEY,"
+                " exclusive INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def add(self, worksheet, tickets, now=None):
+        """Record tickets (header → value dicts) moved to `worksheet`."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archived_tickets (ticket_id, worksheet, archived_at, ticket) VALUES (?, ?, ?, ?)",
+                [(ticket['ticket_id'], worksheet, now, json.dumps(ticket, ensure_ascii=False)) for ticket in tickets]
+            )
+            self._conn.commit()
+
+    def find(self, ticket_id):
+        """Return an archived ticket as a header → value dict, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ticket FROM archived_tickets WHERE ticket_id = ?", (ticket_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def tickets(self):
+        """Return every archived ticket as a header → value dict, oldest archive first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT ticket FROM archived_tickets ORDER BY worksheet, rowid").fetchall()
+        return [json.loads(ticket) for (ticket,) in rows]
+
+    def archived(self, ticket_ids):
+        """Return the subset of `ticket_ids` already archived."""
+        ticket_ids = list(ticket_ids)
+        found = set()
+        with self._lock:
+            # SQLite caps the number of bound parameters per statement
+            for start in range(0, len(ticket_ids), 500):
+                chunk = ticket_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT ticket_id FROM archived_tickets WHERE ticket_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(ticket_id for (ticket_id,) in rows)
+        return found
+
+    def layout_version(self, name='tickets'):
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM sheet_layout WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_layout(self, name='tickets'):
+        """Record that rows were deleted from a sheet; return the new layout version."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sheet_layout (name, version) VALUES (?, 1)"
+                " ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                (name,)
+            )
+            (version,) = self._conn.execute("SELECT version FROM sheet_layout WHERE name = ?", (name,)).fetchone()
+            self._conn.commit()
+        return version
+
+    def hold_layout(self, holder, exclusive=False, ttl=120, now=None):
+        """Take or renew a hold on the ticket sheet's row numbers; return whether it is granted.
+
+        Row writers take shared holds, which never exclude each other. A row
+        delete takes the exclusive hold: its first call keeps new shared holds
+        out, and it is granted once the existing ones are released. Holds of a
+        process that died lapse after `ttl` seconds.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM layout_holds WHERE expires_at < ?", (now,))
+                (blocking,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM layout_holds WHERE exclusive = 1 AND holder != ?", (holder,)
+                ).fetchone()
+                granted = not blocking
+                if granted:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO layout_holds (holder, exclusive, expires_at) VALUES (?, ?, ?)",
+                        (holder, int(exclusive), now + ttl)
+                    )
+                    if exclusive:
+                        (writers,) = self._conn.execute(
+                            "SELECT COUNT(*) FROM layout_holds WHERE exclusive = 0"
+                        ).fetchone()
+                        granted = writers == 0
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return granted
+
+    def release_layout(self, holder):
+        with self._lock:
+            self._conn.execute("DELETE FROM layout_holds WHERE holder = ?", (holder,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM archived_tickets").fetchone()
+        return count
+
+_archive_index = None
+_archive_index_lock = threading.Lock()
+
+def get_archive_index():
+    """Return the shared archive index, opening it lazily."""
+    global _archive_index
+    if _archive_index is None:
+        with _archive_index_lock:
+            if _archive_index is None:
+                _archive_index = ArchiveIndex()
+    return _archive_index
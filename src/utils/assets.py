@@ -0,0 +1,137 @@
+import os
+import threading
+import logging
+from telegram import InputMediaPhoto
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets')
+START_IMAGES = ('pnlp.png', 'commcare.png')
+
+class AssetCache:
+    """Telegram file_ids of uploaded images, persisted in SQLite so each image is uploaded once.
+
+    Entries are keyed by bot and by the file's size and mtime, so replacing an
+    image or switching bot token triggers a fresh upload.
+    """
+
+    def __init__(self, path=None, assets_dir=ASSETS_DIR):
+        self.assets_dir = assets_dir
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._file_ids = {}
+        self._fingerprints = {}
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS telegram_files ("
+                " key TEXT PRIMARY KEY,"
+                " file_id TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+    def path(self, name):
+        return os.path.join(self.assets_dir, name)
+
+    def _key(self, bot_id, name):
+        fingerprint = self._fingerprints.get(name)
+        if fingerprint is None:
+            # Stat once per process; None when the image is missing
+            try:
+                stat = os.stat(self.path(name))
+                fingerprint = f"{stat.st_size}:{int(stat.st_mtime)}"
+            except OSError:
+                logger.error(f"Image not found at: {self.path(name)}")
+                fingerprint = ''
+            self._fingerprints[name] = fingerprint
+        if not fingerprint:
+            return None
+        return f"{bot_id}:{name}:{fingerprint}"
+
+    def get(self, bot_id, name):
+        """Return the cached file_id, or None if the image must be uploaded (or is missing)."""
+        key = self._key(bot_id, name)
+        if key is None:
+            return None
+        if key not in self._file_ids:
+            with self._lock:
+                row = self._conn.execute("SELECT file_id FROM telegram_files WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._file_ids[key] = row[0]
+        return self._file_ids[key]
+
+    def available(self, bot_id, name):
+        return self._key(bot_id, name) is not None
+
+    def set(self, bot_id, name, file_id):
+        key = self._key(bot_id, name)
+        if key is None:
+            return
+        self._file_ids[key] = file_id
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO telegram_files (key, file_id) VALUES (?, ?)", (key, file_id)
+            )
+            self._conn.commit()
+
+    def forget(self, bot_id, names):
+        for name in names:
+            key = self._key(bot_id, name)
+            self._file_ids.pop(key, None)
+            with self._lock:
+                self._conn.execute("DELETE FROM telegram_files WHERE key = ?", (key,))
+                self._conn.commit()
+
+_cache = None
+
+def get_asset_cache():
+    """Return the shared asset cache, opening it lazily."""
+    global _cache
+    if _cache is None:
+        _cache = AssetCache()
+    return _cache
+
+async def send_start_images(bot, chat_id, names=START_IMAGES):
+    """Send the welcome images as one media group, reusing cached file_ids when possible.
+
+    A single available image goes out with sendPhoto: a media group needs two to ten.
+    """
+    cache = get_asset_cache()
+    names = [name for name in names if cache.available(bot.id, name)]
+    if not names:
+        return False
+
+    for attempt in range(2):
+        photos = []
+        uploads = []
+        try:
+            for name in names:
+                file_id = cache.get(bot.id, name)
+                if file_id:
+                    photos.append(file_id)
+                else:
+                    handle = open(cache.path(name), 'rb')
+                    uploads.append(handle)
+                    photos.append(handle)
+            if len(photos) == 1:
+                messages = [await bot.send_photo(chat_id=chat_id, photo=photos[0])]
+            else:
+                messages = await bot.send_media_group(chat_id=chat_id, media=[InputMediaPhoto(photo) for photo in photos])
+        except Exception as e:
+            if attempt or not any(cache.get(bot.id, name) for name in names):
+                raise
+            # A stale file_id (e.g. rotated bot), upload the files again
+            logger.warning(f"Cached images rejected, uploading again: {e}")
+            cache.forget(bot.id, names)
+            continue
+        finally:
+            for handle in uploads:
+                handle.close()
+
+        for name, message in zip(names, messages):
+            if message.photo and not cache.get(bot.id, name):
+                cache.set(bot.id, name, message.photo[-1].file_id)
+                logger.info(f"Cached Telegram file_id for {name}")
+        return True
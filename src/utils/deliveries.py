@@ -0,0 +1,78 @@
+import time
+import threading
+import logging
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DELIVERED_KEYS = 10000  # Delivery keys remembered for idempotency
+
+class DeliveryLog:
+    """Keys of the notifications already delivered, shared by every process and kept across restarts."""
+
+    def __init__(self, path=None, max_keys=DELIVERED_KEYS):
+        self.max_keys = max_keys
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS delivered_notifications ("
+                " key TEXT PRIMARY KEY,"
+                " delivered_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS delivered_notifications_age ON delivered_notifications (delivered_at)"
+            )
+            self._conn.commit()
+
+    def add(self, key, now=None):
+        """Record a delivered notification, forgetting the oldest keys beyond max_keys."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO delivered_notifications (key, delivered_at) VALUES (?, ?)", (key, now)
+            )
+            self._conn.execute(
+                "DELETE FROM delivered_notifications WHERE key IN ("
+                " SELECT key FROM delivered_notifications ORDER BY delivered_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_keys,)
+            )
+            self._conn.commit()
+
+    def delivered(self, keys):
+        """Return the subset of keys already delivered."""
+        keys = list(keys)
+        delivered = set()
+        with self._lock:
+            # SQLite caps the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                delivered.update(key for (key,) in self._conn.execute(
+                    f"SELECT key FROM delivered_notifications WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+        return delivered
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM delivered_notifications WHERE key = ?", (key,)
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM delivered_notifications").fetchone()
+        return count
+
+_delivery_log = None
+_delivery_log_lock = threading.Lock()
+
+def get_delivery_log():
+    """Return the shared delivery log, opening it lazily."""
+    global _delivery_log
+    if _delivery_log is None:
+        with _delivery_log_lock:
+            if _delivery_log is None:
+                _delivery_log = DeliveryLog()
+    return _delivery_log
@@ -0,0 +1,178 @@
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from telegram.ext import BasePersistence, PersistenceInput
+from src.config import DRAFT_MAX, DRAFT_TTL
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CONVERSATION_SAVE_INTERVAL = 5  # Seconds between saves of the conversation states
+
+class TicketDraft:
+    """A ticket being filled in through the conversation."""
+    __slots__ = ('category', 'description', 'identifiant', 'priority', 'user', 'chat_id', 'timestamp', 'similar_to', 'touched_at')
+
+    def __init__(self):
+        self.category = None
+        self.description = None
+        self.identifiant = None
+        self.priority = None
+        self.user = None
+        self.chat_id = None
+        self.timestamp = None
+        self.similar_to = None  # Open ticket offered as a likely duplicate
+        self.touched_at = time.monotonic()
+
+    def as_ticket(self):
+        """Return the ticket dict expected by store_ticket and send_admin_email."""
+        return {
+            'category': self.category,
+            'description': self.description,
+            'identifiant': self.identifiant,
+            'priority': self.priority,
+            'user': self.user,
+            'chat_id': self.chat_id,
+            'timestamp': self.timestamp,
+            'similar_to': self.similar_to,
+        }
+
+    @classmethod
+    def from_ticket(cls, values):
+        draft = cls()
+        for name, value in values.items():
+            setattr(draft, name, value)
+        return draft
+
+class DraftStore:
+    """Per-chat ticket drafts, capped in size and evicted after an idle TTL."""
+
+    def __init__(self, max_drafts=DRAFT_MAX, ttl=DRAFT_TTL):
+        self.max_drafts = max_drafts
+        self.ttl = ttl
+        self.evicted = 0
+        # Ordered by last activity, oldest first
+        self._drafts = OrderedDict()
+
+    def start(self, chat_id):
+        """Begin a fresh draft for a chat, replacing any previous one."""
+        self._evict()
+        draft = TicketDraft()
+        self._drafts[chat_id] = draft
+        self._drafts.move_to_end(chat_id)
+        while len(self._drafts) > self.max_drafts:
+            self._drafts.popitem(last=False)
+            self.evicted += 1
+        return draft
+
+    def get(self, chat_id):
+        """Return the chat's draft and mark it active, or None if it expired."""
+        self._evict()
+        draft = self._drafts.get(chat_id)
+        if draft is not None:
+            draft.touched_at = time.monotonic()
+            self._drafts.move_to_end(chat_id)
+        return draft
+
+    def pop(self, chat_id):
+        return self._drafts.pop(chat_id, None)
+
+    def _evict(self, now=None):
+        now = time.monotonic() if now is None else now
+        while self._drafts:
+            chat_id, draft = next(iter(self._drafts.items()))
+            if now - draft.touched_at < self.ttl:
+                break
+            del self._drafts[chat_id]
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._drafts)
+
+class SQLitePersistence(BasePersistence):
+    """Persists ConversationHandler states in the local state database, and nothing else.
+
+    Each chat is served by one worker (see src.cluster.chat_owner), which keeps
+    its conversation and draft in memory; the states stored here let a restarted
+    worker pick its conversations up again, and a conversation whose draft was
+    lost in the restart tells the user it expired.
+    """
+
+    def __init__(self, path=None, update_interval=CONVERSATION_SAVE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=False, callback_data=False),
+            update_interval=update_interval
+        )
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " name TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " state INTEGER NOT NULL,"
+                " PRIMARY KEY (name, key))"
+            )
+            self._conn.commit()
+
+    async def get_conversations(self, name):
+        with self._lock:
+            rows = self._conn.execute("SELECT key, state FROM conversations WHERE name = ?", (name,)).fetchall()
+        return {tuple(json.loads(key)): state for key, state in rows}
+
+    async def update_conversation(self, name, key, new_state):
+        with self._lock:
+            if new_state is None:
+                self._conn.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, json.dumps(list(key))))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                    (name, json.dumps(list(key)), new_state)
+                )
+            self._conn.commit()
+
+    # Only conversations are stored (see store_data), the Application never calls the rest
+    async def get_user_data(self):
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_user_data(self, user_id, data):
+        pass
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def drop_user_data(self, user_id):
+        pass
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        pass
@@ -0,0 +1,320 @@
+"""
+Near-duplicate detection: during an outage many agents report the same problem
+within minutes. A new description is compared with the open tickets of the same
+category so that the reporter can follow the existing ticket instead.
+
+Descriptions are reduced to sets of word stems and MinHash signatures, computed
+with one-permutation hashing: one hash per word instead of one per word and
+permutation. Bands of each signature are bucketed per category (LSH), so a
+lookup only compares the few tickets sharing a bucket, however many are open,
+and confirms them with the exact share of common words.
+"""
+import array
+import random
+import asyncio
+import threading
+import logging
+from src.config import DUPLICATE_DETECTION, DUPLICATE_THRESHOLD
+from src.utils.sheets import read_columns, fetch_rows, load_ticket_index, BACKGROUND
+from src.utils.ticket_index import ticket_index
+from src.utils.poller import RESOLVED_STATUSES
+from src.utils.search import fold, tokenize
+from src.utils import ticket_feed
+from src.utils import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BANDS = 12
+ROWS = 3  # Signature values per band; tickets about 50% alike share a band 80% of the time
+BINS = BANDS * ROWS
+STEM_LENGTH = 6  # 'synchroniser' and 'synchronisation' both become 'synchr'
+STOPWORDS = frozenset((
+    'les', 'des', 'une', 'pas', 'est', 'que', 'qui', 'pour', 'dans', 'sur', 'avec', 'mon', 'mes',
+    'par', 'aux', 'son', 'ses', 'sont', 'cette', 'plus', 'tout', 'tous', 'nous', 'vous', 'elle',
+))
+CLOSED_STATUSES = frozenset(RESOLVED_STATUSES + ('En Attente de Confirmation', 'Résolu Confirmé'))
+MAX_CANDIDATES = 1000  # Bounds the comparisons of one lookup when a bucket holds a whole outage
+SNIPPET_LENGTH = 80
+REBUILD_ROWS = 500  # Above this many unindexed rows, rebuild instead of fetching them one by one
+
+_MASK = (1 << 64) - 1
+_EMPTY = 1 << 64
+# Fixed order in which each empty bin looks for a filled one to borrow from
+_PROBES = [random.Random(bin_).sample(range(BINS), BINS) for bin_ in range(BINS)]
+
+def stems(text):
+    """The set of word stems of a description, without stop words."""
+    return {word[:STEM_LENGTH] for word in tokenize(text) if len(word) >= 3 and word not in STOPWORDS}
+
+def word_hashes(words):
+    """Sorted 64-bit hashes of a set of words, the compact form kept per ticket."""
+    return array.array('Q', sorted(hash(word) & _MASK for word in words))
+
+def signature(hashes):
+    """One-permutation MinHash signature of a set of word hashes.
+
+    Each word lands in one bin and each bin keeps its smallest hash. An empty
+    bin borrows from the first filled bin of its probe order, the same for
+    every ticket, so short descriptions still agree bin by bin about as often
+    as their words do.
+    """
+    values = [_EMPTY] * BINS
+    for h in hashes:
+        bin_ = h % BINS
+        if h < values[bin_]:
+            values[bin_] = h
+    if _EMPTY in values:
+        filled = list(values)
+        for bin_, value in enumerate(values):
+            if value == _EMPTY:
+                filled[bin_] = next(values[probe] for probe in _PROBES[bin_] if values[probe] != _EMPTY)
+        values = filled
+    return values
+
+def similarity(first, second):
+    """Jaccard similarity of two sets of word hashes: common words over all words."""
+    common = len(set(first).intersection(second))
+    return common / (len(first) + len(second) - common)
+
+def _band_keys(category, hashes):
+    sig = signature(hashes)
+    return [hash((category, band, *sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+class DuplicateIndex:
+    """LSH index of the open tickets' descriptions, per category.
+
+    Buckets hold a single ticket ID or, once shared, a list of them. Closed
+    tickets are dropped when seen closed and skipped at lookup in between.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.built = False
+        self._tickets = {}  # ticket_id -> (folded category, word hashes, chat_id, category, snippet)
+        self._buckets = {}  # band key -> ticket_id or [ticket_id, ...]
+        self._skipped = set()  # Open tickets whose description has no usable words
+        self._lock = threading.Lock()
+        # Metrics
+        self.lookups = 0
+        self.matches = 0
+        self.rebuilds = 0
+
+    def add(self, ticket):
+        """Index an open ticket (header → value dict), or drop it once closed."""
+        ticket_id = str(ticket.get('ticket_id', '')).strip()
+        if not ticket_id:
+            return
+        if str(ticket.get('status', '')).strip() in CLOSED_STATUSES:
+            self.discard([ticket_id])
+            return
+        description = str(ticket.get('description', '') or '')
+        hashes = word_hashes(stems(description))
+        label = str(ticket.get('category', '') or '')
+        category = fold(label)
+        with self._lock:
+            previous = self._tickets.get(ticket_id)
+            if previous is not None:
+                if previous[0] == category and previous[1] == hashes:
+                    return
+                self._remove(ticket_id, previous)
+            if not hashes:
+                self._skipped.add(ticket_id)
+                return
+            self._skipped.discard(ticket_id)
+            chat_id = str(ticket.get('chat_id', '')).strip()
+            self._tickets[ticket_id] = (category, hashes, chat_id, label, description[:SNIPPET_LENGTH])
+            for key in _band_keys(category, hashes):
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    self._buckets[key] = ticket_id
+                elif isinstance(bucket, str):
+                    self._buckets[key] = [bucket, ticket_id]
+                else:
+                    bucket.append(ticket_id)
+
+    def add_row(self, ticket_id, headers, values):
+        """TicketIndex listener: index a complete row as it is recorded."""
+        self.add(dict(zip(headers, values)))
+
+    def discard(self, ticket_ids):
+        """Drop closed tickets from the index."""
+        with self._lock:
+            for ticket_id in ticket_ids:
+                self._skipped.discard(ticket_id)
+                entry = self._tickets.get(ticket_id)
+                if entry is not None:
+                    self._remove(ticket_id, entry)
+
+    def _remove(self, ticket_id, entry):
+        del self._tickets[ticket_id]
+        for key in _band_keys(entry[0], entry[1]):
+            bucket = self._buckets.get(key)
+            if bucket == ticket_id:
+                del self._buckets[key]
+            elif isinstance(bucket, list) and ticket_id in bucket:
+                bucket.remove(ticket_id)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket[0]
+
+    def load(self, tickets):
+        """Replace the index with `tickets` (header → value dicts), skipping closed ones."""
+        fresh = DuplicateIndex(self.threshold)
+        for ticket in tickets:
+            fresh.add(ticket)
+        with self._lock:
+            self._tickets, self._buckets, self._skipped = fresh._tickets, fresh._buckets, fresh._skipped
+            self.built = True
+            self.rebuilds += 1
+        logger.info(f"Duplicate index built with {len(self._tickets)} open tickets")
+
+    def find(self, category, description, exclude_chat=None, limit=3):
+        """Return the open tickets of `category` most similar to `description`, best first.
+
+        Each match is a dict with ticket_id, similarity and the start of the
+        description. Tickets reported from `exclude_chat` are left out.
+        """
+        self.lookups += 1
+        with metrics.operation_seconds.time(operation='find_duplicates'):
+            hashes = word_hashes(stems(description))
+            if not hashes:
+                return []
+            category = fold(category or '')
+            keys = _band_keys(category, hashes)
+            with self._lock:
+                candidates = set()
+                for key in keys:
+                    bucket = self._buckets.get(key)
+                    if bucket is None:
+                        continue
+                    if isinstance(bucket, str):
+                        candidates.add(bucket)
+                    else:
+                        candidates.update(bucket[-MAX_CANDIDATES:])  # The newest tickets of a large bucket
+                    if len(candidates) >= MAX_CANDIDATES:
+                        break
+                scored = []
+                for ticket_id in candidates:
+                    entry = self._tickets[ticket_id]
+                    if entry[0] != category or (exclude_chat is not None and entry[2] == str(exclude_chat)):
+                        continue
+                    score = similarity(hashes, entry[1])
+                    if score >= self.threshold:
+                        scored.append((score, ticket_id, entry[4]))
+            # Tickets closed since the last refresh are skipped here
+            matches = [
+                {'ticket_id': ticket_id, 'similarity': round(score, 2), 'description': snippet}
+                for score, ticket_id, snippet in sorted(scored, reverse=True)
+                if ticket_index.value(ticket_id, 'status').strip() not in CLOSED_STATUSES
+            ][:limit]
+        if matches:
+            self.matches += 1
+        return matches
+
+    def clusters(self, min_size=2):
+        """Group the open tickets that are alike, largest groups first.
+
+        Each group is a dict with the category, the ticket IDs (newest first)
+        and the start of the newest description.
+        """
+        parent = {}
+
+        def root(ticket_id):
+            while parent.setdefault(ticket_id, ticket_id) != ticket_id:
+                ticket_id = parent[ticket_id]
+            return ticket_id
+
+        with self._lock:
+            # Comparing each bucket member with the first keeps this linear in the index size
+            for bucket in self._buckets.values():
+                if isinstance(bucket, str):
+                    continue
+                first = self._tickets[bucket[0]]
+                for ticket_id in bucket[1:]:
+                    entry = self._tickets[ticket_id]
+                    if entry[0] == first[0] and similarity(first[1], entry[1]) >= self.threshold:
+                        parent[root(ticket_id)] = root(bucket[0])  # No-op when already grouped
+            groups = {}
+            for ticket_id in list(parent):
+                groups.setdefault(root(ticket_id), set()).add(ticket_id)
+            clusters = []
+            for members in groups.values():
+                members = sorted(
+                    (ticket_id for ticket_id in members
+                     if ticket_index.value(ticket_id, 'status').strip() not in CLOSED_STATUSES),
+                    reverse=True
+                )
+                if len(members) >= min_size:
+                    _, _, _, category, snippet = self._tickets[members[0]]
+                    clusters.append({'category': category, 'ticket_ids': members, 'description': snippet})
+        clusters.sort(key=lambda cluster: len(cluster['ticket_ids']), reverse=True)
+        return clusters
+
+    def __contains__(self, ticket_id):
+        return ticket_id in self._tickets or ticket_id in self._skipped
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def stats(self):
+        return {
+            'tickets': len(self._tickets),
+            'buckets': len(self._buckets),
+            'lookups': self.lookups,
+            'matches': self.matches,
+            'rebuilds': self.rebuilds,
+        }
+
+duplicate_index = DuplicateIndex()
+
+async def rebuild_duplicate_index():
+    """Build the duplicate index from one projected read of the ticket sheet."""
+    columns = await read_columns(('ticket_id', 'chat_id', 'category', 'description', 'status'), lane=BACKGROUND)
+    tickets = [
+        {name: columns[name][offset] for name in columns.data}
+        for offset in range(len(columns))
+    ]
+    # Hashing every description takes a moment at tens of thousands of tickets
+    await asyncio.get_event_loop().run_in_executor(None, duplicate_index.load, tickets)
+
+def discard_closed(statuses):
+    """Ticket feed handler: drop the tickets the leader saw closed."""
+    duplicate_index.discard([ticket_id for ticket_id, status in statuses if status in CLOSED_STATUSES])
+
+async def refresh_duplicate_index():
+    """Drop tickets closed since the last refresh and index those created by other processes.
+
+    Run by the leader only: what it finds reaches the other workers through the ticket feed.
+    """
+    if not duplicate_index.built:
+        await rebuild_duplicate_index()
+        return
+    if not ticket_index.loaded:
+        await load_ticket_index(BACKGROUND)  # Its header row labels the rows fetched below
+    columns = await read_columns(('ticket_id', 'status'), lane=BACKGROUND)
+    closed, missing = [], []
+    for offset, ticket_id in enumerate(columns['ticket_id']):
+        ticket_id = str(ticket_id).strip()
+        if not ticket_id:
+            continue
+        status = str(columns['status'][offset]).strip()
+        if status in CLOSED_STATUSES:
+            if ticket_id in duplicate_index:
+                closed.append((ticket_id, status))
+        elif ticket_id not in duplicate_index:
+            missing.append(offset + 2)
+    discard_closed(closed)
+    await ticket_feed.publish(ticket_feed.STATUSES, closed)
+    if len(missing) > REBUILD_ROWS:
+        await rebuild_duplicate_index()
+        await ticket_feed.publish(ticket_feed.REBUILD, 'duplicates')
+    elif missing:
+        # Complete rows reach the duplicate index through the ticket index listener
+        await ticket_feed.publish_rows(await fetch_rows(missing, lane=BACKGROUND))
+    if closed or missing:
+        logger.info(f"Duplicate index: {len(closed)} tickets closed, {len(missing)} new")
+
+if DUPLICATE_DETECTION:
+    ticket_index.subscribe(duplicate_index.add_row)
+    ticket_feed.on_statuses(discard_closed)
+    ticket_feed.on_rebuild('duplicates', rebuild_duplicate_index)
@@ -1,17 +1,27 @@
 import smtplib
 import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from src.config import EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD, GOOGLE_SHEET_ID, ADMIN_EMAILS
+from src.config import (
+    EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD, GOOGLE_SHEET_ID, ADMIN_EMAILS,
+    EMAIL_DIGEST_WINDOW, EMAIL_DIGEST_MAX, EMAIL_QUEUE_SIZE
+)
+from src.utils import metrics
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-async def send_admin_email(admin_emails, ticket_data):
-    """Sends notification email to all admins."""
-    sheet_url = f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}"
-    
+SEND_ATTEMPTS = 3
+NOOP_AFTER = 60  # Seconds idle before checking the connection is still alive
+DRAIN_TIMEOUT = 30  # Seconds given at shutdown to send what is still queued
+
+def _sheet_url():
+    return f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}"
+
+def _ticket_message(admin_emails, ticket_data):
+    """Build the notification email for a single ticket."""
     msg = MIMEText(
         f"Campagne MILDA SUPPORT - Nouveau ticket créé:\n\n"
         f"Numéro de Ticket: {ticket_data['ticket_id']}\n"
@@ -19,31 +29,245 @@ async def send_admin_email(admin_emails, ticket_data):
         f"Description: {ticket_data['description']}\n"
         f"Identifiant: {ticket_data['identifiant']}\n"
         f"Priorité: {ticket_data['priority']}\n"
-        f"Chat ID: {ticket_data.get('chat_id', 'N/A')}\n\n"
-        f"Voir tous les tickets ici: {sheet_url}"
+        f"Chat ID: {ticket_data.get('chat_id', 'N/A')}\n"
+        + (f"Ticket similaire ouvert: {ticket_data['similar_to']}\n" if ticket_data.get('similar_to') else "")
+        + f"\nVoir tous les tickets ici: {_sheet_url()}"
     )
     
     msg['Subject'] = f"Nouveau Ticket: {ticket_data['ticket_id']}"
     msg['From'] = EMAIL_USER
     msg['To'] = ', '.join(admin_emails)  # Join all admin emails
-    
-    try:
-        # Run email sending in a thread pool to not block
-        await asyncio.get_event_loop().run_in_executor(None, _send_email, msg)
-        logger.info(f"Successfully sent email notification for ticket {ticket_data['ticket_id']} to all admins")
-        return True
-    except Exception as e:
-        logger.error(f"Error sending email: {e}", exc_info=True)
+    return msg
+
+def _clusters(tickets):
+    """Group tickets reported as alike: each with the open ticket it resembles, in order of arrival."""
+    clusters = {}
+    for ticket_data in tickets:
+        key = ticket_data.get('similar_to') or ticket_data['ticket_id']
+        clusters.setdefault(key, []).append(ticket_data)
+    return clusters
+
+def _digest_message(admin_emails, tickets):
+    """Build one email covering several tickets created in a burst, alike tickets grouped together."""
+    sections = []
+    for key, cluster in _clusters(tickets).items():
+        if len(cluster) > 1 or cluster[0].get('similar_to'):
+            sections.append(f"--- {len(cluster)} ticket(s) similaire(s) au ticket {key} ---")
+        sections.extend(
+            f"Numéro de Ticket: {ticket_data['ticket_id']}\n"
+            f"Catégorie: {ticket_data['category']}\n"
+            f"Description: {ticket_data['description']}\n"
+            f"Identifiant: {ticket_data['identifiant']}\n"
+            f"Priorité: {ticket_data['priority']}\n"
+            f"Chat ID: {ticket_data.get('chat_id', 'N/A')}"
+            for ticket_data in cluster
+        )
+    msg = MIMEText(
+        f"Campagne MILDA SUPPORT - {len(tickets)} nouveaux tickets créés:\n\n"
+        + "\n\n".join(sections)
+        + f"\n\nVoir tous les tickets ici: {_sheet_url()}"
+    )
+    ticket_ids = ', '.join(ticket_data['ticket_id'] for ticket_data in tickets)
+    msg['Subject'] = f"{len(tickets)} Nouveaux Tickets: {ticket_ids}"
+    msg['From'] = EMAIL_USER
+    msg['To'] = ', '.join(admin_emails)
+    return msg
+
+class SMTPConnection:
+    """Long-lived SMTP connection that reconnects when the server drops it."""
+
+    def __init__(self, host=EMAIL_HOST, port=EMAIL_PORT, user=EMAIL_USER, password=EMAIL_PASSWORD, require_tls=True):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        # Only a local test server may go without STARTTLS, the credentials must never travel in clear
+        self.require_tls = require_tls
+        self.connects = 0
+        self.sent = 0
+        self._server = None
+        self._last_used = 0
+
+    def _connect(self):
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        server.ehlo()
+        if self.require_tls or server.has_extn('starttls'):
+            server.starttls()  # Raises SMTPNotSupportedError when the server does not offer it
+            server.ehlo()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        self._server = server
+        self.connects += 1
+        logger.info(f"Connected to SMTP server {self.host}:{self.port}")
+
+    def _alive(self):
+        if self._server is None:
+            return False
+        if time.monotonic() - self._last_used < NOOP_AFTER:
+            return True
+        try:
+            return self._server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, msg):
+        """Send a message, reconnecting once if the connection went stale."""
+        for attempt in range(2):
+            if not self._alive():
+                self._connect()
+            try:
+                self._server.send_message(msg)
+                self._last_used = time.monotonic()
+                self.sent += 1
+                return
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                logger.warning(f"SMTP connection lost ({e}), reconnecting")
+                self._server = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+class EmailDispatcher:
+    """Queues admin notifications and sends them over one SMTP connection.
+
+    Non-urgent tickets created within EMAIL_DIGEST_WINDOW seconds of each
+    other are merged into a single digest; Urgent tickets go out at once.
+    """
+
+    def __init__(self, connection=None, window=EMAIL_DIGEST_WINDOW, max_batch=EMAIL_DIGEST_MAX, queue_size=EMAIL_QUEUE_SIZE):
+        self.connection = connection or SMTPConnection()
+        self.window = window
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.emails_sent = 0
+        self.digests_sent = 0
+        self.failures = 0
+        self._queue = None
+        self._worker = None
+        self._closing = False
+        # SMTP is blocking and the connection is not thread-safe, so it gets one thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='smtp')
+
+    def enqueue(self, admin_emails, ticket_data):
+        """Queue a ticket notification; return False if the queue is full or closed."""
+        if self._closing:
+            logger.error(f"Email dispatcher closed, dropping notification for ticket {ticket_data['ticket_id']}")
+            return False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_event_loop().create_task(self._run())
+        try:
+            self._queue.put_nowait((list(admin_emails), ticket_data))
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"Email queue full, dropping notification for ticket {ticket_data['ticket_id']}")
+            return False
+
+    @staticmethod
+    def _urgent(ticket_data):
+        return ticket_data.get('priority') == 'Urgent'
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:  # Closing, and everything before it was sent
+                return
+            admin_emails, ticket_data = item
+            if self._urgent(ticket_data):
+                await self._send(admin_emails, [ticket_data])
+                continue
+
+            # Gather the rest of the burst
+            batch = [ticket_data]
+            deadline = loop.time() + self.window
+            closing = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    closing = True  # Send the burst now rather than at the end of the window
+                    break
+                next_emails, next_ticket = item
+                if self._urgent(next_ticket):
+                    await self._send(next_emails, [next_ticket])
+                else:
+                    batch.append(next_ticket)
+            await self._send(admin_emails, batch)
+            if closing:
+                return
+
+    async def _send(self, admin_emails, tickets):
+        if len(tickets) == 1:
+            msg = _ticket_message(admin_emails, tickets[0])
+        else:
+            msg = _digest_message(admin_emails, tickets)
+        ticket_ids = ', '.join(ticket_data['ticket_id'] for ticket_data in tickets)
+
+        for attempt in range(SEND_ATTEMPTS):
+            try:
+                with metrics.smtp_send_seconds.time():
+                    await asyncio.get_event_loop().run_in_executor(self._executor, self.connection.send, msg)
+                self.emails_sent += 1
+                if len(tickets) > 1:
+                    self.digests_sent += 1
+                metrics.emails_sent.inc(kind='digest' if len(tickets) > 1 else 'single')
+                logger.info(f"Successfully sent email notification for tickets {ticket_ids} to all admins")
+                return True
+            except Exception as e:
+                metrics.smtp_errors.inc()
+                logger.error(f"Error sending email (attempt {attempt + 1}): {e}", exc_info=True)
+                if attempt + 1 < SEND_ATTEMPTS:
+                    await asyncio.sleep(2 ** attempt)
+        self.failures += 1
         return False
 
-def _send_email(msg):
-    """Helper function to send email synchronously."""
-    try:
-        with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
-            server.send_message(msg)
-            logger.info("Email sent successfully")
-    except Exception as e:
-        logger.error(f"Error in _send_email: {e}", exc_info=True)
-        raise
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        return {
+            'pending': self.pending(),
+            'emails_sent': self.emails_sent,
+            'digests_sent': self.digests_sent,
+            'failures': self.failures,
+            'connects': self.connection.connects,
+        }
+
+    async def close(self, timeout=DRAIN_TIMEOUT):
+        """Send the queued notifications, then stop the worker and close the SMTP connection."""
+        self._closing = True
+        if self._worker is not None and not self._worker.done():
+            async def drain():
+                await self._queue.put(None)
+                await self._worker
+            try:
+                await asyncio.wait_for(drain(), timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Email queue not drained after {timeout}s, dropping {self.pending()} notifications")
+                self._worker.cancel()
+        await asyncio.get_event_loop().run_in_executor(self._executor, self.connection.close)
+
+email_dispatcher = EmailDispatcher()
+metrics.queue_depth.track(email_dispatcher.pending, queue='email')
+
+@metrics.timed_operation()
+async def send_admin_email(admin_emails, ticket_data):
+    """Queues a notification email to all admins."""
+    return email_dispatcher.enqueue(admin_emails or ADMIN_EMAILS, ticket_data)
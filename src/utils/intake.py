@@ -0,0 +1,114 @@
+"""
+Status intake: an authenticated HTTP endpoint through which an on-edit sheet
+trigger, or any admin tool, reports ticket status changes as they happen.
+
+POST {INTAKE_PATH} with `Authorization: Bearer <INTAKE_TOKEN>` and a JSON body
+`{"ticket_id": "...", "status": "..."}`, or a list of such objects.
+"""
+import hmac
+import logging
+from src.config import (
+    INTAKE_TOKEN, INTAKE_PATH, INTAKE_HOST, INTAKE_PORT, INTAKE_MAX_CHANGES, BOT_MODE
+)
+from src.utils.ticket_ids import normalize_ticket_id
+from src.utils import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class StatusIntake:
+    """Validates pushed status changes and hands each one to `on_change(ticket_id, status)`.
+
+    `on_change` returns a short outcome string ('notified', 'recorded', ...)
+    that is echoed back to the caller per ticket.
+    """
+
+    def __init__(self, on_change, token=INTAKE_TOKEN, path=INTAKE_PATH, max_changes=INTAKE_MAX_CHANGES):
+        self.on_change = on_change
+        self.token = token
+        self.path = path
+        self.max_changes = max_changes
+        # Metrics
+        self.received = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def add_routes(self, app):
+        app.router.add_post(self.path, self.handle)
+
+    def _authorized(self, request):
+        header = request.headers.get('Authorization', '')
+        return self.enabled and hmac.compare_digest(header, f'Bearer {self.token}')
+
+    def _parse(self, data):
+        """Return [(ticket_id, status)] from a request body, or raise ValueError."""
+        changes = data if isinstance(data, list) else [data]
+        if not changes or len(changes) > self.max_changes:
+            raise ValueError(f"expected 1 to {self.max_changes} changes")
+        parsed = []
+        for change in changes:
+            if not isinstance(change, dict):
+                raise ValueError("each change must be an object")
+            ticket_id = change.get('ticket_id')
+            status = change.get('status')
+            if not isinstance(ticket_id, str) or not ticket_id.strip():
+                raise ValueError("ticket_id is required")
+            if not isinstance(status, str) or not status.strip():
+                raise ValueError("status is required")
+            parsed.append((normalize_ticket_id(ticket_id), status.strip()))
+        return parsed
+
+    async def handle(self, request):
+        from aiohttp import web
+        if not self._authorized(request):
+            self.rejected += 1
+            metrics.intake_changes.inc(outcome='unauthorized')
+            logger.warning("Rejected status intake request with an invalid token")
+            return web.Response(status=401)
+
+        try:
+            changes = self._parse(await request.json())
+        except ValueError as e:
+            self.rejected += 1
+            metrics.intake_changes.inc(outcome='invalid')
+            return web.json_response({'error': str(e)}, status=400)
+
+        results = {}
+        for ticket_id, status in changes:
+            try:
+                outcome = await self.on_change(ticket_id, status)
+            except Exception as e:
+                logger.error(f"Error applying status change {ticket_id} -> {status}: {e}", exc_info=True)
+                outcome = 'error'
+            results[ticket_id] = outcome
+            metrics.intake_changes.inc(outcome=outcome)
+            logger.info(f"Status intake: {ticket_id} -> {status} ({outcome})")
+        self.received += len(changes)
+        # The caller retries the whole request when any change failed, outcomes are idempotent
+        status = 503 if 'error' in results.values() else 200
+        return web.json_response({'results': results}, status=status)
+
+    def stats(self):
+        return {'enabled': self.enabled, 'received': self.received, 'rejected': self.rejected}
+
+async def start_intake_server(intake, host=INTAKE_HOST, port=INTAKE_PORT, add_routes=()):
+    """Serve the intake, and the other admin routes given, on their own port in polling mode.
+
+    In webhook mode the routes are served by the webhook server instead.
+    """
+    if not (intake.enabled or add_routes) or BOT_MODE == 'webhook':
+        return None
+    from aiohttp import web
+    app = web.Application(client_max_size=64 * 1024)
+    if intake.enabled:
+        intake.add_routes(app)
+    for add in add_routes:
+        add(app)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Admin API listening on http://{host}:{port}")
+    return runner
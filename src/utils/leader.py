@@ -0,0 +1,98 @@
+import os
+import time
+import uuid
+import socket
+import functools
+import threading
+import logging
+from src.config import LEADER_LEASE_TTL
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class LeaderLease:
+    """Time-limited lease in the local state database; its holder runs the periodic jobs.
+
+    The holder renews the lease well before it expires. If it dies, the lease
+    lapses and the next process to renew takes over.
+    """
+
+    def __init__(self, name='periodic_jobs', ttl=LEADER_LEASE_TTL, path=None, holder=None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.transitions = 0
+        self._leader = False
+        self._valid_until = 0
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " name TEXT PRIMARY KEY,"
+                " holder TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def renew(self, now=None):
+        """Take or extend the lease if it is ours or has expired; return whether we hold it."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at"
+                " WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+                (self.name, self.holder, now + self.ttl, now)
+            )
+            (holder,) = self._conn.execute("SELECT holder FROM leases WHERE name = ?", (self.name,)).fetchone()
+            self._conn.commit()
+
+        leader = holder == self.holder
+        if leader != self._leader:
+            self.transitions += 1
+            if leader:
+                logger.info(f"{self.holder} is now the leader for {self.name}")
+            else:
+                logger.info(f"{self.holder} is no longer the leader for {self.name}, {holder} is")
+        self._leader = leader
+        self._valid_until = now + self.ttl if leader else 0
+        return leader
+
+    def is_leader(self, now=None):
+        """Whether we hold an unexpired lease, without touching the database."""
+        now = time.time() if now is None else now
+        return self._leader and now < self._valid_until
+
+    def release(self):
+        """Give the lease up at shutdown so another process takes over at once."""
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+            self._conn.commit()
+        self._leader = False
+        self._valid_until = 0
+
+    def stats(self):
+        return {'holder': self.holder, 'leader': self.is_leader(), 'transitions': self.transitions}
+
+_leader = None
+_leader_lock = threading.Lock()
+
+def get_leader():
+    """Return this process's lease, opening it lazily."""
+    global _leader
+    if _leader is None:
+        with _leader_lock:
+            if _leader is None:
+                _leader = LeaderLease()
+    return _leader
+
+def leader_only(job):
+    """Decorator for job callbacks that must run in one process only."""
+    @functools.wraps(job)
+    async def wrapper(*args, **kwargs):
+        if not get_leader().is_leader():
+            return None
+        return await job(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,266 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Counters and histograms are plain dicts behind a lock, cheap enough to leave on
+in production. Queue depths are read from callbacks at scrape time.
+"""
+import time
+import hmac
+import bisect
+import functools
+import threading
+import logging
+from src.config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT, METRICS_TOKEN, BOT_MODE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f'{self.name}{_labels(self.labelnames, key)} {_number(value)}' for key, value in values
+        ]
+
+class Gauge(_Metric):
+    """Gauge whose values come from callbacks, one per label set, read at scrape time."""
+    kind = 'gauge'
+
+    def track(self, func, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = func
+
+    def render(self):
+        with self._lock:
+            callbacks = sorted(self._values.items())
+        lines = self.header()
+        for key, func in callbacks:
+            try:
+                value = func()
+            except Exception as e:
+                logger.warning(f"Metric {self.name}{key} unavailable: {e}")
+                continue
+            lines.append(f'{self.name}{_labels(self.labelnames, key)} {_number(value)}')
+        return lines
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (not cumulative) plus +Inf, then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+# Handlers and jobs
+handler_seconds = registry.register(Histogram(
+    'milda_handler_seconds', 'Time spent in Telegram handlers and periodic jobs.', ['handler']))
+handler_errors = registry.register(Counter(
+    'milda_handler_errors_total', 'Exceptions raised by handlers and periodic jobs.', ['handler']))
+operation_seconds = registry.register(Histogram(
+    'milda_operation_seconds', 'Time spent in internal steps such as store_ticket.', ['operation']))
+
+# Google Sheets
+sheets_call_seconds = registry.register(Histogram(
+    'milda_sheets_call_seconds', 'Google Sheets call duration, including executor queueing.', ['operation', 'lane']))
+sheets_errors = registry.register(Counter(
+    'milda_sheets_errors_total', 'Failed Google Sheets calls.', ['operation']))
+rate_limiter_wait_seconds = registry.register(Histogram(
+    'milda_rate_limiter_wait_seconds', 'Time spent waiting for the Sheets rate limiter.', ['lane']))
+
+# Email
+smtp_send_seconds = registry.register(Histogram(
+    'milda_smtp_send_seconds', 'SMTP send duration per attempt.'))
+emails_sent = registry.register(Counter(
+    'milda_emails_sent_total', 'Admin emails sent.', ['kind']))
+smtp_errors = registry.register(Counter(
+    'milda_smtp_errors_total', 'Failed SMTP send attempts.'))
+
+# Telegram
+telegram_send_seconds = registry.register(Histogram(
+    'milda_telegram_send_seconds', 'Telegram sendMessage duration for queued notifications.'))
+telegram_sends = registry.register(Counter(
+    'milda_telegram_sends_total', 'Telegram notification send attempts by outcome.', ['outcome']))
+
+# Backlogs, read when scraped
+queue_depth = registry.register(Gauge(
+    'milda_queue_depth', 'Items waiting in internal queues.', ['queue']))
+
+# Resolved-ticket sweep scheduler
+sweep_interval_seconds = registry.register(Gauge(
+    'milda_sweep_interval_seconds', 'Current interval of adaptive periodic jobs.', ['job']))
+sweep_runs = registry.register(Counter(
+    'milda_sweep_runs_total', 'Adaptive periodic job runs by outcome.', ['job', 'outcome']))
+
+# Status intake endpoint
+intake_changes = registry.register(Counter(
+    'milda_intake_changes_total', 'Status changes received by the intake endpoint, by outcome.', ['outcome']))
+
+# Near-duplicate detection
+duplicate_offers = registry.register(Counter(
+    'milda_duplicate_offers_total', 'Existing tickets offered to reporters instead of a new one, by outcome.', ['outcome']))
+
+def instrument(name=None, histogram=handler_seconds, errors=handler_errors, label='handler'):
+    """Decorator recording the duration and exceptions of an async function."""
+    def decorator(func):
+        metric_name = name or func.__name__
+        labels = {label: metric_name}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def timed_operation(name=None):
+    """Decorator for internal steps, recorded in milda_operation_seconds."""
+    return instrument(name, histogram=operation_seconds, errors=None, label='operation')
+
+def _authorized(request):
+    if not METRICS_TOKEN:
+        return True
+    header = request.headers.get('Authorization', '')
+    return hmac.compare_digest(header, f'Bearer {METRICS_TOKEN}')
+
+async def handle_metrics(request):
+    """aiohttp handler serving the registry."""
+    from aiohttp import web
+    if not _authorized(request):
+        return web.Response(status=401)
+    return web.Response(body=registry.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+async def start_metrics_server(application=None, host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics on its own port; usable as an Application post_init hook.
+
+    In webhook mode the route is served by the webhook server instead.
+    """
+    if not METRICS_ENABLED or BOT_MODE == 'webhook':
+        return None
+    from aiohttp import web
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Metrics are not worth keeping the bot down for
+        logger.error(f"Cannot serve metrics on {host}:{port}, continuing without them: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,194 @@
+import asyncio
+import time
+import logging
+from telegram.error import RetryAfter, BadRequest, Forbidden
+from src.config import TELEGRAM_WORKERS, TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_INTERVAL, TELEGRAM_SEND_ATTEMPTS
+from src.utils.sheets import TokenBucket
+from src.utils.deliveries import get_delivery_log, DELIVERED_KEYS
+from src.utils import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class Notification:
+    """One outbound message, identified by an idempotency key."""
+    __slots__ = ('key', 'chat_id', 'text', 'plain_text', 'reply_markup', 'parse_mode', 'tag', 'attempts', 'batch')
+
+    def __init__(self, key, chat_id, text, plain_text=None, reply_markup=None, parse_mode=None, tag=None):
+        self.key = key
+        self.chat_id = chat_id
+        self.text = text
+        self.plain_text = plain_text  # Sent instead if Telegram rejects the formatting
+        self.reply_markup = reply_markup
+        self.parse_mode = parse_mode
+        self.tag = tag  # Caller data, e.g. the ticket ID
+        self.attempts = 0
+        self.batch = None
+
+class _Batch:
+    __slots__ = ('bot', 'remaining', 'results', 'on_done')
+
+    def __init__(self, bot, remaining, on_done):
+        self.bot = bot
+        self.remaining = remaining
+        self.results = {}
+        self.on_done = on_done
+
+class TelegramDispatcher:
+    """Sends notifications from a bounded worker pool within Telegram's rate limits.
+
+    Delivered keys are kept in the state database (see src.utils.deliveries), so
+    a restart or another worker process does not send the same notification again.
+    """
+
+    def __init__(self, workers=TELEGRAM_WORKERS, global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_interval=TELEGRAM_CHAT_INTERVAL, max_attempts=TELEGRAM_SEND_ATTEMPTS, delivery_log=None):
+        self.workers = workers
+        self.chat_interval = chat_interval
+        self.max_attempts = max_attempts
+        self._bucket = TokenBucket(rate_per_minute=global_rate * 60, capacity=global_rate)
+        self._queue = None
+        self._tasks = []
+        self._next_slot = {}  # chat_id -> earliest monotonic time for its next message
+        self._paused_until = 0
+        self._inflight = set()
+        self._delivery_log = delivery_log
+        # Metrics
+        self.sent = 0
+        self.failed = 0
+        self.retry_after = 0
+
+    @property
+    def delivery_log(self):
+        if self._delivery_log is None:
+            self._delivery_log = get_delivery_log()
+        return self._delivery_log
+
+    def delivered(self, key):
+        return key in self.delivery_log
+
+    def enqueue_batch(self, bot, notifications, on_done=None):
+        """Queue notifications and return at once; `on_done({key: success})` runs when all are settled.
+
+        Notifications already delivered or in flight are skipped. Returns the number queued.
+        """
+        self._start()
+        fresh = [n for n in notifications if n.key not in self._inflight]
+        delivered = self.delivery_log.delivered(n.key for n in fresh)
+        fresh = [n for n in fresh if n.key not in delivered]
+        if not fresh:
+            return 0
+        batch = _Batch(bot, len(fresh), on_done)
+        for notification in fresh:
+            notification.batch = batch
+            self._inflight.add(notification.key)
+            self._queue.put_nowait(notification)
+        return len(fresh)
+
+    def _start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        loop = asyncio.get_event_loop()
+        while len(self._tasks) < self.workers:
+            self._tasks.append(loop.create_task(self._work()))
+
+    async def _work(self):
+        while True:
+            notification = await self._queue.get()
+            try:
+                await self._deliver(notification)
+            except Exception as e:
+                logger.error(f"Unexpected error delivering {notification.key}: {e}", exc_info=True)
+                await self._settle(notification, False)
+
+    async def _wait_for_slot(self, chat_id):
+        # Reserve this chat's next slot before sleeping so concurrent workers queue behind it
+        now = time.monotonic()
+        if len(self._next_slot) > DELIVERED_KEYS:
+            self._next_slot = {chat: at for chat, at in self._next_slot.items() if at > now}
+        slot = max(now, self._next_slot.get(chat_id, 0), self._paused_until)
+        self._next_slot[chat_id] = slot + self.chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        await self._bucket.acquire()
+
+    async def _deliver(self, notification):
+        bot = notification.batch.bot
+        while True:
+            notification.attempts += 1
+            await self._wait_for_slot(notification.chat_id)
+            try:
+                with metrics.telegram_send_seconds.time():
+                    await bot.send_message(
+                        chat_id=notification.chat_id,
+                        text=notification.text,
+                        reply_markup=notification.reply_markup,
+                        parse_mode=notification.parse_mode
+                    )
+                self.sent += 1
+                metrics.telegram_sends.inc(outcome='sent')
+                await self._settle(notification, True)
+                return
+            except RetryAfter as e:
+                metrics.telegram_sends.inc(outcome='retry_after')
+                delay = e.retry_after
+                delay = delay.total_seconds() if hasattr(delay, 'total_seconds') else float(delay)
+                self.retry_after += 1
+                # Flood control applies to the whole bot, so every worker pauses
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                logger.warning(f"Telegram asked to retry after {delay}s ({notification.key})")
+            except BadRequest as e:
+                metrics.telegram_sends.inc(outcome='bad_request')
+                if notification.plain_text is None or notification.parse_mode is None:
+                    logger.error(f"Telegram rejected {notification.key}: {e}")
+                    break
+                # Formatting was rejected, fall back to plain text
+                logger.warning(f"Formatting rejected for {notification.key}, sending plain text: {e}")
+                notification.text = notification.plain_text
+                notification.parse_mode = None
+            except Forbidden as e:
+                metrics.telegram_sends.inc(outcome='forbidden')
+                # The user blocked the bot, retrying cannot help
+                logger.error(f"Cannot deliver {notification.key}: {e}")
+                break
+            except Exception as e:
+                metrics.telegram_sends.inc(outcome='error')
+                logger.error(f"Error delivering {notification.key} (attempt {notification.attempts}): {e}")
+                await asyncio.sleep(min(2 ** notification.attempts, 60))
+
+            if notification.attempts >= self.max_attempts:
+                break
+        self.failed += 1
+        await self._settle(notification, False)
+
+    async def _settle(self, notification, success):
+        if success:
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self.delivery_log.add, notification.key)
+            except Exception as e:
+                logger.error(f"Could not record the delivery of {notification.key}: {e}")
+        self._inflight.discard(notification.key)
+
+        batch = notification.batch
+        batch.results[notification.key] = success
+        batch.remaining -= 1
+        if batch.remaining == 0 and batch.on_done is not None:
+            try:
+                result = batch.on_done(batch.results)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error in notification batch callback: {e}", exc_info=True)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'inflight': len(self._inflight),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retry_after': self.retry_after,
+        }
+
+notifier = TelegramDispatcher()
+metrics.queue_depth.track(lambda: notifier.stats()['queued'], queue='telegram')
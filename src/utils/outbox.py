@@ -0,0 +1,119 @@
+import json
+import time
+import threading
+import logging
+from src.config import OUTBOX_MAX_BACKOFF
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class TicketOutbox:
+    """Durable local queue of ticket rows waiting to be appended to Google Sheets.
+
+    Entries are marked in flight before each append. An entry still in flight
+    on the next flush may already be in the sheet (the response or mark_sent
+    was lost), so the flush looks for it there before appending it again.
+    """
+
+    def __init__(self, path=None):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " ticket_id TEXT NOT NULL,"
+                " row TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL DEFAULT 0,"
+                " in_flight INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.commit()
+
+    def put(self, ticket_id, row):
+        """Commit a ticket row locally and return its outbox id."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (ticket_id, row, created_at) VALUES (?, ?, ?)",
+                (ticket_id, json.dumps(row, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def pending(self, limit, now=None):
+        """Return up to `limit` (id, ticket_id, row) entries that are due for a flush."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, ticket_id, row FROM outbox WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return [(entry_id, ticket_id, json.loads(row)) for entry_id, ticket_id, row in rows]
+
+    def entries(self):
+        """Return every queued (id, ticket_id, row) entry regardless of its retry time."""
+        return self.pending(-1, now=float('inf'))
+
+    def find(self, ticket_id):
+        """Return the queued row of a ticket, or None once it has been flushed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT row FROM outbox WHERE ticket_id = ? ORDER BY id DESC LIMIT 1", (ticket_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_in_flight(self, ids):
+        """Record that an append of these entries is about to be sent."""
+        with self._lock:
+            self._conn.executemany("UPDATE outbox SET in_flight = 1 WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def in_flight(self, ids):
+        """Return the ids among `ids` whose last append may have reached the sheet."""
+        ids = list(ids)
+        with self._lock:
+            return {
+                entry_id for (entry_id,) in self._conn.execute(
+                    f"SELECT id FROM outbox WHERE in_flight = 1 AND id IN ({','.join('?' * len(ids))})", ids
+                )
+            }
+
+    def mark_sent(self, ids):
+        """Remove entries that were appended to the sheet."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def mark_failed(self, ids, now=None):
+        """Schedule a retry with exponential backoff."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for entry_id in ids:
+                (attempts,) = self._conn.execute(
+                    "SELECT attempts FROM outbox WHERE id = ?", (entry_id,)
+                ).fetchone() or (0,)
+                delay = min(OUTBOX_MAX_BACKOFF, 2 ** attempts)
+                self._conn.execute(
+                    "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                    (now + delay, entry_id)
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()
+        return count
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """Return the shared ticket outbox, opening it lazily."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = TicketOutbox()
+    return _outbox
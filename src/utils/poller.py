@@ -0,0 +1,192 @@
+import time
+import hashlib
+import logging
+from src.config import POLL_FULL_RELOAD_ROWS
+from src.utils.sheets import (
+    sheets_call, open_worksheet, get_session, status_column, is_quota_error, api_error_details,
+    read_columns, fetch_rows, INDEX_COLUMNS, BACKGROUND, COST_CELL
+)
+from src.utils.ticket_index import ticket_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RESOLVED_STATUSES = ('Resolved', 'Résolu')
+MODIFIED_TIME_RETRY = 300  # Seconds without the modified-time check after it failed
+MODIFIED_TIME_MAX_FAILURES = 5  # Failures in a row before the check is given up
+
+def _last_update_time(sheet):
+    """Return the spreadsheet modified time from Drive metadata (one small call)."""
+    spreadsheet = sheet.spreadsheet
+    getter = getattr(spreadsheet, 'get_lastUpdateTime', None)  # gspread >= 6
+    if getter is not None:
+        return getter()
+    return spreadsheet.lastUpdateTime
+
+class ResolvedTicketPoller:
+    """Finds resolved tickets by diffing the ticket_id and status columns against the last poll."""
+
+    def __init__(self, index=ticket_index):
+        self.index = index
+        # Cursor from the last successful poll
+        self.modified_time = None
+        self.columns_hash = None
+        self.resolved_rows = []
+        self.use_modified_time = True
+        self.modified_time_failures = 0  # In a row
+        self._modified_time_retry_at = 0
+        # Counters for the logs
+        self.skipped = 0
+        self.partial_reads = 0
+        self.full_reads = 0
+        self.rows_fetched = 0
+
+    async def poll(self):
+        """Return (row, ticket) pairs for every ticket currently marked resolved."""
+        sheet = await open_worksheet()
+
+        # Cheapest signal first: has the spreadsheet changed at all?
+        modified_time = await self._modified_time(sheet)
+        if modified_time is not None and modified_time == self.modified_time:
+            self.skipped += 1
+            return await self._resolved_tickets(sheet)
+
+        await self._read(sheet)
+        self.modified_time = modified_time
+        return await self._resolved_tickets(sheet)
+
+    async def _modified_time(self, sheet):
+        """The spreadsheet modified time, or None when unknown: the columns are then read this cycle."""
+        if not self.use_modified_time or time.monotonic() < self._modified_time_retry_at:
+            return None
+        try:
+            modified_time = await sheets_call(_last_update_time, sheet, cost=COST_CELL, lane=BACKGROUND)
+        except Exception as e:
+            if is_quota_error(e):
+                raise  # The sweep scheduler backs off
+            self.modified_time_failures += 1
+            details = api_error_details(e)
+            if (details and details[0] in (403, 404)) or self.modified_time_failures >= MODIFIED_TIME_MAX_FAILURES:
+                # No Drive access, or it keeps failing: the column hash alone tells what changed
+                logger.warning(f"Spreadsheet modified time unavailable, using column hash only: {e}")
+                self.use_modified_time = False
+            else:
+                logger.warning(f"Spreadsheet modified time unavailable, reading the columns this time: {e}")
+                self._modified_time_retry_at = time.monotonic() + MODIFIED_TIME_RETRY
+            return None
+        self.modified_time_failures = 0
+        return modified_time
+
+    async def _read(self, sheet):
+        """Read the ID, chat and status columns and bring the index up to date with them."""
+        columns = await read_columns(INDEX_COLUMNS, lane=BACKGROUND, sheet=sheet)
+        ids = columns['ticket_id']
+        statuses = columns['status']
+
+        columns_hash = self._hash(ids, statuses)
+        if self.index.loaded and columns_hash == self.columns_hash:
+            self.skipped += 1
+            return
+
+        if not self.index.loaded:
+            self.index.load_columns(columns)
+            self._update_cursor(statuses, columns_hash)
+            self.full_reads += 1
+            return
+
+        # Rows whose ticket is unknown or has moved are re-indexed, the rest only changed status
+        moved = []
+        for offset, ticket_id in enumerate(ids):
+            ticket_id = str(ticket_id).strip()
+            if not ticket_id:
+                continue
+            if self.index.row_of(ticket_id) != offset + 2:
+                moved.append((offset, ticket_id))
+            elif self.index.value(ticket_id, 'status') != statuses[offset]:
+                self.index.set_cell(ticket_id, status_column(), statuses[offset])
+
+        if len(moved) > POLL_FULL_RELOAD_ROWS:
+            logger.info(f"{len(moved)} rows changed position, rebuilding the index")
+            self.index.load_columns(columns)
+            self.full_reads += 1
+        else:
+            for offset, ticket_id in moved:
+                self.index.put_partial(ticket_id, offset + 2, {name: columns[name][offset] for name in INDEX_COLUMNS})
+            self.partial_reads += 1
+        self._update_cursor(statuses, columns_hash)
+
+    def _update_cursor(self, statuses, columns_hash):
+        self.columns_hash = columns_hash
+        self.resolved_rows = [
+            row for row, status in enumerate(statuses, start=2)
+            if str(status).strip() in RESOLVED_STATUSES
+        ]
+
+    @staticmethod
+    def _hash(ids, statuses):
+        digest = hashlib.sha1()
+        for ticket_id, status in zip(ids, statuses):
+            digest.update(f'{ticket_id}\x1f{status}\x1e'.encode('utf-8'))
+        return digest.hexdigest()
+
+    async def _resolved_tickets(self, sheet):
+        # Only the tickets we act on are fetched in full, in one batch
+        partial_rows = [
+            row for row in self.resolved_rows
+            if self.index.is_partial(self.index.ticket_at(row))
+        ]
+        if partial_rows:
+            await fetch_rows(partial_rows, lane=BACKGROUND, sheet=sheet)
+            self.rows_fetched += len(partial_rows)
+
+        tickets = []
+        for row in self.resolved_rows:
+            ticket_id = self.index.ticket_at(row)
+            ticket = self.index.get(ticket_id) if ticket_id else None
+            # Skip rows whose status we have already moved on from
+            if not ticket or str(ticket.get('status', '')).strip() not in RESOLVED_STATUSES:
+                continue
+            if ticket.get('chat_id'):
+                tickets.append((row, ticket))
+        return tickets
+
+    def cursor(self):
+        """Return the poll cursor, saved in the warm-start snapshot."""
+        return {
+            'modified_time': self.modified_time,
+            'columns_hash': self.columns_hash,
+            'resolved_rows': list(self.resolved_rows),
+        }
+
+    def restore_cursor(self, cursor):
+        self.modified_time = cursor.get('modified_time')
+        self.columns_hash = cursor.get('columns_hash')
+        self.resolved_rows = list(cursor.get('resolved_rows', []))
+
+    def stats(self):
+        return {
+            'skipped': self.skipped,
+            'partial_reads': self.partial_reads,
+            'full_reads': self.full_reads,
+            'rows_fetched': self.rows_fetched,
+        }
+
+resolved_poller = ResolvedTicketPoller()
+
+async def get_resolved_tickets():
+    """Get (row, ticket) pairs for resolved tickets, downloading only what changed since the last poll.
+
+    Quota errors are raised so the sweep scheduler can back off.
+    """
+    try:
+        sheet = await open_worksheet()
+        resolved_tickets = await resolved_poller.poll()
+        logger.info(f"Found {len(resolved_tickets)} resolved tickets (poller stats: {resolved_poller.stats()})")
+        return resolved_tickets, sheet
+
+    except Exception as e:
+        if is_quota_error(e):
+            raise
+        logger.error(f"Error getting resolved tickets: {e}", exc_info=True)
+        get_session().report_error(e)
+        return [], None
@@ -0,0 +1,12 @@
+# Characters Telegram requires to be escaped in MarkdownV2 text
+MARKDOWN_V2_SPECIAL = '\\_*[]()~`>#+-=|{}.!'
+# The backslash goes first so the backslashes added for the others are left alone
+_MARKDOWN_V2_REPLACEMENTS = [(char, '\\' + char) for char in MARKDOWN_V2_SPECIAL]
+
+def escape_markdown(text):
+    """Escape a value put into a MarkdownV2 message, replacing only the special characters it contains."""
+    text = str(text)
+    for char, escaped in _MARKDOWN_V2_REPLACEMENTS:
+        if char in text:
+            text = text.replace(char, escaped)
+    return text
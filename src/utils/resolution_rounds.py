@@ -0,0 +1,110 @@
+import time
+import threading
+import logging
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class ResolutionRounds:
+    """How many times each ticket was reopened, shared by every process.
+
+    The round is part of the resolution notification key, so a ticket resolved
+    again after a reopen is notified again instead of being taken as done. A
+    reopen is either the reporter's NON answer or an admin moving the status
+    away from 'En Attente de Confirmation' in the sheet and resolving it again.
+    """
+
+    def __init__(self, path=None):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolution_rounds ("
+                " ticket_id TEXT PRIMARY KEY,"
+                " round INTEGER NOT NULL,"
+                " awaiting_since REAL)"
+            )
+            self._conn.commit()
+
+    def reopen(self, ticket_id):
+        """Start a new resolution round for a reopened ticket; return its number."""
+        with self._lock:
+            self._reopen(ticket_id)
+            self._conn.commit()
+            (round_,) = self._conn.execute(
+                "SELECT round FROM resolution_rounds WHERE ticket_id = ?", (ticket_id,)
+            ).fetchone()
+        return round_
+
+    def _reopen(self, ticket_id):
+        self._conn.execute(
+            "INSERT INTO resolution_rounds (ticket_id, round) VALUES (?, 1)"
+            " ON CONFLICT(ticket_id) DO UPDATE SET round = round + 1, awaiting_since = NULL",
+            (ticket_id,)
+        )
+
+    def awaiting(self, ticket_ids, now=None):
+        """Record that the tickets' 'En Attente de Confirmation' status was written to the sheet."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO resolution_rounds (ticket_id, round, awaiting_since) VALUES (?, 0, ?)"
+                " ON CONFLICT(ticket_id) DO UPDATE SET awaiting_since = excluded.awaiting_since",
+                [(ticket_id, now) for ticket_id in ticket_ids]
+            )
+            self._conn.commit()
+
+    def reopen_resolved_again(self, ticket_ids, read_since):
+        """Start a new round for the tickets resolved again after their status was moved on.
+
+        `ticket_ids` are resolved in a sheet read that started at `read_since`. A
+        ticket whose 'En Attente de Confirmation' write landed before that can
+        only be resolved again because an admin reopened it by hand. Returns the
+        reopened ticket IDs.
+        """
+        ticket_ids = list(ticket_ids)
+        reopened = []
+        with self._lock:
+            for start in range(0, len(ticket_ids), 500):
+                chunk = ticket_ids[start:start + 500]
+                reopened.extend(ticket_id for (ticket_id,) in self._conn.execute(
+                    f"SELECT ticket_id FROM resolution_rounds WHERE awaiting_since < ?"
+                    f" AND ticket_id IN ({','.join('?' * len(chunk))})",
+                    [read_since] + chunk
+                ).fetchall())
+            for ticket_id in reopened:
+                self._reopen(ticket_id)
+            self._conn.commit()
+        return reopened
+
+    def rounds(self, ticket_ids):
+        """Return {ticket_id: round} for the given tickets known to the store; the others are in round 0."""
+        ticket_ids = list(ticket_ids)
+        rounds = {}
+        with self._lock:
+            # SQLite caps the number of bound parameters per statement
+            for start in range(0, len(ticket_ids), 500):
+                chunk = ticket_ids[start:start + 500]
+                rounds.update(self._conn.execute(
+                    f"SELECT ticket_id, round FROM resolution_rounds WHERE ticket_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+        return rounds
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM resolution_rounds").fetchone()
+        return count
+
+_resolution_rounds = None
+_resolution_rounds_lock = threading.Lock()
+
+def get_resolution_rounds():
+    """Return the shared resolution rounds store, opening it lazily."""
+    global _resolution_rounds
+    if _resolution_rounds is None:
+        with _resolution_rounds_lock:
+            if _resolution_rounds is None:
+                _resolution_rounds = ResolutionRounds()
+    return _resolution_rounds
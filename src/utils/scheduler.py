@@ -0,0 +1,124 @@
+import time
+import random
+import logging
+from src.config import (
+    SWEEP_INITIAL_INTERVAL, SWEEP_MIN_INTERVAL, SWEEP_MAX_INTERVAL,
+    SWEEP_EWMA_ALPHA, SWEEP_JITTER, SWEEP_QUOTA_PAUSE
+)
+from src.utils.sheets import is_quota_error
+from src.utils import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BACKOFF_FACTOR = 1.5  # Quiet sweeps stretch the interval by at most this much each time
+
+class AdaptiveSchedule:
+    """Runs a periodic job at an interval that follows the rate of events it finds.
+
+    The job returns how many events (e.g. newly resolved tickets) it handled,
+    or None when it did nothing (not the leader, sheet unavailable). The rate
+    is an EWMA in events per minute and the interval aims at one event per
+    run: busy periods tighten it at once, quiet ones stretch it gradually up
+    to the maximum. Each run is scheduled only after the previous one ends,
+    so runs never overlap, and quota errors pause the job with a doubling delay.
+    """
+
+    def __init__(self, job, name=None, initial_interval=SWEEP_INITIAL_INTERVAL,
+                 min_interval=SWEEP_MIN_INTERVAL, max_interval=SWEEP_MAX_INTERVAL,
+                 alpha=SWEEP_EWMA_ALPHA, jitter=SWEEP_JITTER, quota_pause=SWEEP_QUOTA_PAUSE):
+        self.job = job
+        self.name = name or job.__name__
+        self.interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.alpha = alpha
+        self.jitter = jitter
+        self.quota_pause = quota_pause
+        self.rate = None  # Events per minute
+        self.running = False
+        self.quota_errors = 0
+        self.last_run_at = None
+        self._job_queue = None
+        self._next = None
+        # Metrics
+        self.runs = 0
+        self.skipped = 0
+        metrics.sweep_interval_seconds.track(lambda: self.interval, job=self.name)
+
+    def start(self, job_queue, first=5):
+        """Schedule the first run."""
+        self._job_queue = job_queue
+        self._schedule(first)
+        logger.info(f"Adaptive schedule for {self.name} starts in {first}s, interval {self.interval:.0f}s")
+
+    def _schedule(self, delay):
+        if self._next is not None:
+            self._next.schedule_removal()
+        self._next = self._job_queue.run_once(self._tick, when=delay, name=self.name)
+
+    async def _tick(self, context):
+        self._next = None
+        if self.running:
+            # E.g. start() called again during a run; the running one reschedules
+            self.skipped += 1
+            metrics.sweep_runs.inc(job=self.name, outcome='skipped_overlap')
+            logger.info(f"Skipping {self.name}: the previous run is still in progress")
+            return
+
+        self.running = True
+        started = time.time()
+        events = error = None
+        try:
+            events = await self.job(context)
+        except Exception as e:
+            error = e
+            logger.error(f"Error in {self.name}: {e}", exc_info=not is_quota_error(e))
+        finally:
+            self.running = False
+
+        delay, reason = self._next_delay(events, error, started)
+        self.runs += 1
+        self._schedule(delay)
+        rate = f"{self.rate:.2f}/min" if self.rate is not None else 'unknown'
+        logger.info(
+            f"{self.name}: {events if events is not None else 'no'} events in {time.time() - started:.2f}s, "
+            f"rate {rate}, next run in {delay:.0f}s ({reason})"
+        )
+
+    def _next_delay(self, events, error, now):
+        if error is not None and is_quota_error(error):
+            self.quota_errors += 1
+            metrics.sweep_runs.inc(job=self.name, outcome='quota_paused')
+            pause = min(self.max_interval, self.quota_pause * 2 ** (self.quota_errors - 1))
+            return pause, f"quota exceeded {self.quota_errors} time(s) in a row"
+        if error is not None or events is None:
+            metrics.sweep_runs.inc(job=self.name, outcome='error' if error is not None else 'idle')
+            return self._jittered(self.interval), 'interval unchanged'
+
+        self.quota_errors = 0
+        metrics.sweep_runs.inc(job=self.name, outcome='ran')
+        minutes = (now - self.last_run_at) / 60 if self.last_run_at else self.interval / 60
+        self.last_run_at = now
+        observed = events / max(minutes, 1 / 60)
+        self.rate = observed if self.rate is None else self.alpha * observed + (1 - self.alpha) * self.rate
+
+        target = 60 / self.rate if self.rate > 0 else self.max_interval
+        if target < self.interval:
+            interval, reason = target, 'resolutions picking up'
+        else:
+            interval, reason = min(target, self.interval * BACKOFF_FACTOR), 'quiet, backing off'
+        self.interval = max(self.min_interval, min(self.max_interval, interval))
+        return self._jittered(self.interval), reason
+
+    def _jittered(self, delay):
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def stats(self):
+        return {
+            'interval': round(self.interval, 1),
+            'rate_per_minute': round(self.rate, 3) if self.rate is not None else None,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'quota_errors': self.quota_errors,
+        }
@@ -0,0 +1,241 @@
+"""
+Admin ticket search: a process-local inverted index over the description,
+identifiant and category of every ticket, archived ones included.
+
+Queries never call the Sheets API. The index is built with one projected read,
+then kept up to date from the rows the bot writes or fetches and a periodic
+check of the ticket_id column for tickets created elsewhere.
+"""
+import re
+import hmac
+import array
+import bisect
+import heapq
+import asyncio
+import threading
+import unicodedata
+import logging
+from src.config import SEARCH_API_TOKEN, SEARCH_PATH, SEARCH_RESULTS, SEARCH_ENABLED
+from src.utils.sheets import read_columns, fetch_rows, load_ticket_index, BACKGROUND
+from src.utils.ticket_index import ticket_index
+from src.utils.archive_index import get_archive_index
+from src.utils import ticket_feed
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ('category', 'description', 'identifiant')
+PREFIX_MIN_LENGTH = 3  # Shorter query terms must match a whole word
+SNIPPET_LENGTH = 80
+REBUILD_ROWS = 500  # Above this many unindexed rows, rebuild instead of fetching them one by one
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_LIGATURES = (('œ', 'oe'), ('æ', 'ae'), ('ß', 'ss'))
+
+def fold(text):
+    """Lower-case and strip accents: 'Synchronisation échouée' -> 'synchronisation echouee'."""
+    text = str(text).lower()
+    if text.isascii():
+        return text
+    # Accents become combining marks, which the ASCII encoding drops along with other symbols
+    text = unicodedata.normalize('NFKD', text)
+    for ligature, letters in _LIGATURES:
+        if ligature in text:
+            text = text.replace(ligature, letters)
+    return text.encode('ascii', 'ignore').decode('ascii')
+
+def tokenize(text):
+    return _TOKEN.findall(fold(text))
+
+class SearchIndex:
+    """Inverted index of folded words to ticket documents.
+
+    Postings are append-only arrays of document numbers, so they stay sorted
+    and small. A ticket whose text changes gets a new document and the old
+    one is left as a tombstone until the next rebuild.
+    """
+
+    def __init__(self):
+        self.built = False
+        self._postings = {}  # word -> array of document numbers
+        self._words = []  # Sorted vocabulary, for prefix matches
+        self._docs = []  # Document number -> (ticket_id, category, identifiant, snippet, signature) or None
+        self._doc_of = {}  # ticket_id -> document number
+        self._tombstones = 0
+        self._lock = threading.Lock()
+        # Metrics
+        self.queries = 0
+        self.rebuilds = 0
+
+    def add(self, ticket, _keep_sorted=True):
+        """Index a ticket (header → value dict); unchanged tickets are skipped."""
+        ticket_id = str(ticket.get('ticket_id', '')).strip()
+        if not ticket_id:
+            return
+        fields = [str(ticket.get(name, '') or '') for name in SEARCH_FIELDS]
+        signature = hash(tuple(fields))
+        with self._lock:
+            previous = self._doc_of.get(ticket_id)
+            if previous is not None:
+                if self._docs[previous][4] == signature:
+                    return
+                self._docs[previous] = None
+                self._tombstones += 1
+            doc = len(self._docs)
+            category, description, identifiant = fields
+            self._docs.append((ticket_id, category, identifiant, description[:SNIPPET_LENGTH], signature))
+            self._doc_of[ticket_id] = doc
+            words = set(tokenize(' '.join(fields)))
+            # A whole identifiant also matches as one word, e.g. 'ag-0042' -> 'ag0042'
+            words.add(''.join(tokenize(identifiant)))
+            words.discard('')
+            for word in words:
+                postings = self._postings.get(word)
+                if postings is None:
+                    postings = self._postings[word] = array.array('I')
+                    if _keep_sorted:
+                        bisect.insort(self._words, word)
+                postings.append(doc)
+
+    def add_row(self, ticket_id, headers, values):
+        """TicketIndex listener: index a complete row as it is recorded."""
+        self.add(dict(zip(headers, values)))
+
+    def load(self, tickets):
+        """Replace the index with `tickets`, oldest first."""
+        fresh = SearchIndex()
+        for ticket in tickets:
+            fresh.add(ticket, _keep_sorted=False)
+        fresh._words = sorted(fresh._postings)
+        with self._lock:
+            self._postings, self._words = fresh._postings, fresh._words
+            self._docs, self._doc_of = fresh._docs, fresh._doc_of
+            self._tombstones = fresh._tombstones
+            self.built = True
+            self.rebuilds += 1
+        logger.info(f"Search index built with {len(self._doc_of)} tickets and {len(self._words)} words")
+
+    def _matches(self, term):
+        """Document numbers containing `term`, or a word starting with it when long enough."""
+        if len(term) < PREFIX_MIN_LENGTH:
+            return self._postings.get(term, ())
+        start = bisect.bisect_left(self._words, term)
+        end = bisect.bisect_left(self._words, term + '\x7f', start)
+        if end - start == 1:
+            return self._postings[self._words[start]]
+        docs = set()
+        for word in self._words[start:end]:
+            docs.update(self._postings[word])
+        return docs
+
+    def search(self, query, limit=SEARCH_RESULTS):
+        """Return (total, results) for tickets matching every word of `query`, newest first.
+
+        Each result is a dict with ticket_id, category, identifiant and the
+        start of the description.
+        """
+        self.queries += 1
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return 0, []
+        with self._lock:
+            # Rarest term first, so the candidate set shrinks as fast as possible
+            matches = sorted((self._matches(term) for term in terms), key=len)
+            docs = matches[0]
+            for other in matches[1:]:
+                if not docs:
+                    break
+                docs = set(docs).intersection(other)
+            if self._tombstones:
+                docs = [doc for doc in docs if self._docs[doc] is not None]
+            total = len(docs)
+            if isinstance(docs, array.array):
+                newest = docs[:-limit - 1:-1]  # A single postings list is already sorted
+            else:
+                newest = heapq.nlargest(limit, docs)
+            results = [self._docs[doc] for doc in newest]
+        return total, [
+            {'ticket_id': ticket_id, 'category': category, 'identifiant': identifiant, 'description': snippet}
+            for ticket_id, category, identifiant, snippet, _ in results
+        ]
+
+    def __contains__(self, ticket_id):
+        return ticket_id in self._doc_of
+
+    def __len__(self):
+        return len(self._doc_of)
+
+    def stats(self):
+        return {
+            'tickets': len(self._doc_of),
+            'words': len(self._words),
+            'tombstones': len(self._docs) - len(self._doc_of),
+            'queries': self.queries,
+            'rebuilds': self.rebuilds,
+        }
+
+search_index = SearchIndex()
+
+async def rebuild_search_index():
+    """Build the search index from the archive index and one projected read of the ticket sheet."""
+    archived = await asyncio.get_event_loop().run_in_executor(None, get_archive_index().tickets)
+    columns = await read_columns(('ticket_id',) + SEARCH_FIELDS, lane=BACKGROUND)
+    current = (
+        {name: columns[name][offset] for name in columns.data}
+        for offset in range(len(columns))
+    )
+    search_index.load(archived + list(current))
+
+async def refresh_search_index():
+    """Index tickets created by other processes since the last refresh, building the index on first use.
+
+    Run by the leader only: what it finds reaches the other workers through the ticket feed.
+    """
+    if not search_index.built:
+        await rebuild_search_index()
+        return
+    if not ticket_index.loaded:
+        await load_ticket_index(BACKGROUND)  # Its header row labels the rows fetched below
+    columns = await read_columns(('ticket_id',), lane=BACKGROUND)
+    missing = [
+        offset + 2 for offset, ticket_id in enumerate(columns['ticket_id'])
+        if str(ticket_id).strip() and str(ticket_id).strip() not in search_index
+    ]
+    if len(missing) > REBUILD_ROWS:
+        await rebuild_search_index()
+        await ticket_feed.publish(ticket_feed.REBUILD, 'search')
+    elif missing:
+        # Complete rows reach the search index through the ticket index listener
+        await ticket_feed.publish_rows(await fetch_rows(missing, lane=BACKGROUND))
+        logger.info(f"Indexed {len(missing)} new tickets for search")
+
+if SEARCH_ENABLED:
+    ticket_index.subscribe(search_index.add_row)
+    ticket_feed.on_rebuild('search', rebuild_search_index)
+
+def _authorized(request):
+    header = request.headers.get('Authorization', '')
+    return bool(SEARCH_API_TOKEN) and hmac.compare_digest(header, f'Bearer {SEARCH_API_TOKEN}')
+
+async def handle_search(request):
+    """aiohttp handler: GET {SEARCH_PATH}?q=...&limit=... with the search API token."""
+    from aiohttp import web
+    if not _authorized(request):
+        return web.Response(status=401)
+    query = request.query.get('q', '').strip()
+    if not query:
+        return web.json_response({'error': 'q is required'}, status=400)
+    try:
+        limit = max(1, min(100, int(request.query.get('limit', SEARCH_RESULTS))))
+    except ValueError:
+        return web.json_response({'error': 'limit must be a number'}, status=400)
+    if not search_index.built:
+        return web.json_response({'error': 'search index is still building'}, status=503, headers={'Retry-After': '5'})
+    total, results = search_index.search(query, limit)
+    for result in results:
+        result['status'] = ticket_index.value(result['ticket_id'], 'status') or None
+    return web.json_response({'query': query, 'total': total, 'results': results})
+
+def add_search_routes(app):
+    if SEARCH_API_TOKEN:
+        app.router.add_get(SEARCH_PATH, handle_search)
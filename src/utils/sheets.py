@@ -1,47 +1,394 @@
 import os
 import json
+import uuid
 import asyncio
-from google.oauth2.credentials import Credentials
-from google.oauth2 import service_account
-import gspread
-from googleapiclient.discovery import build
+import contextlib
 import logging
-from functools import wraps
+import re
+from concurrent.futures import ThreadPoolExecutor
+from src.config import (
+    OUTBOX_BATCH_SIZE, INDEX_ROW_TTL, INDEX_MISS_RELOAD,
+    SHEETS_EXECUTOR_WORKERS, SHEETS_EXECUTOR_QUEUE
+)
+from src.cluster import clustered
+from src.utils.state import connect
+from src.utils.outbox import get_outbox
+from src.utils.ticket_index import ticket_index
+from src.utils.archive_index import get_archive_index
+from src.utils.leader import get_leader
+from src.utils import metrics
+from functools import partial
 import time
+import threading
+import datetime
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 SHEET_RANGE = "A:H"  # Assuming columns A through H are used
+STATUS_COLUMN = 8  # Column H, used until the header row is known
+INDEX_COLUMNS = ('ticket_id', 'chat_id', 'status')  # All the index and the sweep read for every row
 
 # Rate limiting settings
 MAX_REQUESTS_PER_MINUTE = 50  # Keep below Google Sheets limit
-_request_timestamps = []
-_lock = asyncio.Lock()
-
-def rate_limit():
-    """Rate limiting decorator"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            async with _lock:
-                current_time = time.time()
-                # Remove timestamps older than 1 minute
-                global _request_timestamps
-                _request_timestamps = [ts for ts in _request_timestamps if current_time - ts < 60]
-                
-                if len(_request_timestamps) >= MAX_REQUESTS_PER_MINUTE:
-                    wait_time = 60 - (current_time - _request_timestamps[0])
-                    if wait_time > 0:
-                        logger.warning(f"Rate limit reached, waiting {wait_time:.2f} seconds")
-                        await asyncio.sleep(wait_time)
-                
-                _request_timestamps.append(current_time)
-                
-                # Execute the async function
-                return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+TOKEN_LEASE = 5  # Shared tokens a worker takes at once and spends without a database transaction
+TOKEN_LEASE_TTL = 5  # Seconds before a worker's unspent leased tokens go back to the shared budget
+_flush_lock = asyncio.Lock()
+
+# Row writers and row deletes coordinate through the state database, across processes
+LAYOUT_HOLD_TTL = 120  # Seconds before the hold of a process that died lapses
+LAYOUT_WAIT = 60  # Seconds a delete waits for the row writes in flight
+LAYOUT_POLL = 0.2
+
+# Priority lanes: interactive calls always go ahead of the background sweep
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+# Token cost per operation, heavier reads consume more of the per-minute budget
+COST_CELL = 1
+COST_ROW = 1
+COST_BATCH = 2
+
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+
+class TokenBucket:
+    """Token-bucket rate limiter with priority lanes; never sleeps while holding a lock."""
+
+    def __init__(self, rate_per_minute=MAX_REQUESTS_PER_MINUTE, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._stats = {lane: {'calls': 0, 'waited': 0, 'total_wait': 0.0, 'max_wait': 0.0} for lane in self._waiting}
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, cost=1, lane=INTERACTIVE):
+        """Wait until `cost` tokens are available in this lane, then take them."""
+        cost = min(cost, self.capacity)
+        start = time.monotonic()
+        self._waiting[lane] += 1
+        try:
+            while True:
+                yielding = lane == BACKGROUND and self._waiting[INTERACTIVE] > 0
+                if yielding:
+                    delay = 0.05
+                else:
+                    deficit = await self._take(cost)
+                    if deficit <= 0:
+                        break
+                    delay = deficit / self.rate
+                await asyncio.sleep(min(max(delay, 0.01), 1.0))
+        finally:
+            self._waiting[lane] -= 1
+
+        waited = time.monotonic() - start
+        stats = self._stats[lane]
+        stats['calls'] += 1
+        if waited > 0.001:
+            stats['waited'] += 1
+            stats['total_wait'] += waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+            if waited > 1:
+                logger.warning(f"Rate limit reached, {lane} call waited {waited:.2f} seconds")
+        return waited
+
+    async def _take(self, cost):
+        """Take `cost` tokens if there are enough; return how many are missing (0 once taken)."""
+        # Runs on the event loop without awaiting, so check-and-take is atomic
+        self._refill(time.monotonic())
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0
+        return cost - self.tokens
+
+    def stats(self):
+        return {lane: dict(values) for lane, values in self._stats.items()}
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose tokens live in the state database, one budget for all worker processes.
+
+    Each visit to the database takes a small lease of tokens on top of the call's
+    cost, so most calls are served locally instead of opening a write transaction.
+    Lanes and stats stay per process: background calls yield to this
+    process's interactive ones.
+    """
+
+    def __init__(self, rate_per_minute=MAX_REQUESTS_PER_MINUTE, capacity=None, path=None, name='sheets',
+                 lease=TOKEN_LEASE, lease_ttl=TOKEN_LEASE_TTL):
+        super().__init__(rate_per_minute, capacity)
+        self.name = name
+        self.lease = lease
+        self.lease_ttl = lease_ttl
+        self.transactions = 0
+        self._path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._leased = 0.0
+        self._lease_expires = 0.0
+
+    def _take_shared(self, cost, returned):
+        """Give back `returned` leased tokens, then take `cost` plus a lease; return (deficit, leased)."""
+        now = time.time()  # Wall clock, the same in every process
+        with self._lock:
+            if self._conn is None:
+                self._conn = connect(self._path)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                    " name TEXT PRIMARY KEY,"
+                    " tokens REAL NOT NULL,"
+                    " updated_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                tokens, updated_at = row if row is not None else (self.capacity, now)
+                tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate + returned)
+                deficit = cost - tokens if tokens < cost else 0
+                leased = 0
+                if not deficit:
+                    leased = min(self.lease, tokens - cost)
+                    tokens -= cost + leased
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.name, tokens, now)
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            self.transactions += 1
+        self.tokens = tokens
+        return deficit, leased
+
+    async def _take(self, cost):
+        # The lease is only touched on the event loop, so check-and-take is atomic
+        now = time.time()
+        if self._leased >= cost and now < self._lease_expires:
+            self._leased -= cost
+            return 0
+        returned, self._leased = self._leased, 0.0
+        deficit, leased = await asyncio.get_event_loop().run_in_executor(None, self._take_shared, cost, returned)
+        if leased:
+            self._leased += leased
+            self._lease_expires = time.time() + self.lease_ttl
+        return deficit
+
+# Workers share one Sheets quota, so they share one budget
+rate_limiter = SharedTokenBucket() if clustered() else TokenBucket()
+
+class SheetsSession:
+    """Caches the Google credentials, the authorized client and the worksheet handle."""
+
+    def __init__(self, sheet_id=None, worksheet_name="Sheet1", refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.sheet_id = sheet_id
+        self.worksheet_name = worksheet_name
+        self.refresh_margin = refresh_margin
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.invalidations = 0
+        self._credentials = None
+        self._client = None
+        self._worksheet = None
+        # Worksheet calls run from executor threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def get_worksheet(self):
+        """Return the cached worksheet, building the session on first use."""
+        with self._lock:
+            if self._worksheet is None:
+                self.misses += 1
+                self._build()
+            else:
+                self.hits += 1
+                self._refresh_if_needed()
+            return self._worksheet
+
+    def _build(self):
+        import gspread  # Heavy, only needed once a worksheet is opened
+        sheet_id = self.sheet_id or os.getenv('GOOGLE_SHEET_ID')
+        self._credentials = get_credentials()
+        self._refresh_if_needed()
+        self._client = gspread.authorize(self._credentials)
+        logger.info("Successfully authorized with Google Sheets")
+        self._worksheet = self._client.open_by_key(sheet_id).worksheet(self.worksheet_name)
+        logger.info("Successfully opened Google Sheet")
+
+    def _refresh_if_needed(self):
+        """Refresh the access token shortly before it expires."""
+        credentials = self._credentials
+        if credentials is None:
+            return
+        expiry = getattr(credentials, 'expiry', None)
+        # google-auth stores expiry as a naive UTC datetime
+        if expiry is not None and expiry - datetime.datetime.utcnow() > datetime.timedelta(seconds=self.refresh_margin):
+            return
+        from google.auth.transport.requests import Request
+        credentials.refresh(Request())
+        self.refreshes += 1
+        logger.info("Refreshed Google Sheets access token")
+
+    def invalidate(self):
+        """Drop the cached client so the next call rebuilds it."""
+        with self._lock:
+            self._credentials = None
+            self._client = None
+            self._worksheet = None
+            self.invalidations += 1
+
+    def report_error(self, error):
+        """Invalidate the session after an auth or not-found error, keep it otherwise."""
+        if _is_session_error(error):
+            logger.warning(f"Resetting Google Sheets session after error: {error}")
+            self.invalidate()
+            return True
+        return False
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'invalidations': self.invalidations,
+        }
+
+# Reasons Google gives for a 403 that is a rate or quota limit, not a permission problem
+RATE_LIMIT_REASONS = {
+    'rateLimitExceeded', 'userRateLimitExceeded', 'dailyLimitExceeded', 'quotaExceeded', 'sharingRateLimitExceeded'
+}
+
+def api_error_details(error):
+    """Return (HTTP status, reasons, status name, message) of a gspread APIError, or None for other errors."""
+    import gspread
+    if not isinstance(error, gspread.exceptions.APIError):
+        return None
+    response = getattr(error, 'response', None)
+    try:
+        details = response.json().get('error', {})
+    except Exception:
+        details = {}
+    if not isinstance(details, dict):
+        details = {}
+    reasons = {item.get('reason') for item in details.get('errors', []) if isinstance(item, dict)}
+    return getattr(response, 'status_code', None), reasons, details.get('status'), str(details.get('message', ''))
+
+def _is_session_error(error):
+    """Whether an error means the cached credentials or worksheet are no longer usable.
+
+    A 403 only counts when it is about permissions: Google also answers 403
+    to rate and quota limits, and those go to the backoff instead.
+    """
+    import gspread
+    from google.auth.exceptions import RefreshError
+    if isinstance(error, (RefreshError, gspread.exceptions.SpreadsheetNotFound, gspread.exceptions.WorksheetNotFound)):
+        return True
+    details = api_error_details(error)
+    if details is None:
+        return False
+    code = details[0]
+    return code in (401, 404) or (code == 403 and not is_quota_error(error))
+
+def is_quota_error(error):
+    """Whether an error is Google's 'quota exceeded' answer: a 429, or a 403 for a rate limit."""
+    details = api_error_details(error)
+    if details is None:
+        return False
+    code, reasons, status, message = details
+    if code == 429:
+        return True
+    message = message.lower()
+    return code == 403 and bool(
+        reasons & RATE_LIMIT_REASONS or status == 'RESOURCE_EXHAUSTED' or 'quota' in message or 'rate limit' in message
+    )
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the shared Sheets session, creating it lazily."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = SheetsSession()
+    return _session
+
+def get_worksheet():
+    """Return the shared worksheet handle (blocking on first use, see open_worksheet)."""
+    return get_session().get_worksheet()
+
+class SheetsExecutor:
+    """Bounded thread pool that runs every blocking Google Sheets call."""
+
+    def __init__(self, max_workers=SHEETS_EXECUTOR_WORKERS, max_queue=SHEETS_EXECUTOR_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sheets')
+        self._slots = None
+        # Metrics
+        self.waiting = 0
+        self.running = 0
+        self.peak_depth = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking call on the pool; callers wait (without blocking the loop) when it is full."""
+        if self._slots is None:
+            # Created here so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        self.waiting += 1
+        self.peak_depth = max(self.peak_depth, self.waiting + self.running)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                self._pool, partial(func, *args, **kwargs)
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def queue_depth(self):
+        """Calls submitted but not yet finished."""
+        return self.waiting + self.running
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'waiting': self.waiting,
+            'running': self.running,
+            'peak_depth': self.peak_depth,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+sheets_executor = SheetsExecutor()
+metrics.queue_depth.track(sheets_executor.queue_depth, queue='sheets_executor')
+metrics.queue_depth.track(lambda: len(get_outbox()), queue='ticket_outbox')
+
+async def open_worksheet():
+    """Return the shared worksheet handle without blocking the event loop."""
+    return await sheets_executor.run(get_worksheet)
 
 def get_credentials():
     """Get Google Sheets credentials from environment variable."""
@@ -60,6 +407,7 @@ def get_credentials():
             logger.error(f"Error parsing Google Sheets credentials JSON: {e}")
             raise ValueError("Invalid Google Sheets credentials JSON format")
         
+        from google.oauth2 import service_account
         credentials = service_account.Credentials.from_service_account_info(
             creds_dict,
             scopes=['https://spreadsheets.google.com/feeds',
@@ -73,82 +421,429 @@ def get_credentials():
         logger.error(f"Error getting credentials: {e}", exc_info=True)
         raise
 
-@rate_limit()
+def ticket_row(ticket_data):
+    """Build the sheet row for a ticket."""
+    return [
+        ticket_data['ticket_id'],
+        ticket_data['timestamp'],
+        ticket_data.get('chat_id', ''),  # Chat ID for notifications
+        ticket_data['category'],
+        ticket_data['description'],
+        ticket_data['identifiant'],
+        ticket_data['priority'],
+        'Ouvert'  # Initial status in French
+    ]
+
+@metrics.timed_operation()
 async def store_ticket(ticket_data):
-    """Store ticket data in Google Sheets."""
+    """Commit a ticket to the local outbox; it is appended to Google Sheets in the background."""
     try:
-        credentials = get_credentials()
-        client = gspread.authorize(credentials)
-        logger.info("Successfully authorized with Google Sheets")
-        
-        # Open the Google Sheet
-        sheet = client.open_by_key(os.getenv('GOOGLE_SHEET_ID')).worksheet("Sheet1")
-        logger.info("Successfully opened Google Sheet")
-        
-        # Prepare row data
-        row = [
-            ticket_data['ticket_id'],
-            ticket_data['timestamp'],
-            ticket_data.get('chat_id', ''),  # Chat ID for notifications
-            ticket_data['category'],
-            ticket_data['description'],
-            ticket_data['identifiant'],
-            ticket_data['priority'],
-            'Ouvert'  # Initial status in French
-        ]
-        
-        # Append the row
-        await asyncio.get_event_loop().run_in_executor(None, sheet.append_row, row)
-        logger.info(f"Successfully stored ticket {ticket_data['ticket_id']}")
+        outbox = get_outbox()
+        row = ticket_row(ticket_data)
+        await asyncio.get_event_loop().run_in_executor(
+            None, outbox.put, ticket_data['ticket_id'], row
+        )
+        ticket_index.put(ticket_data['ticket_id'], None, row)
+        logger.info(f"Queued ticket {ticket_data['ticket_id']} in the outbox")
+
+        # Flush early when a burst fills a whole batch, only the leader process appends
+        if len(outbox) >= OUTBOX_BATCH_SIZE and not _flush_lock.locked() and get_leader().is_leader():
+            asyncio.get_event_loop().create_task(flush_outbox())
         return True
     except Exception as e:
         logger.error(f"Error storing ticket: {e}", exc_info=True)
         return False
 
-@rate_limit()
-async def get_resolved_tickets():
-    """Get all resolved tickets from Google Sheets."""
+async def flush_outbox():
+    """Append pending outbox rows to Google Sheets in a single call."""
+    if _flush_lock.locked():
+        return 0
+    async with _flush_lock:
+        outbox = get_outbox()
+        loop = asyncio.get_event_loop()
+        entries = await loop.run_in_executor(None, outbox.pending, OUTBOX_BATCH_SIZE)
+        if not entries:
+            return 0
+
+        ids = [entry_id for entry_id, _, _ in entries]
+        try:
+            in_flight = await loop.run_in_executor(None, outbox.in_flight, ids)
+            if in_flight:
+                # An earlier append of these may have landed, the ticket IDs in the sheet tell
+                entries = await _skip_appended(outbox, entries, in_flight)
+                if not entries:
+                    return 0
+                ids = [entry_id for entry_id, _, _ in entries]
+            await loop.run_in_executor(None, outbox.mark_in_flight, ids)
+            rows = [row for _, _, row in entries]
+            response = await _append_rows(rows)
+        except Exception as e:
+            logger.error(f"Error flushing {len(ids)} tickets to Google Sheets: {e}", exc_info=True)
+            get_session().report_error(e)
+            await loop.run_in_executor(None, outbox.mark_failed, ids)
+            return 0
+
+        await loop.run_in_executor(None, outbox.mark_sent, ids)
+        logger.info(f"Flushed {len(rows)} tickets to Google Sheets")
+
+        # Record where the rows landed so lookups need no scan
+        first_row = _first_updated_row(response)
+        if first_row is not None:
+            for offset, (_, ticket_id, row) in enumerate(entries):
+                ticket_index.put(ticket_id, first_row + offset, row)
+        else:
+            ticket_index.loaded = False
+        return len(rows)
+
+async def _skip_appended(outbox, entries, in_flight):
+    """Mark sent the in-flight entries already in the sheet and return the others."""
+    columns = await read_columns(('ticket_id',), lane=BACKGROUND)
+    rows = {str(ticket_id).strip(): row for row, ticket_id in enumerate(columns['ticket_id'], start=2)}
+    appended = [
+        (entry_id, ticket_id, row) for entry_id, ticket_id, row in entries
+        if entry_id in in_flight and ticket_id in rows
+    ]
+    if not appended:
+        return entries
+    await asyncio.get_event_loop().run_in_executor(
+        None, outbox.mark_sent, [entry_id for entry_id, _, _ in appended]
+    )
+    for _, ticket_id, row in appended:
+        ticket_index.put(ticket_id, rows[ticket_id], row)
+    logger.warning(f"{len(appended)} tickets were already in Google Sheets, not appending them again")
+    skipped = {entry_id for entry_id, _, _ in appended}
+    return [entry for entry in entries if entry[0] not in skipped]
+
+def _first_updated_row(response):
+    """Extract the first row number from an append response ("Sheet1!A15:H17")."""
     try:
-        credentials = get_credentials()
-        client = gspread.authorize(credentials)
-        logger.info("Successfully authorized with Google Sheets")
-        
-        # Open the Google Sheet
-        sheet = client.open_by_key(os.getenv('GOOGLE_SHEET_ID')).worksheet("Sheet1")
-        logger.info("Successfully opened Google Sheet")
-        
-        # Get all records
-        records = await asyncio.get_event_loop().run_in_executor(None, sheet.get_all_records)
-        logger.info(f"Retrieved {len(records)} tickets from Google Sheets")
-        
-        # Filter for resolved tickets (handle both English and French status)
-        resolved_tickets = [
-            ticket for ticket in records 
-            if str(ticket.get('status', '')).strip() in ['Resolved', 'Résolu']
-            and ticket.get('chat_id')
-        ]
-        
-        logger.info(f"Found {len(resolved_tickets)} resolved tickets")
-        return resolved_tickets, sheet
-        
+        updated_range = response['updates']['updatedRange']
+    except (KeyError, TypeError):
+        return None
+    match = re.search(r'![A-Z]+(\d+)', updated_range)
+    return int(match.group(1)) if match else None
+
+async def _append_rows(rows):
+    sheet = await open_worksheet()
+    return await sheets_call(sheet.append_rows, rows, cost=COST_BATCH)
+
+async def sheets_call(func, *args, cost=COST_CELL, lane=INTERACTIVE, **kwargs):
+    """Run a blocking gspread call on the Sheets executor once the rate limiter allows it."""
+    operation = getattr(func, '__name__', 'call').lstrip('_')
+    waited = await rate_limiter.acquire(cost, lane)
+    metrics.rate_limiter_wait_seconds.observe(waited, lane=lane)
+    try:
+        with metrics.sheets_call_seconds.time(operation=operation, lane=lane):
+            return await sheets_executor.run(func, *args, **kwargs)
+    except Exception:
+        metrics.sheets_errors.inc(operation=operation)
+        raise
+
+_index_load = None  # Download in progress, shared by concurrent callers
+
+async def load_ticket_index(lane=INTERACTIVE):
+    """Build the ticket index from one projected read of the ID, chat and status columns.
+
+    Callers arriving while a download is running wait for it instead of starting another.
+    """
+    global _index_load
+    if _index_load is None or _index_load.done():
+        _index_load = asyncio.ensure_future(_load_ticket_index(lane))
+    return await asyncio.shield(_index_load)
+
+async def _load_ticket_index(lane):
+    try:
+        columns = await read_columns(INDEX_COLUMNS, lane=lane)
+        ticket_index.load_columns(columns)
+        await index_outbox_entries()
+        return True
     except Exception as e:
-        logger.error(f"Error getting resolved tickets: {e}", exc_info=True)
-        return [], None
+        logger.error(f"Error loading ticket index: {e}", exc_info=True)
+        get_session().report_error(e)
+        return False
+
+async def index_outbox_entries():
+    """Add tickets still waiting in the outbox after a restart to the index."""
+    entries = await asyncio.get_event_loop().run_in_executor(None, get_outbox().entries)
+    for _, ticket_id, row in entries:
+        if ticket_id not in ticket_index:
+            ticket_index.put(ticket_id, None, row)
+
+async def ensure_current_layout():
+    """Reload the index if rows were archived since it was built, here or in another process."""
+    version = await asyncio.get_event_loop().run_in_executor(None, get_archive_index().layout_version)
+    if ticket_index.loaded and version != ticket_index.layout_version:
+        logger.info("Ticket rows were archived since the index was built, reloading it")
+        await load_ticket_index()
+
+@contextlib.asynccontextmanager
+async def row_writes():
+    """Keep the ticket sheet's rows in place while row numbers are resolved and written to.
 
-@rate_limit()
-async def update_ticket_status(sheet, row_index, new_status):
-    """Update ticket status in Google Sheets."""
+    Writers in every process hold this together; only row deletes wait for them.
+    """
+    holder = uuid.uuid4().hex
+    loop = asyncio.get_event_loop()
+    archive = get_archive_index()
+    while not await loop.run_in_executor(None, archive.hold_layout, holder, False, LAYOUT_HOLD_TTL):
+        await asyncio.sleep(LAYOUT_POLL)  # Rows are being deleted
     try:
-        status_column = 7  # Assuming status is in column G (7)
-        await asyncio.get_event_loop().run_in_executor(
-            None, 
-            sheet.update_cell,
-            row_index,
-            status_column,
-            new_status
+        yield
+    finally:
+        await loop.run_in_executor(None, archive.release_layout, holder)
+
+@contextlib.asynccontextmanager
+async def row_deletes(timeout=LAYOUT_WAIT):
+    """Keep new row writes out, in every process, and wait for those in flight to finish."""
+    holder = uuid.uuid4().hex
+    loop = asyncio.get_event_loop()
+    archive = get_archive_index()
+    deadline = loop.time() + timeout
+    try:
+        while not await loop.run_in_executor(None, archive.hold_layout, holder, True, LAYOUT_HOLD_TTL):
+            if loop.time() > deadline:
+                raise TimeoutError(f"Ticket rows still being written to after {timeout}s, not deleting rows")
+            await asyncio.sleep(LAYOUT_POLL)
+        yield
+    finally:
+        await loop.run_in_executor(None, archive.release_layout, holder)
+
+async def find_ticket_row(ticket_id):
+    """Return the sheet row of a ticket from the index, loading it on first use."""
+    if not ticket_index.loaded:
+        await load_ticket_index()
+    else:
+        await ensure_current_layout()
+    row = ticket_index.row_of(ticket_id)
+    if row is None:
+        row = await _find_unindexed(ticket_id)
+    return row
+
+async def _find_unindexed(ticket_id):
+    """Look for a ticket another process created: in the shared outbox, else in a fresh index."""
+    queued = await asyncio.get_event_loop().run_in_executor(None, get_outbox().find, ticket_id)
+    if queued is not None:
+        if ticket_id not in ticket_index:
+            ticket_index.put(ticket_id, None, queued)
+        return None
+    if await _find_archived(ticket_id) is not None:
+        return None
+    # Flushed elsewhere or added by hand, reload at most every INDEX_MISS_RELOAD seconds
+    if time.time() - ticket_index.loaded_at >= INDEX_MISS_RELOAD:
+        await load_ticket_index()
+    return ticket_index.row_of(ticket_id)
+
+async def get_ticket(ticket_id):
+    """Return a ticket as a header → value dict with at most one Sheets call, or None."""
+    row = await find_ticket_row(ticket_id)
+    if ticket_id not in ticket_index:
+        return await _find_archived(ticket_id)
+    if row is None or ticket_index.is_fresh(ticket_id, INDEX_ROW_TTL):
+        return ticket_index.get(ticket_id)
+
+    values = await _row_values(row)
+    if not values or str(values[0]).strip() != ticket_id:
+        # Rows moved under us (manual edit), rebuild the index and answer from it
+        logger.warning(f"Ticket {ticket_id} is no longer at row {row}, reloading index")
+        await load_ticket_index()
+        return ticket_index.get(ticket_id)
+    ticket_index.put(ticket_id, row, values)
+    return ticket_index.get(ticket_id)
+
+async def _find_archived(ticket_id):
+    return await asyncio.get_event_loop().run_in_executor(None, get_archive_index().find, ticket_id)
+
+async def _row_values(row):
+    sheet = await open_worksheet()
+    return await sheets_call(sheet.row_values, row, cost=COST_ROW)
+
+class Columns:
+    """Column-oriented result of read_columns: one list per column, item i is sheet row i + 2."""
+    __slots__ = ('headers', 'data', 'rows', 'layout_version')
+
+    def __init__(self, headers, data, layout_version=0):
+        self.headers = headers
+        self.layout_version = layout_version
+        self.rows = max((len(values) for values in data.values()), default=0)
+        # Sheets drops trailing empty cells, pad every column to the same length
+        self.data = {name: values + [''] * (self.rows - len(values)) for name, values in data.items()}
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __len__(self):
+        return self.rows
+
+async def read_columns(names, lane=INTERACTIVE, sheet=None):
+    """Read only the named columns of the ticket sheet, in one batch call.
+
+    The header row comes with the same call; if a column has moved since the
+    headers were last seen, the read is repeated with the new positions.
+    """
+    sheet = sheet or await open_worksheet()
+    # Read first: rows archived during the read make the result stale, not the version
+    layout_version = await asyncio.get_event_loop().run_in_executor(None, get_archive_index().layout_version)
+    headers = list(ticket_index.headers)
+    if not headers:
+        (header_row,) = await sheets_call(sheet.batch_get, ['1:1'], cost=COST_CELL, lane=lane)
+        headers = list(header_row[0]) if header_row else []
+
+    for _ in range(2):
+        missing = [name for name in names if name not in headers]
+        if missing:
+            raise ValueError(f"Columns missing from the sheet header: {', '.join(missing)}")
+        letters = [column_letter(headers.index(name) + 1) for name in names]
+        results = await sheets_call(
+            sheet.batch_get, ['1:1'] + [f'{letter}2:{letter}' for letter in letters], cost=COST_BATCH, lane=lane
         )
-        logger.info(f"Updated ticket status to {new_status} at row {row_index}")
+        current = list(results[0][0]) if results[0] else []
+        if all(name in current and current.index(name) == headers.index(name) for name in names):
+            return Columns(current, {
+                name: [row[0] if row else '' for row in values] for name, values in zip(names, results[1:])
+            }, layout_version)
+        logger.info("Sheet columns moved, reading again with the new header row")
+        headers = current
+    raise RuntimeError("Sheet header row keeps changing, giving up on this read")
+
+async def fetch_rows(rows, lane=INTERACTIVE, sheet=None):
+    """Fetch complete rows in one batch call and cache them in the index; return {row: values}."""
+    if not rows:
+        return {}
+    sheet = sheet or await open_worksheet()
+    last_letter = column_letter(max(len(ticket_index.headers), status_column()))
+    ranges = [f'A{row}:{last_letter}{row}' for row in rows]
+    results = await sheets_call(sheet.batch_get, ranges, cost=COST_BATCH, lane=lane)
+    fetched = {}
+    for row, result in zip(rows, results):
+        if result and result[0] and str(result[0][0]).strip():
+            ticket_index.put(str(result[0][0]).strip(), row, result[0])
+            fetched[row] = result[0]
+    return fetched
+
+def column_letter(column):
+    """Convert a 1-based column number to its A1 letter(s)."""
+    letters = ''
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def status_column():
+    """Return the status column, read from the header row once it is known."""
+    return ticket_index.column('status', STATUS_COLUMN)
+
+async def update_ticket_status(sheet, ticket_id, new_status):
+    """Update ticket status in Google Sheets, finding its row right before the write."""
+    try:
+        # Shared with other writers: rows only need to stay put until the write lands
+        async with row_writes():
+            row_index = await find_ticket_row(ticket_id)
+            if row_index is None:
+                logger.error(f"Ticket {ticket_id} is not in the sheet, cannot set its status to {new_status}")
+                return False
+            await sheets_call(sheet.update_cell, row_index, status_column(), new_status)
+        ticket_index.set_cell(ticket_id, status_column(), new_status)
+        logger.info(f"Updated ticket {ticket_id} status to {new_status} at row {row_index}")
         return True
     except Exception as e:
         logger.error(f"Error updating ticket status: {e}", exc_info=True)
+        get_session().report_error(e)
         return False
+
+class StatusBatcher:
+    """Collects status transitions during a polling cycle and writes them in one call.
+
+    Transitions are keyed by ticket ID, rows are looked up when they are written
+    since archiving may have moved them in the meantime.
+    """
+
+    def __init__(self):
+        self._pending = {}  # Ticket ID -> new status
+
+    def add(self, ticket_id, new_status):
+        self._pending[ticket_id] = new_status
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def commit(self, sheet=None, lane=BACKGROUND):
+        """Write all collected transitions with one batch_update; return {ticket_id: success}."""
+        if not self._pending:
+            return {}
+        pending, self._pending = self._pending, {}
+        results = {ticket_id: False for ticket_id in pending}
+        try:
+            async with row_writes():
+                await ensure_current_layout()
+                rows = {ticket_id: ticket_index.row_of(ticket_id) for ticket_id in pending}
+                letter = column_letter(status_column())
+                data = [
+                    {'range': f'{letter}{row_index}', 'values': [[pending[ticket_id]]]}
+                    for ticket_id, row_index in sorted(rows.items(), key=lambda item: item[1] or 0) if row_index
+                ]
+                if data:
+                    sheet = sheet or await open_worksheet()
+                    await sheets_call(sheet.batch_update, data, cost=COST_BATCH, lane=lane)
+        except Exception as e:
+            logger.error(f"Error writing {len(pending)} status updates: {e}", exc_info=True)
+            get_session().report_error(e)
+            return results
+
+        for ticket_id, row_index in rows.items():
+            if row_index:
+                ticket_index.set_cell(ticket_id, status_column(), pending[ticket_id])
+                results[ticket_id] = True
+            else:
+                logger.error(f"Ticket {ticket_id} is not in the sheet, cannot set its status to {pending[ticket_id]}")
+        logger.info(f"Updated {len(data)} ticket statuses in one batch")
+        return results
+
+async def delete_ticket_rows(rows, status, lane=BACKGROUND):
+    """Delete rows of the ticket sheet in one call; return how many went.
+
+    `rows` maps each row number to the ticket ID expected there. Once no
+    process appends or writes by row, the rows are read again and nothing is
+    deleted unless every one still holds its ticket with `status`: ticket IDs
+    can repeat, so an ID alone never picks a row, and a sheet edited by hand
+    since the rows were selected is left alone until the next run. The layout
+    version is then bumped so every process rebuilds its index before using
+    row numbers again.
+    """
+    async with _flush_lock, row_deletes():
+        sheet = await open_worksheet()
+        columns = await read_columns(('ticket_id', 'status'), lane=lane, sheet=sheet)
+        expected = rows
+        rows = [
+            row for row, ticket_id in sorted(expected.items())
+            if 2 <= row < len(columns) + 2
+            and str(columns['ticket_id'][row - 2]).strip() == ticket_id
+            and str(columns['status'][row - 2]).strip() == status
+        ]
+        if len(rows) < len(expected):
+            logger.warning(
+                f"{len(expected) - len(rows)} of {len(expected)} ticket rows changed since they were selected, "
+                "not deleting any"
+            )
+            return 0
+        # Bottom-up, so each deletion leaves the rows of the next one in place
+        requests = [
+            {'deleteDimension': {'range': {
+                'sheetId': sheet.id, 'dimension': 'ROWS', 'startIndex': start - 1, 'endIndex': end
+            }}}
+            for start, end in reversed(row_runs(rows))
+        ]
+        await sheets_call(sheet.spreadsheet.batch_update, {'requests': requests}, cost=COST_BATCH, lane=lane)
+        await asyncio.get_event_loop().run_in_executor(None, get_archive_index().bump_layout)
+        logger.info(f"Deleted {len(rows)} ticket rows in {len(requests)} ranges")
+        await load_ticket_index(lane)
+    return len(rows)
+
+def row_runs(rows):
+    """Group row numbers into sorted (first, last) runs of consecutive rows."""
+    runs = []
+    for row in sorted(rows):
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [tuple(run) for run in runs]
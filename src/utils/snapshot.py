@@ -0,0 +1,136 @@
+import json
+import time
+import zlib
+import asyncio
+import threading
+import logging
+from src.config import GOOGLE_SHEET_ID, WARM_START_ENABLED, WARM_START_MAX_AGE
+from src.utils.state import connect
+from src.utils.ticket_index import ticket_index
+from src.utils.poller import resolved_poller
+from src.utils.ticket_ids import get_allocator
+from src.utils.leader import get_leader
+from src.utils.sheets import load_ticket_index, index_outbox_entries, BACKGROUND
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NAME = 'warm_start'
+SNAPSHOT_VERSION = 1
+
+class SnapshotStore:
+    """Compressed JSON snapshots kept in the local state database, one per name."""
+
+    def __init__(self, path=None):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot ("
+                " name TEXT PRIMARY KEY,"
+                " saved_at REAL NOT NULL,"
+                " data BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    def save(self, name, state):
+        """Store a snapshot and return its compressed size in bytes."""
+        data = zlib.compress(json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshot (name, saved_at, data) VALUES (?, ?, ?)",
+                (name, time.time(), data)
+            )
+            self._conn.commit()
+        return len(data)
+
+    def load(self, name):
+        """Return (saved_at, state) for a snapshot, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT saved_at, data FROM snapshot WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        saved_at, data = row
+        return saved_at, json.loads(zlib.decompress(data).decode('utf-8'))
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_snapshot_store():
+    """Return the shared snapshot store, opening it lazily."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore()
+    return _store
+
+def capture():
+    """Collect the state worth keeping across restarts."""
+    return {
+        'version': SNAPSHOT_VERSION,
+        'sheet_id': GOOGLE_SHEET_ID,
+        'index': ticket_index.dump(),
+        'poller': resolved_poller.cursor(),
+        'allocator': get_allocator().state(),
+    }
+
+def restore(max_age=WARM_START_MAX_AGE, now=None):
+    """Load the last snapshot into the index, poller and allocator; return whether it was usable."""
+    snapshot = get_snapshot_store().load(SNAPSHOT_NAME)
+    if snapshot is None:
+        logger.info("No warm-start snapshot found")
+        return False
+    saved_at, state = snapshot
+    age = (now or time.time()) - saved_at
+    if state.get('version') != SNAPSHOT_VERSION or state.get('sheet_id') != GOOGLE_SHEET_ID:
+        logger.info("Warm-start snapshot belongs to another version or sheet, ignoring it")
+        return False
+    if age > max_age:
+        logger.info(f"Warm-start snapshot is {age:.0f}s old, ignoring it")
+        return False
+
+    ticket_index.restore(state['index'])
+    resolved_poller.restore_cursor(state['poller'])
+    get_allocator().restore(state['allocator'])
+    logger.info(f"Restored warm-start snapshot saved {age:.0f}s ago ({len(ticket_index)} tickets)")
+    return True
+
+async def save_snapshot(_=None):
+    """Save the warm-start snapshot; usable as a post_shutdown hook or a job callback."""
+    if not WARM_START_ENABLED or not ticket_index.loaded:
+        return
+    try:
+        state = capture()
+        size = await asyncio.get_event_loop().run_in_executor(
+            None, get_snapshot_store().save, SNAPSHOT_NAME, state
+        )
+        logger.info(f"Saved warm-start snapshot: {len(state['index']['entries'])} tickets, {size} bytes")
+    except Exception as e:
+        logger.error(f"Error saving warm-start snapshot: {e}", exc_info=True)
+
+async def warm_start(lane=BACKGROUND):
+    """Get the ticket index ready: restore the snapshot and fetch only what changed, else download the sheet."""
+    loop = asyncio.get_event_loop()
+    start = time.monotonic()
+    restored = False
+    if WARM_START_ENABLED:
+        try:
+            restored = await loop.run_in_executor(None, restore)
+        except Exception as e:
+            logger.error(f"Error restoring warm-start snapshot: {e}", exc_info=True)
+    if not restored:
+        return await load_ticket_index(lane=lane)
+
+    await index_outbox_entries()
+    if get_leader().is_leader():
+        try:
+            # The poller diffs the id and status columns against the restored cursor
+            await resolved_poller.poll()
+        except Exception as e:
+            logger.warning(f"Could not reconcile the snapshot with Google Sheets yet: {e}")
+    # The other workers catch up through the ticket feed rather than each reading the sheet
+    logger.info(f"Warm start completed in {time.monotonic() - start:.2f}s (poller stats: {resolved_poller.stats()})")
+    return True
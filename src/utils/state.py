@@ -0,0 +1,21 @@
+import os
+import sqlite3
+import logging
+from src.config import BOT_STATE_DB
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def connect(path=None):
+    """Open the local SQLite state database, creating its directory if needed."""
+    path = path or BOT_STATE_DB
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Connections are shared between the event loop and executor threads,
+    # callers serialize access with their own lock
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    logger.info(f"Opened local state database at {path}")
+    return conn
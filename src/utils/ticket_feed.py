@@ -0,0 +1,160 @@
+"""
+Ticket feed: what the leader learns from the ticket sheet, relayed to the other
+workers through the local state database.
+
+Only the leader checks the sheet for tickets opened or closed elsewhere. It
+publishes the rows and statuses it finds, and the other workers apply them to
+their own ticket, search and duplicate indexes without any Sheets call.
+"""
+import json
+import time
+import asyncio
+import threading
+import logging
+from src.cluster import clustered
+from src.utils.state import connect
+from src.utils.sheets import load_ticket_index, status_column, BACKGROUND
+from src.utils.ticket_index import ticket_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FEED_RETENTION = 3600  # Seconds entries are kept; a worker further behind rebuilds its indexes
+FEED_BATCH = 200  # Entries applied per read
+
+ROWS = 'rows'  # {"headers": [...], "rows": [[row, values], ...]}
+STATUSES = 'statuses'  # [[ticket_id, status], ...]
+REBUILD = 'rebuild'  # Name of an index the leader rebuilt from scratch
+
+class TicketFeed:
+    """Append-only log of ticket rows and statuses, pruned after FEED_RETENTION seconds."""
+
+    def __init__(self, path=None, retention=FEED_RETENTION):
+        self.retention = retention
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ticket_feed ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " published_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def publish(self, kind, payload, now=None):
+        """Append an entry and drop the expired ones."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ticket_feed (kind, payload, published_at) VALUES (?, ?, ?)",
+                (kind, json.dumps(payload), now)
+            )
+            self._conn.execute("DELETE FROM ticket_feed WHERE published_at < ?", (now - self.retention,))
+            self._conn.commit()
+
+    def head(self):
+        """Sequence number of the latest entry ever published, 0 if none."""
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ticket_feed'").fetchone()
+        return row[0] if row else 0
+
+    def read(self, after, limit=FEED_BATCH):
+        """Return (entries after `after`, whether some of them were already pruned)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, kind, payload FROM ticket_feed WHERE seq > ? ORDER BY seq LIMIT ?", (after, limit)
+            ).fetchall()
+            (oldest,) = self._conn.execute("SELECT MIN(seq) FROM ticket_feed").fetchone()
+        missed = oldest is not None and oldest > after + 1
+        return [(seq, kind, json.loads(payload)) for seq, kind, payload in rows], missed
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM ticket_feed").fetchone()
+        return count
+
+_ticket_feed = None
+_ticket_feed_lock = threading.Lock()
+
+def get_ticket_feed():
+    """Return the shared ticket feed, opening it lazily."""
+    global _ticket_feed
+    if _ticket_feed is None:
+        with _ticket_feed_lock:
+            if _ticket_feed is None:
+                _ticket_feed = TicketFeed()
+    return _ticket_feed
+
+_handlers = {STATUSES: [], REBUILD: []}
+_cursor = None  # Last entry applied by this process
+
+def on_statuses(handler):
+    """Call `handler([(ticket_id, status), ...])` for the statuses the leader publishes."""
+    _handlers[STATUSES].append(handler)
+
+def on_rebuild(name, rebuild):
+    """Await `rebuild()` when the leader rebuilds the index called `name` from scratch."""
+    _handlers[REBUILD].append((name, rebuild))
+
+async def publish(kind, payload):
+    """Leader: relay what it read to the other workers; nothing to do in a single process."""
+    if not clustered() or not payload:
+        return
+    await asyncio.get_event_loop().run_in_executor(None, get_ticket_feed().publish, kind, payload)
+
+async def publish_rows(fetched):
+    """Leader: relay complete rows fetched from the sheet, given as {row: values}."""
+    if fetched:
+        await publish(ROWS, {'headers': ticket_index.headers, 'rows': [[row, values] for row, values in fetched.items()]})
+
+async def follow_ticket_feed():
+    """Other workers: apply what the leader published since the last call; return how many entries.
+
+    The first call only marks the start, so call it before building the indexes
+    it keeps current.
+    """
+    global _cursor
+    loop = asyncio.get_event_loop()
+    feed = get_ticket_feed()
+    if _cursor is None:
+        # Indexes built from now on read the sheet themselves
+        _cursor = await loop.run_in_executor(None, feed.head)
+        return 0
+    if not ticket_index.loaded:
+        await load_ticket_index(BACKGROUND)  # Its header row labels the rows applied below
+    applied = 0
+    while True:
+        entries, missed = await loop.run_in_executor(None, feed.read, _cursor)
+        if missed:
+            logger.warning("Fell behind the ticket feed, rebuilding the indexes")
+            _cursor = await loop.run_in_executor(None, feed.head)
+            for _, rebuild in _handlers[REBUILD]:
+                await rebuild()
+            return applied
+        for seq, kind, payload in entries:
+            if kind == REBUILD:
+                for name, rebuild in _handlers[REBUILD]:
+                    if name == payload:
+                        await rebuild()
+            else:
+                _apply(kind, payload)
+            _cursor = seq
+        applied += len(entries)
+        if len(entries) < FEED_BATCH:
+            return applied
+
+def _apply(kind, payload):
+    if kind == ROWS:
+        headers = payload['headers']
+        for row, values in payload['rows']:
+            fields = dict(zip(headers, values))
+            if headers != ticket_index.headers:
+                values = [fields.get(name, '') for name in ticket_index.headers]
+            ticket_index.put(str(fields.get('ticket_id', '')).strip(), row, values)
+    elif kind == STATUSES:
+        for ticket_id, status in payload:
+            ticket_index.set_cell(ticket_id, status_column(), status)
+        for handler in _handlers[STATUSES]:
+            handler(payload)
@@ -0,0 +1,92 @@
+import datetime
+import threading
+import logging
+from src.config import TICKET_ID_NODE
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Crockford base32: no I, L, O or U, so IDs are easy to read out and type
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+def base32(number, width=2):
+    digits = ''
+    while number:
+        number, remainder = divmod(number, 32)
+        digits = ALPHABET[remainder] + digits
+    return digits.rjust(width, '0')
+
+class TicketIdAllocator:
+    """Allocates IDs like T241017-0A: the date plus a per-day base32 sequence kept in SQLite."""
+
+    def __init__(self, path=None, node=TICKET_ID_NODE):
+        self.node = node.upper()
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ticket_sequence ("
+                " day TEXT PRIMARY KEY,"
+                " seq INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+
+    def allocate(self, now=None):
+        """Return the next ticket ID; the increment is atomic across processes sharing the database."""
+        now = now or datetime.datetime.now()
+        day = now.strftime('%y%m%d')
+        with self._lock:
+            # The insert takes the write lock, so the read sees our own increment
+            self._conn.execute(
+                "INSERT INTO ticket_sequence (day, seq) VALUES (?, 1)"
+                " ON CONFLICT(day) DO UPDATE SET seq = seq + 1",
+                (day,)
+            )
+            (seq,) = self._conn.execute(
+                "SELECT seq FROM ticket_sequence WHERE day = ?", (day,)
+            ).fetchone()
+            self._conn.commit()
+        return f"T{day}-{self.node}{base32(seq)}"
+
+    def state(self):
+        """Return {day: last sequence} for the most recent days."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, seq FROM ticket_sequence ORDER BY day DESC LIMIT 7"
+            ).fetchall()
+        return dict(rows)
+
+    def restore(self, state):
+        """Raise per-day sequences to at least the saved ones, so a reset database never reissues IDs."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO ticket_sequence (day, seq) VALUES (?, ?)"
+                " ON CONFLICT(day) DO UPDATE SET seq = MAX(seq, excluded.seq)",
+                list(state.items())
+            )
+            self._conn.commit()
+
+def normalize_ticket_id(text):
+    """Upper-case a typed ticket ID and undo common base32 misreadings after the dash.
+
+    Node letters are base32 too (see TICKET_ID_NODE in src.config), so the whole suffix is safe to map.
+    """
+    ticket_id = text.strip().upper()
+    if '-' in ticket_id:
+        prefix, sequence = ticket_id.split('-', 1)
+        sequence = sequence.replace('O', '0').replace('I', '1').replace('L', '1')
+        ticket_id = f"{prefix}-{sequence}"
+    return ticket_id
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+def get_allocator():
+    """Return the shared ticket ID allocator, opening it lazily."""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = TicketIdAllocator()
+    return _allocator
@@ -0,0 +1,191 @@
+import time
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class _Entry:
+    __slots__ = ('row', 'values', 'fetched_at', 'partial')
+
+    def __init__(self, row, values, fetched_at, partial=False):
+        self.row = row  # Sheet row number, None while the ticket is still in the outbox
+        self.values = values
+        self.fetched_at = fetched_at
+        self.partial = partial  # Only the columns of a projected read are filled in
+
+class TicketIndex:
+    """Process-local map of ticket_id to sheet row, with a cached copy of each row."""
+
+    def __init__(self):
+        self.headers = []
+        self.loaded = False
+        self.loaded_at = 0  # When the index last matched the whole sheet
+        self.layout_version = 0  # Sheet layout the row numbers belong to, bumped when rows are deleted
+        self._entries = {}
+        self._by_row = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def load(self, values, now=None):
+        """Rebuild the index from a full sheet download (header row first)."""
+        now = time.time() if now is None else now
+        entries = {}
+        for row_number, row in enumerate(values[1:], start=2):
+            if row and row[0]:
+                entries[str(row[0]).strip()] = _Entry(row_number, list(row), now)
+        self._replace(list(values[0]) if values else self.headers, entries, now)
+        logger.info(f"Ticket index loaded with {len(entries)} tickets")
+
+    def load_columns(self, columns, now=None):
+        """Rebuild the index from a projected read (see sheets.read_columns).
+
+        Rows only hold the columns that were read until they are fetched in
+        full; complete rows already cached at the same position are kept.
+        """
+        now = time.time() if now is None else now
+        headers = list(columns.headers)
+        projected = [(headers.index(name), values) for name, values in columns.data.items()]
+        entries = {}
+        for offset, ticket_id in enumerate(columns['ticket_id']):
+            ticket_id = str(ticket_id).strip()
+            if not ticket_id:
+                continue
+            row = offset + 2
+            previous = self._entries.get(ticket_id)
+            if previous is not None and previous.row == row and not previous.partial:
+                entry = _Entry(row, list(previous.values), previous.fetched_at)
+            else:
+                entry = _Entry(row, [''] * len(headers), now, partial=True)
+            for position, values in projected:
+                if position >= len(entry.values):
+                    entry.values.extend([''] * (position + 1 - len(entry.values)))
+                entry.values[position] = values[offset]
+            entries[ticket_id] = entry
+        self._replace(headers, entries, now)
+        self.layout_version = columns.layout_version
+        logger.info(f"Ticket index loaded with {len(entries)} tickets from {len(projected)} columns")
+
+    def _replace(self, headers, entries, loaded_at):
+        with self._lock:
+            self.headers = list(headers)
+            # Keep tickets that are queued locally but not yet in the sheet
+            for ticket_id, entry in self._entries.items():
+                if entry.row is None and ticket_id not in entries:
+                    entries[ticket_id] = entry
+            self._entries = entries
+            self._by_row = {entry.row: ticket_id for ticket_id, entry in entries.items() if entry.row}
+            self.loaded = True
+            self.loaded_at = loaded_at
+
+    def dump(self):
+        """Return the sheet-backed part of the index as plain lists, for the warm-start snapshot."""
+        with self._lock:
+            return {
+                'headers': list(self.headers),
+                'layout_version': self.layout_version,
+                'entries': [
+                    [ticket_id, entry.row, entry.fetched_at, entry.values, entry.partial]
+                    for ticket_id, entry in self._entries.items() if entry.row
+                ],
+            }
+
+    def restore(self, state):
+        """Load an index saved by dump(); rows keep their original fetch time, so stale ones get refreshed."""
+        entries = {}
+        for ticket_id, row, fetched_at, values, *partial in state['entries']:
+            entries[ticket_id] = _Entry(row, values, fetched_at, partial=bool(partial and partial[0]))
+        self._replace(state['headers'], entries, time.time())
+        self.layout_version = state.get('layout_version', 0)
+        logger.info(f"Ticket index restored with {len(entries)} tickets")
+
+    def put(self, ticket_id, row, values, now=None, partial=False):
+        """Record a ticket row we wrote or read ourselves."""
+        now = time.time() if now is None else now
+        with self._lock:
+            previous = self._entries.get(ticket_id)
+            if previous is not None and previous.row and self._by_row.get(previous.row) == ticket_id:
+                del self._by_row[previous.row]
+            self._entries[ticket_id] = _Entry(row, list(values), now, partial)
+            if row:
+                self._by_row[row] = ticket_id
+        if not partial:
+            for listener in self._listeners:
+                listener(ticket_id, self.headers, values)
+
+    def subscribe(self, listener):
+        """Call `listener(ticket_id, headers, values)` whenever a complete row is recorded."""
+        self._listeners.append(listener)
+
+    def put_partial(self, ticket_id, row, fields, now=None):
+        """Record a ticket seen in a projected read, from a header → value dict of the columns read."""
+        values = [''] * len(self.headers)
+        for name, value in fields.items():
+            column = self.column(name)
+            if column is not None:
+                values[column - 1] = value
+        self.put(ticket_id, row, values, now, partial=True)
+
+    def is_partial(self, ticket_id):
+        entry = self._entries.get(ticket_id)
+        return entry is not None and entry.partial
+
+    def row_of(self, ticket_id):
+        entry = self._entries.get(ticket_id)
+        return entry.row if entry else None
+
+    def ticket_at(self, row):
+        """Return the ticket_id cached for a sheet row, or None."""
+        return self._by_row.get(row)
+
+    def column(self, name, default=None):
+        """Return the 1-based column of a header, or `default` if unknown."""
+        try:
+            return self.headers.index(name) + 1
+        except ValueError:
+            return default
+
+    def value(self, ticket_id, name):
+        """Return one cached field of a ticket."""
+        entry = self._entries.get(ticket_id)
+        column = self.column(name)
+        if entry is None or column is None or column > len(entry.values):
+            return ''
+        return entry.values[column - 1]
+
+    def get(self, ticket_id):
+        """Return the cached row of a ticket as a header → value dict, or None."""
+        entry = self._entries.get(ticket_id)
+        if entry is None:
+            return None
+        return dict(zip(self.headers, entry.values))
+
+    def is_fresh(self, ticket_id, ttl, now=None):
+        entry = self._entries.get(ticket_id)
+        if entry is None:
+            return False
+        # Rows still in the outbox can only change through us
+        if entry.row is None:
+            return True
+        if entry.partial:
+            return False
+        now = time.time() if now is None else now
+        return now - entry.fetched_at < ttl
+
+    def set_cell(self, ticket_id, column, value):
+        """Mirror a single cell write into the cached row (column is 1-based)."""
+        with self._lock:
+            entry = self._entries.get(ticket_id)
+            if entry is None:
+                return
+            if len(entry.values) < column:
+                entry.values.extend([''] * (column - len(entry.values)))
+            entry.values[column - 1] = value
+
+    def __contains__(self, ticket_id):
+        return ticket_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+ticket_index = TicketIndex()
@@ -0,0 +1,68 @@
+import time
+import threading
+import logging
+from src.utils.state import connect
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class TicketLinks:
+    """Chats following an existing ticket instead of filing a duplicate of it."""
+
+    def __init__(self, path=None):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ticket_links ("
+                " ticket_id TEXT NOT NULL,"
+                " chat_id TEXT NOT NULL,"
+                " user TEXT,"
+                " linked_at REAL NOT NULL,"
+                " PRIMARY KEY (ticket_id, chat_id))"
+            )
+            self._conn.commit()
+
+    def add(self, ticket_id, chat_id, user=None, now=None):
+        """Link a chat to a ticket; return False if it already followed it."""
+        now = time.time() if now is None else now
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO ticket_links (ticket_id, chat_id, user, linked_at) VALUES (?, ?, ?, ?)",
+                (ticket_id, str(chat_id), user, now)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def chats(self, ticket_ids):
+        """Return {ticket_id: [chat_id, ...]} for the given tickets that have followers, in the order they linked."""
+        ticket_ids = list(ticket_ids)
+        chats = {}
+        with self._lock:
+            # SQLite caps the number of bound parameters per statement
+            for start in range(0, len(ticket_ids), 500):
+                chunk = ticket_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT ticket_id, chat_id FROM ticket_links WHERE ticket_id IN ({','.join('?' * len(chunk))})"
+                    " ORDER BY linked_at", chunk
+                ).fetchall()
+                for ticket_id, chat_id in rows:
+                    chats.setdefault(ticket_id, []).append(chat_id)
+        return chats
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM ticket_links").fetchone()
+        return count
+
+_ticket_links = None
+_ticket_links_lock = threading.Lock()
+
+def get_ticket_links():
+    """Return the shared ticket links store, opening it lazily."""
+    global _ticket_links
+    if _ticket_links is None:
+        with _ticket_links_lock:
+            if _ticket_links is None:
+                _ticket_links = TicketLinks()
+    return _ticket_links
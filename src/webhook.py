@@ -0,0 +1,174 @@
+"""
+Webhook serving mode: receives Telegram updates over HTTP with aiohttp.
+"""
+import asyncio
+import hmac
+import json
+import signal
+import time
+import logging
+from aiohttp import web
+from telegram import Update
+from src.config import (
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_QUEUE_SIZE,
+    METRICS_ENABLED
+)
+from src.utils import metrics
+from src.utils.search import add_search_routes
+from src.cluster import clustered, worker_index, chat_owner, UpdateRelay, RELAY_POLL
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookServer:
+    """Feeds webhook updates into the application's update queue, with a bounded backlog.
+
+    With several workers, updates for a chat another worker owns are relayed to it.
+    """
+
+    def __init__(self, application, secret_token=WEBHOOK_SECRET, path=WEBHOOK_PATH, queue_size=WEBHOOK_QUEUE_SIZE,
+                 intake=None, relay=None):
+        self.application = application
+        self.intake = intake
+        self.relay = relay if relay is not None else (UpdateRelay() if clustered() else None)
+        self.secret_token = secret_token
+        self.path = path
+        self.queue_size = queue_size
+        self.started_at = time.time()
+        # Metrics
+        self.received = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.relayed = 0
+        metrics.queue_depth.track(application.update_queue.qsize, queue='updates')
+
+    def create_app(self):
+        """Build the aiohttp application with the webhook, health, metrics and admin API routes."""
+        app = web.Application(client_max_size=1024 * 1024)
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/healthz', self.handle_health)
+        if METRICS_ENABLED:
+            app.router.add_get('/metrics', metrics.handle_metrics)
+        if self.intake is not None and self.intake.enabled:
+            self.intake.add_routes(app)
+        add_search_routes(app)
+        return app
+
+    async def handle_update(self, request):
+        token = request.headers.get(SECRET_HEADER, '')
+        if not self.secret_token or not hmac.compare_digest(token, self.secret_token):
+            self.rejected += 1
+            logger.warning("Rejected webhook request with an invalid secret token")
+            return web.Response(status=403)
+
+        # Backpressure: Telegram retries non-2xx deliveries later
+        if self.application.update_queue.qsize() >= self.queue_size:
+            self.throttled += 1
+            logger.warning("Update queue full, asking Telegram to retry")
+            return web.Response(status=503, headers={'Retry-After': '1'})
+
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            self.rejected += 1
+            logger.error(f"Invalid update payload: {e}")
+            return web.Response(status=400)
+
+        self.received += 1
+        owner = chat_owner(update) if self.relay is not None else None
+        if owner is not None and owner != worker_index():
+            # The owner keeps this chat's conversation in memory
+            await asyncio.get_event_loop().run_in_executor(None, self.relay.put, owner, json.dumps(data))
+            self.relayed += 1
+            return web.Response()
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def follow_relay(self, stop_event):
+        """Feed the updates other workers relayed to this one into the update queue, until `stop_event` is set."""
+        loop = asyncio.get_event_loop()
+        while not stop_event.is_set():
+            try:
+                payloads = await loop.run_in_executor(None, self.relay.take, worker_index())
+            except Exception as e:
+                logger.error(f"Error reading relayed updates: {e}", exc_info=True)
+                payloads = []
+            for payload in payloads:
+                await self.application.update_queue.put(Update.de_json(json.loads(payload), self.application.bot))
+            if not payloads:
+                await asyncio.sleep(RELAY_POLL)
+
+    async def handle_health(self, request):
+        return web.json_response({
+            'status': 'ok' if self.application.running else 'starting',
+            'mode': 'webhook',
+            'uptime': round(time.time() - self.started_at),
+            'update_queue': self.application.update_queue.qsize(),
+            'received': self.received,
+            'rejected': self.rejected,
+            'throttled': self.throttled,
+            'relayed': self.relayed,
+        })
+
+async def serve(application, host=WEBHOOK_HOST, port=WEBHOOK_PORT, url=WEBHOOK_URL, stop_event=None, intake=None):
+    """Run the application behind the webhook until `stop_event` is set."""
+    if not WEBHOOK_SECRET:
+        raise ValueError("WEBHOOK_SECRET must be set in webhook mode")
+    server = WebhookServer(application, intake=intake)
+    stop_event = stop_event or asyncio.Event()
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+
+    relay_task = None
+    if server.relay is not None:
+        relay_task = asyncio.get_event_loop().create_task(server.follow_relay(stop_event))
+    runner = web.AppRunner(server.create_app())
+    await runner.setup()
+    # Sibling workers listen on the same port, the kernel balances connections between them
+    site = web.TCPSite(runner, host, port, reuse_port=clustered())
+    await site.start()
+    logger.info(f"Webhook server listening on {host}:{port}{server.path}")
+
+    try:
+        if not url:
+            logger.warning("WEBHOOK_URL is not set, skipping webhook registration")
+        elif worker_index() == 0:
+            # Pending updates are kept: Telegram delivers them once the webhook is set
+            await application.bot.set_webhook(
+                url=url.rstrip('/') + server.path,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES
+            )
+            logger.info("Registered webhook with Telegram")
+        await stop_event.wait()
+    finally:
+        logger.info("Stopping webhook server...")
+        await runner.cleanup()
+        if relay_task is not None:
+            stop_event.set()
+            await relay_task  # Relayed updates already taken still reach the queue
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+def run_webhook(application, intake=None):
+    """Blocking entry point for webhook mode, the counterpart of application.run_polling."""
+    # Reuse the default loop, like run_polling, so module-level asyncio primitives stay valid
+    loop = asyncio.get_event_loop()
+    stop_event = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+    loop.run_until_complete(serve(application, stop_event=stop_event, intake=intake))
@@ -0,0 +1,66 @@
+"""
+Test setup: the environment the bot reads at import time, and helpers for
+running its coroutines without an async pytest plugin.
+"""
+import os
+import time
+import asyncio
+import tempfile
+import pytest
+
+# Set before any src module is imported, src.config reads them once
+_workdir = tempfile.mkdtemp(prefix='bot_tests_')
+os.environ['BOT_STATE_DB'] = os.path.join(_workdir, 'bot_state.sqlite3')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST')
+os.environ.setdefault('WEBHOOK_SECRET', 'webhook-secret')
+os.environ.setdefault('EMAIL_DIGEST_WINDOW', '0.2')
+os.environ.setdefault('SMTP_EMAIL', 'milda-bot@example.org')
+
+def run(coro):
+    """Run a coroutine on the default loop, which the bot's module-level primitives are bound to."""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+async def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        await asyncio.sleep(0.02)
+
+class _Response:
+    """Enough of a requests.Response for gspread.exceptions.APIError."""
+
+    def __init__(self, status_code, status, reason, message=''):
+        self.status_code = status_code
+        self.text = message
+        self._body = {'error': {'code': status_code, 'status': status, 'message': message,
+                                'errors': [{'reason': reason}] if reason else []}}
+
+    def json(self):
+        return self._body
+
+def api_error(status_code, status=None, reason=None, message=''):
+    import gspread
+    return gspread.exceptions.APIError(_Response(status_code, status, reason, message))
+
+@pytest.fixture
+def worksheet():
+    """A fake ticket sheet installed as the shared Sheets session's worksheet."""
+    from benchmarks.fakes import FakeWorksheet
+    from src.utils import sheets
+
+    session = sheets.get_session()
+    previous = session._worksheet
+    session._worksheet = fake = FakeWorksheet()
+    yield fake
+    session._worksheet = previous
+
+@pytest.fixture(autouse=True, scope='session')
+def cancel_background_tasks():
+    """Stop the long-lived workers (notifier, email queue) the tests started on the default loop."""
+    yield
+    loop = asyncio.get_event_loop()
+    pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
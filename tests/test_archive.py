@@ -0,0 +1,98 @@
+import datetime
+from tests.conftest import run
+
+NOW = datetime.datetime(2024, 10, 17, 12, 0).timestamp()
+CONFIRMED = 'Résolu Confirmé'
+
+def ticket(ticket_id, created, status):
+    return [ticket_id, created, '920001', 'Problèmes de Rapports & Tableaux de Bord', f'Rapport {ticket_id}',
+            'agent_920', 'Moyen', status]
+
+def fill(worksheet, prefix):
+    """Old confirmed tickets on rows 2, 3, 5 and 7, an open one on row 4 and a recent confirmed one on row 6."""
+    worksheet.append_rows([
+        ticket(f'{prefix}-0001', '2024-09-02 08:00:00', CONFIRMED),
+        ticket(f'{prefix}-0002', '2024-09-03 08:00:00', CONFIRMED),
+        ticket(f'{prefix}-0003', '2024-09-04 08:00:00', 'En cours'),
+        ticket(f'{prefix}-0004', '2024-09-05 08:00:00', CONFIRMED),
+        ticket(f'{prefix}-0005', '2024-10-16 08:00:00', CONFIRMED),
+        ticket(f'{prefix}-0006', '2024-09-06 08:00:00', CONFIRMED),
+    ])
+    return [f'{prefix}-0001', f'{prefix}-0002', f'{prefix}-0004', f'{prefix}-0006']
+
+def ticket_ids(worksheet):
+    return [row[0] for row in worksheet.get_all_values()[1:]]
+
+def archive_sheet(worksheet, title='Archive 2024-09'):
+    return next(sheet for sheet in worksheet.spreadsheet.worksheets() if sheet.title == title)
+
+def test_row_runs():
+    from src.utils.sheets import row_runs
+
+    assert row_runs([7, 2, 3, 5]) == [(2, 3), (5, 5), (7, 7)]
+    assert row_runs([]) == []
+
+def test_hold_layout(tmp_path):
+    from src.utils.archive_index import ArchiveIndex
+
+    archive = ArchiveIndex(tmp_path / 'state.sqlite3')
+    assert archive.hold_layout('writer-1', now=0) and archive.hold_layout('writer-2', now=0)
+    # The delete waits for the writers, and no new writer gets in meanwhile
+    assert not archive.hold_layout('delete', exclusive=True, now=1)
+    assert not archive.hold_layout('writer-3', now=1)
+    archive.release_layout('writer-1')
+    archive.release_layout('writer-2')
+    assert archive.hold_layout('delete', exclusive=True, now=2)
+    archive.release_layout('delete')
+    assert archive.hold_layout('writer-3', now=3)
+    # A holder that died lapses after its ttl
+    assert not archive.hold_layout('delete', exclusive=True, ttl=120, now=4)
+    assert archive.hold_layout('delete', exclusive=True, now=200)
+
+def test_rows_are_copied_then_deleted_bottom_up(worksheet, monkeypatch):
+    from src.utils.archive import TicketArchiver
+
+    archived = fill(worksheet, 'T240902')
+    spreadsheet = worksheet.spreadsheet
+    batch_update = spreadsheet.batch_update
+    deletes = []
+
+    def record_delete(body):
+        deletes.append(([(request['deleteDimension']['range']['startIndex'], request['deleteDimension']['range']['endIndex'])
+                         for request in body['requests']], ticket_ids(archive_sheet(worksheet))))
+        return batch_update(body)
+    monkeypatch.setattr(spreadsheet, 'batch_update', record_delete)
+
+    assert run(TicketArchiver(after_days=30).run(now=NOW)) == 4
+    (ranges, copied_before_delete), = deletes
+    # Rows 7, 5 and 2-3 as zero-based half-open ranges, the lowest rows first
+    assert ranges == [(6, 7), (4, 5), (1, 3)]
+    assert copied_before_delete == archived
+    assert ticket_ids(worksheet) == ['T240902-0003', 'T240902-0005']
+
+def test_run_aborts_when_rows_moved_before_the_delete(worksheet, monkeypatch):
+    from src.utils.archive import TicketArchiver
+    from src.utils.archive_index import get_archive_index
+
+    archived = fill(worksheet, 'T240903')
+    spreadsheet = worksheet.spreadsheet
+    add_worksheet = spreadsheet.add_worksheet
+
+    def add_worksheet_then_edit(*args, **kwargs):
+        # An admin inserts a row at the top while the tickets are being copied
+        created = add_worksheet(*args, **kwargs)
+        with worksheet._lock:
+            worksheet._rows.insert(1, ticket('T240903-0099', '2024-10-17 09:00:00', 'Nouveau'))
+            worksheet._touch()
+        return created
+    monkeypatch.setattr(spreadsheet, 'add_worksheet', add_worksheet_then_edit)
+
+    assert run(TicketArchiver(after_days=30).run(now=NOW)) == 0
+    assert len(ticket_ids(worksheet)) == 7
+    assert ticket_ids(archive_sheet(worksheet)) == archived
+    assert get_archive_index().archived(archived) == set(archived)
+
+    # The next run deletes the rows at their new place without copying them twice
+    assert run(TicketArchiver(after_days=30).run(now=NOW)) == 4
+    assert ticket_ids(worksheet) == ['T240903-0099', 'T240903-0003', 'T240903-0005']
+    assert ticket_ids(archive_sheet(worksheet)) == archived
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from benchmarks.fakes import HEADERS, FakeBot, FakeContext, FakeUpdate, SMTPSink
+from tests.conftest import run
+
+CATEGORIES = [
+    "Problèmes d'Utilisateur & d'Accès",
+    'Problèmes de Synchronisation & Connectivité',
+    'Problèmes de Rapports & Tableaux de Bord',
+]
+CHATS = 30
+
+@pytest.fixture
+def email_sink():
+    from src.utils.email import email_dispatcher
+
+    previous = email_dispatcher.connection
+    email_dispatcher.connection = sink = SMTPSink()
+    yield sink
+    email_dispatcher.connection = previous
+
+def test_interleaved_conversations_keep_their_own_drafts(worksheet, email_sink):
+    from src.bot import TicketBot
+    from src.utils.sheets import flush_outbox
+
+    bot = FakeBot(latency=0.001)
+    context = FakeContext(bot)
+    handlers = TicketBot()
+    chats = [700000 + number for number in range(CHATS)]
+    answers = {
+        chat_id: [
+            (handlers.start, '/start'),
+            (handlers.category, CATEGORIES[number % len(CATEGORIES)]),
+            (handlers.description, f'Panne numéro {number} sur la tablette {chat_id}'),
+            (handlers.identifiant, f'agent_{chat_id}'),
+            (handlers.priority, 'Urgent' if number % 3 == 0 else 'Moyen'),
+            (handlers.confirm, 'oui'),
+        ]
+        for number, chat_id in enumerate(chats)
+    }
+
+    async def scenario():
+        # Every chat answers the same step at the same time, then moves on together
+        for step in range(len(answers[chats[0]])):
+            await asyncio.gather(*(
+                answers[chat_id][step][0](FakeUpdate(bot, chat_id, answers[chat_id][step][1]), context)
+                for chat_id in chats
+            ))
+        while await flush_outbox():
+            pass
+
+    run(scenario())
+    assert len(handlers.drafts) == 0
+    rows = {row[HEADERS.index('chat_id')]: dict(zip(HEADERS, row)) for row in worksheet.get_all_values()[1:]}
+    for number, chat_id in enumerate(chats):
+        ticket = rows[str(chat_id)]
+        assert ticket['category'] == CATEGORIES[number % len(CATEGORIES)]
+        assert ticket['description'] == f'Panne numéro {number} sur la tablette {chat_id}'
+        assert ticket['identifiant'] == f'agent_{chat_id}'
+        assert ticket['priority'] == ('Urgent' if number % 3 == 0 else 'Moyen')
@@ -0,0 +1,90 @@
+import email
+import socket
+import smtplib
+import pytest
+from aiosmtpd.controller import Controller
+from tests.conftest import run
+
+ADMINS = ['admin1@example.org', 'admin2@example.org']
+
+class Inbox:
+    """aiosmtpd handler keeping every message it receives."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        message = email.message_from_bytes(envelope.content)
+        self.messages.append((envelope.rcpt_tos, message))
+        return '250 OK'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    inbox = Inbox()
+    controller = Controller(inbox, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield controller, inbox
+    controller.stop()
+
+def ticket(number, priority='Moyen'):
+    return {
+        'ticket_id': f'T241017-{number:04d}', 'category': 'Problèmes de Synchronisation & Connectivité',
+        'description': f'Synchronisation bloquée {number}', 'identifiant': f'agent_{number}',
+        'priority': priority, 'chat_id': str(800000 + number),
+    }
+
+def dispatcher_for(controller, window=0.3):
+    from src.utils.email import EmailDispatcher, SMTPConnection
+    # The local server offers no STARTTLS and no credentials are sent
+    connection = SMTPConnection(controller.hostname, controller.port, user=None, password=None, require_tls=False)
+    return EmailDispatcher(connection, window=window)
+
+def test_burst_is_merged_and_urgent_sent_at_once(smtp_server):
+    controller, inbox = smtp_server
+    dispatcher = dispatcher_for(controller)
+
+    async def scenario():
+        for number in range(3):
+            assert dispatcher.enqueue(ADMINS, ticket(number))
+        assert dispatcher.enqueue(ADMINS, ticket(3, 'Urgent'))
+        await dispatcher.close()
+
+    run(scenario())
+    subjects = [message['Subject'] for _, message in inbox.messages]
+    assert subjects == ['Nouveau Ticket: T241017-0003', '3 Nouveaux Tickets: T241017-0000, T241017-0001, T241017-0002']
+    for recipients, _ in inbox.messages:
+        assert recipients == ADMINS
+    digest = inbox.messages[1][1].get_payload(decode=True).decode()
+    assert 'Synchronisation bloquée 2' in digest
+    stats = dispatcher.stats()
+    assert (stats['emails_sent'], stats['digests_sent'], stats['failures'], stats['connects']) == (2, 1, 0, 1)
+
+def test_close_sends_what_is_queued_and_refuses_more(smtp_server):
+    controller, inbox = smtp_server
+    dispatcher = dispatcher_for(controller, window=60)
+
+    async def scenario():
+        assert dispatcher.enqueue(ADMINS, ticket(10))
+        assert dispatcher.enqueue(ADMINS, ticket(11))
+        # Well within the digest window: the burst is flushed by close, not by the timer
+        await dispatcher.close(timeout=5)
+        return dispatcher.enqueue(ADMINS, ticket(12))
+
+    assert run(scenario()) is False
+    assert [message['Subject'] for _, message in inbox.messages] == ['2 Nouveaux Tickets: T241017-0010, T241017-0011']
+    assert dispatcher.pending() == 0
+
+def test_credentials_are_not_sent_without_starttls(smtp_server):
+    from email.mime.text import MIMEText
+    from src.utils.email import SMTPConnection
+
+    controller, inbox = smtp_server
+    connection = SMTPConnection(controller.hostname, controller.port, user='bot@example.org', password='secret')
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        connection.send(MIMEText('Bonjour'))
+    assert inbox.messages == []
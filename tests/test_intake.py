@@ -0,0 +1,62 @@
+import functools
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from benchmarks.fakes import FakeBot
+from tests.conftest import run, wait_for
+
+TOKEN = 'intake-token'
+AUTH = {'Authorization': f'Bearer {TOKEN}'}
+CHAT_ID = 910001
+
+@pytest.fixture
+def tickets(worksheet):
+    from src.utils.ticket_index import ticket_index
+
+    worksheet.append_rows([
+        ['T241017-0101', '2024-10-17 08:00:00', str(CHAT_ID), 'Problèmes de Rapports & Tableaux de Bord',
+         'Le tableau de bord reste vide', 'agent_101', 'Moyen', 'En cours'],
+        ['T241017-0102', '2024-10-17 08:05:00', str(CHAT_ID + 1), "Problèmes d'Utilisateur & d'Accès",
+         'Mot de passe refusé', 'agent_102', 'Urgent', 'En cours'],
+    ])
+    ticket_index.load(worksheet.get_all_values())
+    return worksheet
+
+def test_intake_notifies_resolved_tickets_at_once(tickets):
+    from src.bot import apply_status_change
+    from src.utils.intake import StatusIntake
+
+    bot = FakeBot()
+    intake = StatusIntake(functools.partial(apply_status_change, bot), token=TOKEN)
+    app = web.Application()
+    intake.add_routes(app)
+
+    async def post(client, body, headers=AUTH):
+        async with client.post(intake.path, json=body, headers=headers) as response:
+            return response.status, (await response.json() if response.status != 401 else None)
+
+    async def scenario():
+        async with TestClient(TestServer(app)) as client:
+            responses = [
+                await post(client, {'ticket_id': 'T241017-0101', 'status': 'Résolu'}, headers={}),
+                await post(client, {'ticket_id': 'T241017-0101'}),
+                await post(client, [
+                    {'ticket_id': 'T241017-0101', 'status': 'Résolu'},
+                    {'ticket_id': 't241017-0102', 'status': 'En cours de traitement'},
+                    {'ticket_id': 'T241017-9999', 'status': 'Résolu'},
+                ]),
+            ]
+            await wait_for(lambda: tickets.statuses()['T241017-0101'] == 'En Attente de Confirmation')
+            responses.append(await post(client, {'ticket_id': 'T241017-0101', 'status': 'Résolu'}))
+        return responses
+
+    unauthorized, invalid, applied, repeated = run(scenario())
+    assert unauthorized == (401, None)
+    assert invalid[0] == 400 and 'status' in invalid[1]['error']
+    assert applied == (200, {'results': {
+        'T241017-0101': 'notified', 'T241017-0102': 'recorded', 'T241017-9999': 'unknown_ticket'
+    }})
+    assert repeated == (200, {'results': {'T241017-0101': 'already_notified'}})
+    assert len(bot.messages[str(CHAT_ID)]) == 1
+    assert str(CHAT_ID + 1) not in bot.messages
+    assert intake.stats() == {'enabled': True, 'received': 4, 'rejected': 2}
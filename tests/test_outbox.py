@@ -0,0 +1,55 @@
+import pytest
+from tests.conftest import run
+
+def _ticket(number):
+    return {
+        'ticket_id': f'T241017-03{number:02d}', 'timestamp': '2024-10-17 10:00:00', 'chat_id': str(930000 + number),
+        'category': 'Problèmes de Synchronisation & Connectivité', 'description': 'La synchronisation échoue',
+        'identifiant': f'agent_3{number:02d}', 'priority': 'Moyen',
+    }
+
+@pytest.fixture
+def outbox(worksheet):
+    from src.utils.outbox import get_outbox
+    from src.utils.sheets import flush_outbox
+
+    outbox = get_outbox()
+    run(flush_outbox())  # Whatever earlier tests left behind
+    assert len(outbox) == 0
+    return outbox
+
+def _flush_retry(outbox):
+    """Flush again without waiting for the retry backoff of the failed append."""
+    from src.utils.sheets import flush_outbox
+
+    with outbox._lock:
+        outbox._conn.execute("UPDATE outbox SET next_attempt_at = 0")
+        outbox._conn.commit()
+    return run(flush_outbox())
+
+@pytest.mark.parametrize('landed', [True, False])
+def test_failed_append_is_retried_at_most_once(worksheet, outbox, monkeypatch, landed):
+    from src.utils.sheets import flush_outbox, ticket_row
+    from src.utils.ticket_index import ticket_index
+
+    tickets = [_ticket(number) for number in (1, 2)]
+    for ticket in tickets:
+        outbox.put(ticket['ticket_id'], ticket_row(ticket))
+
+    append_rows = worksheet.append_rows
+
+    def failing_append(values, **kwargs):
+        if landed:
+            append_rows(values, **kwargs)  # The response is what got lost
+        raise ConnectionError('read timed out')
+
+    monkeypatch.setattr(worksheet, 'append_rows', failing_append)
+    assert run(flush_outbox()) == 0
+    assert len(outbox) == 2  # Not known to be sent
+
+    monkeypatch.undo()
+    assert _flush_retry(outbox) == (0 if landed else 2)
+    ticket_ids = [row[0] for row in worksheet.get_all_values()[1:]]
+    assert ticket_ids == [ticket['ticket_id'] for ticket in tickets]
+    assert len(outbox) == 0
+    assert [ticket_index.row_of(ticket_id) for ticket_id in ticket_ids] == [2, 3]
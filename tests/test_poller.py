@@ -0,0 +1,65 @@
+import gspread
+import pytest
+from tests.conftest import run, api_error
+
+def _failing(worksheet, monkeypatch, error):
+    """Make the Drive modified-time call raise, and count how often it is made."""
+    calls = []
+
+    def get_lastUpdateTime():
+        calls.append(1)
+        raise error
+
+    monkeypatch.setattr(worksheet.spreadsheet, 'get_lastUpdateTime', get_lastUpdateTime)
+    return calls
+
+def _poller():
+    from src.utils.poller import ResolvedTicketPoller
+    from src.utils.ticket_index import TicketIndex
+
+    return ResolvedTicketPoller(index=TicketIndex())
+
+def test_transient_modified_time_error_reads_the_columns_and_retries_later(worksheet, monkeypatch):
+    calls = _failing(worksheet, monkeypatch, ConnectionError('reset by peer'))
+    poller = _poller()
+
+    run(poller.poll())
+    assert calls == [1]
+    assert poller.full_reads == 1  # The columns were read instead
+    assert poller.use_modified_time
+
+    # Within the cooldown the check is not attempted again
+    run(poller.poll())
+    assert calls == [1]
+
+    # After the cooldown it is, and a success resets the failure count
+    monkeypatch.undo()
+    poller._modified_time_retry_at = 0
+    run(poller.poll())
+    assert poller.use_modified_time
+    assert poller.modified_time_failures == 0
+
+def test_repeated_modified_time_errors_disable_the_check(worksheet, monkeypatch):
+    from src.utils.poller import MODIFIED_TIME_MAX_FAILURES
+
+    _failing(worksheet, monkeypatch, ConnectionError('reset by peer'))
+    poller = _poller()
+    for _ in range(MODIFIED_TIME_MAX_FAILURES):
+        poller._modified_time_retry_at = 0
+        run(poller.poll())
+    assert not poller.use_modified_time
+
+@pytest.mark.parametrize('status_code', [403, 404])
+def test_permanent_modified_time_error_disables_the_check(worksheet, monkeypatch, status_code):
+    _failing(worksheet, monkeypatch, api_error(status_code, 'PERMISSION_DENIED', 'forbidden'))
+    poller = _poller()
+    run(poller.poll())
+    assert not poller.use_modified_time
+
+def test_quota_error_propagates(worksheet, monkeypatch):
+    _failing(worksheet, monkeypatch, api_error(429, 'RESOURCE_EXHAUSTED', 'rateLimitExceeded'))
+    poller = _poller()
+    with pytest.raises(gspread.exceptions.APIError):
+        run(poller.poll())
+    assert poller.use_modified_time
+    assert poller.modified_time_failures == 0
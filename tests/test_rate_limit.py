@@ -0,0 +1,18 @@
+from tests.conftest import run
+
+def test_workers_share_one_budget_through_leases(tmp_path):
+    from src.utils.sheets import SharedTokenBucket
+
+    path = str(tmp_path / 'state.sqlite3')
+    # Two worker processes' buckets; the refill is too slow to matter during the test
+    workers = [SharedTokenBucket(rate_per_minute=6, capacity=20, path=path, lease=5) for _ in range(2)]
+
+    async def take(attempts, workers=workers):
+        return [await workers[attempt % len(workers)]._take(1) == 0 for attempt in range(attempts)]
+
+    # One call and its lease in a single transaction, the next five calls from the lease
+    assert all(run(take(6, workers[:1])))
+    assert workers[0].transactions == 1
+
+    # Leases come out of the one budget, and unspent ones go back to it
+    assert sum(run(take(30))) == 14
@@ -0,0 +1,61 @@
+import pytest
+from benchmarks.fakes import FakeBot, FakeContext
+from tests.conftest import run, wait_for
+
+CHAT_ID = 920001
+TICKET_ID = 'T241017-0201'
+
+@pytest.fixture
+def resolved_ticket(worksheet, monkeypatch):
+    from src.utils import poller
+    from src.utils.ticket_index import ticket_index
+
+    worksheet.append_rows([
+        [TICKET_ID, '2024-10-17 09:00:00', str(CHAT_ID), 'Problèmes de Rapports & Tableaux de Bord',
+         'Les exports restent bloqués', 'agent_201', 'Moyen', 'Résolu'],
+    ])
+    ticket_index.load(worksheet.get_all_values())
+    # A cursor left by another test's sheet could make the poll skip this one
+    monkeypatch.setattr(poller, 'resolved_poller', poller.ResolvedTicketPoller())
+    return worksheet
+
+def _awaiting(ticket_id):
+    """Whether the 'En Attente de Confirmation' write of the ticket's current round was recorded."""
+    from src.utils.resolution_rounds import get_resolution_rounds
+
+    rounds = get_resolution_rounds()
+    with rounds._lock:
+        row = rounds._conn.execute(
+            "SELECT awaiting_since FROM resolution_rounds WHERE ticket_id = ?", (ticket_id,)
+        ).fetchone()
+    return row is not None and row[0] is not None
+
+def test_ticket_reopened_by_hand_is_notified_again(resolved_ticket):
+    from src.bot import check_resolved_tickets, resolution_key
+    from src.utils.notifier import TelegramDispatcher
+
+    sweep = check_resolved_tickets.__wrapped__  # Past the leader check
+    bot = FakeBot()
+    context = FakeContext(bot)
+
+    async def resolve_and_confirm():
+        await sweep(context)
+        await wait_for(lambda: _awaiting(TICKET_ID))
+
+    run(resolve_and_confirm())
+    assert resolved_ticket.statuses()[TICKET_ID] == 'En Attente de Confirmation'
+    assert len(bot.messages[str(CHAT_ID)]) == 1
+    # Delivered keys outlive the process that sent them
+    assert TelegramDispatcher().delivered(resolution_key(TICKET_ID))
+
+    # Nothing new to tell while the user is asked to confirm
+    run(sweep(context))
+    assert len(bot.messages[str(CHAT_ID)]) == 1
+
+    # An admin reopens the ticket in the sheet, then resolves it again
+    resolved_ticket.set_status([TICKET_ID], 'En cours')
+    resolved_ticket.set_status([TICKET_ID], 'Résolu')
+    run(resolve_and_confirm())
+    assert resolved_ticket.statuses()[TICKET_ID] == 'En Attente de Confirmation'
+    assert len(bot.messages[str(CHAT_ID)]) == 2
+    assert TelegramDispatcher().delivered(resolution_key(TICKET_ID, 1))
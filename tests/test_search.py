@@ -0,0 +1,69 @@
+from benchmarks.fakes import FakeBot, FakeContext, FakeUpdate
+from tests.conftest import run
+
+ADMIN_ID = 940001
+CATEGORY = 'Problèmes de Synchronisation & Connectivité'
+
+def _ticket(ticket_id, chat_id, description, status='En cours'):
+    return {
+        'ticket_id': ticket_id, 'timestamp': '2024-10-17 11:00:00', 'chat_id': str(chat_id), 'category': CATEGORY,
+        'description': description, 'identifiant': f'agent_{ticket_id[-3:]}', 'priority': 'Moyen', 'status': status,
+    }
+
+def _row(ticket):
+    return [ticket[name] for name in ('ticket_id', 'timestamp', 'chat_id', 'category', 'description',
+                                      'identifiant', 'priority', 'status')]
+
+def test_search_labels_queued_and_archived_tickets(worksheet, monkeypatch):
+    from src import bot
+    from src.utils.outbox import get_outbox
+    from src.utils.search import SearchIndex
+    from src.utils.ticket_index import ticket_index
+
+    indexed = _ticket('T241017-0401', 940101, 'Pompe solaire en panne')
+    queued = _ticket('T241017-0402', 940102, 'Pompe à main en panne', status='Ouvert')
+    archived = _ticket('T241017-0403', 940103, 'Pompe du forage en panne', status='Résolu Confirmé')
+    worksheet.append_rows([_row(indexed)])
+    ticket_index.load(worksheet.get_all_values())
+    get_outbox().put(queued['ticket_id'], _row(queued))  # Not flushed yet, nor indexed
+
+    search_index = SearchIndex()
+    search_index.load([indexed, queued, archived])
+    monkeypatch.setattr(bot, 'search_index', search_index)
+    monkeypatch.setattr(bot, 'ADMIN_TELEGRAM_IDS', {ADMIN_ID})
+
+    telegram = FakeBot()
+    run(bot.search_tickets(FakeUpdate(telegram, ADMIN_ID, '/search pompe'), FakeContext(telegram, ['pompe'])))
+    (reply,) = telegram.messages[str(ADMIN_ID)]
+    assert f'T241017-0401 · {CATEGORY} · En cours' in reply
+    assert f'T241017-0402 · {CATEGORY} · En Attente' in reply
+    assert f'T241017-0403 · {CATEGORY} · Archivé' in reply
+
+def test_duplicate_offer_hides_the_other_reporters_description(worksheet, monkeypatch):
+    from src import bot
+    from src.utils.duplicates import DuplicateIndex
+    from src.utils.ticket_index import ticket_index
+
+    other = _ticket('T241017-0411', 940111, 'Impossible de synchroniser les formulaires de la tablette chez Mme Diallo')
+    worksheet.append_rows([_row(other)])
+    ticket_index.load(worksheet.get_all_values())
+    duplicate_index = DuplicateIndex()
+    duplicate_index.load([other])
+    monkeypatch.setattr(bot, 'duplicate_index', duplicate_index)
+
+    telegram = FakeBot()
+    context = FakeContext(telegram)
+    handlers = bot.TicketBot()
+    chat_id = 940112
+
+    async def report():
+        await handlers.start(FakeUpdate(telegram, chat_id, '/start'), context)
+        await handlers.category(FakeUpdate(telegram, chat_id, CATEGORY), context)
+        return await handlers.description(
+            FakeUpdate(telegram, chat_id, 'Impossible de synchroniser les formulaires de la tablette'), context
+        )
+
+    assert run(report()) == bot.TicketBot.DUPLICATE
+    offer = telegram.messages[str(chat_id)][-1]
+    assert 'T241017\\-0411' in offer and 'Synchronisation' in offer and 'En cours' in offer
+    assert 'Diallo' not in offer
@@ -0,0 +1,51 @@
+import time
+import asyncio
+from benchmarks.fakes import FakeBot, FakeContext, FakeUpdate
+from tests.conftest import run, api_error
+
+SHEETS_LATENCY = 0.5
+
+def test_slow_sheets_do_not_delay_start(worksheet):
+    from src.bot import TicketBot, CATEGORY, check_status
+    from src.utils.ticket_index import ticket_index
+
+    worksheet.append_rows([['T240901-0001', '2024-09-01 08:00:00', '1', 'Problèmes de Rapports & Tableaux de Bord',
+                            'Rapport vide', 'agent_1', 'Moyen', 'En cours']])
+    # Indexed long ago, so /status has to read the row again
+    ticket_index.load(worksheet.get_all_values(), now=0)
+    worksheet.latency = SHEETS_LATENCY
+    bot = FakeBot()
+    context = FakeContext(bot)
+
+    async def scenario():
+        # One user waits on the sheet while another starts a ticket
+        status = asyncio.ensure_future(check_status(FakeUpdate(bot, 1, '/status T240901-0001'), context))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        state = await TicketBot().start(FakeUpdate(bot, 2, '/start'), context)
+        elapsed = time.perf_counter() - start
+        assert not status.done()
+        await status
+        return state, elapsed
+
+    state, elapsed = run(scenario())
+    assert state == CATEGORY
+    assert elapsed < SHEETS_LATENCY / 2
+    assert 'Bienvenue' in bot.messages['2'][-1]
+    assert 'Rapport vide' in bot.messages['1'][-1]
+
+def test_rate_limit_403_backs_off_without_resetting_the_session():
+    from src.utils.sheets import is_quota_error, _is_session_error
+
+    rate_limits = [
+        api_error(429, 'RESOURCE_EXHAUSTED'),
+        api_error(403, 'PERMISSION_DENIED', 'rateLimitExceeded'),
+        api_error(403, 'PERMISSION_DENIED', 'userRateLimitExceeded'),
+        api_error(403, None, None, 'Quota exceeded for quota metric Read requests'),
+    ]
+    for error in rate_limits:
+        assert is_quota_error(error) and not _is_session_error(error)
+
+    for error in (api_error(401, 'UNAUTHENTICATED'), api_error(403, 'PERMISSION_DENIED', 'forbidden'), api_error(404, 'NOT_FOUND')):
+        assert _is_session_error(error) and not is_quota_error(error)
+    assert not _is_session_error(api_error(500, 'INTERNAL')) and not is_quota_error(api_error(500, 'INTERNAL'))
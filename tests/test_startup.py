@@ -0,0 +1,23 @@
+import pytest
+from benchmarks.startup_bench import DEFERRED, import_time, loaded_deferred
+
+# Milliseconds, several times what the entry modules take on a slow CI runner:
+# they catch a heavy client imported at startup again, not small drifts
+IMPORT_BUDGETS_MS = {
+    'run': 150,  # Imports the bot only once the environment is checked
+    'src.config': 150,
+    'src.bot': 2000,  # Mostly python-telegram-bot itself
+}
+
+def test_importing_the_bot_defers_heavy_clients():
+    assert set(DEFERRED) >= {'gspread', 'googleapiclient', 'google.oauth2.service_account', 'aiohttp'}
+    assert loaded_deferred('src.bot') == []
+
+def test_check_sees_a_loaded_client():
+    assert loaded_deferred('src.bot, aiohttp') == ['aiohttp']
+
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS_MS))
+def test_entry_modules_import_within_budget(module):
+    # The fastest of a few fresh interpreters, the others pay for cold caches
+    best = min(import_time(module) for _ in range(3)) / 1000
+    assert 0 < best <= IMPORT_BUDGETS_MS[module], f"{module} imported in {best:.1f} ms"
@@ -0,0 +1,133 @@
+import time
+import asyncio
+import socket
+import pytest
+from aiohttp import web, ClientSession
+from tests.conftest import run
+
+TOKEN = '123456:TEST'
+CHAT_ID = 900001
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class FakeTelegram:
+    """Bot API server answering the methods the bot calls, recording each call."""
+
+    def __init__(self):
+        self.calls = []  # (method, params)
+        self._message_ids = 0
+
+    def _message(self, chat_id, **fields):
+        self._message_ids += 1
+        return {'message_id': self._message_ids, 'date': int(time.time()),
+                'chat': {'id': int(chat_id), 'type': 'private'}, **fields}
+
+    def _photo(self):
+        return [{'file_id': f'photo-{self._message_ids}', 'file_unique_id': f'u{self._message_ids}', 'width': 1, 'height': 1}]
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        if request.content_type == 'application/json':
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        self.calls.append((method, params))
+
+        if method == 'getMe':
+            result = {'id': 4242, 'is_bot': True, 'first_name': 'MILDA', 'username': 'milda_test_bot'}
+        elif method == 'sendMessage':
+            result = self._message(params['chat_id'], text=params['text'])
+        elif method == 'sendPhoto':
+            result = self._message(params['chat_id'], photo=self._photo())
+        elif method == 'sendMediaGroup':
+            result = [self._message(params['chat_id'], photo=self._photo()) for _ in range(2)]
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    def sent(self, method):
+        return [params for name, params in self.calls if name == method]
+
+def update(update_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()), 'text': text,
+            'chat': {'id': CHAT_ID, 'type': 'private'},
+            'from': {'id': CHAT_ID, 'is_bot': False, 'first_name': 'Agent', 'username': 'agent_test'},
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}] if text.startswith('/') else [],
+        },
+    }
+
+async def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        await asyncio.sleep(0.02)
+
+@pytest.fixture
+def telegram_api():
+    telegram = FakeTelegram()
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', telegram.handle)
+    runner = web.AppRunner(app)
+    port = free_port()
+
+    async def start():
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+    run(start())
+    yield telegram, f'http://127.0.0.1:{port}/bot'
+    run(runner.cleanup())
+
+def test_webhook_end_to_end(telegram_api):
+    from telegram.ext import Application
+    from src.bot import TicketBot, conversation_handler
+    from src.config import WEBHOOK_SECRET, WEBHOOK_PATH
+    from src.webhook import serve, SECRET_HEADER
+
+    telegram, base_url = telegram_api
+    application = Application.builder().token(TOKEN).base_url(base_url).build()
+    application.add_handler(conversation_handler(TicketBot()))
+    port = free_port()
+    endpoint = f'http://127.0.0.1:{port}{WEBHOOK_PATH}'
+
+    async def scenario():
+        stop_event = asyncio.Event()
+        server = asyncio.ensure_future(serve(
+            application, host='127.0.0.1', port=port, url='https://milda-bot.example.org', stop_event=stop_event
+        ))
+        await wait_for(lambda: telegram.sent('setWebhook'))
+        async with ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{port}/healthz') as response:
+                health = await response.json()
+            async with session.post(endpoint, json=update(1, '/start'), headers={SECRET_HEADER: 'wrong'}) as response:
+                rejected = response.status
+            async with session.post(endpoint, data='not json', headers={SECRET_HEADER: WEBHOOK_SECRET}) as response:
+                invalid = response.status
+            async with session.post(endpoint, json=update(2, '/start'), headers={SECRET_HEADER: WEBHOOK_SECRET}) as response:
+                accepted = response.status
+            await wait_for(lambda: telegram.sent('sendMessage'))
+            async with session.post(endpoint, json=update(3, 'Problèmes de Rapports & Tableaux de Bord'),
+                                    headers={SECRET_HEADER: WEBHOOK_SECRET}) as response:
+                assert response.status == 200
+            await wait_for(lambda: len(telegram.sent('sendMessage')) == 2)
+        stop_event.set()
+        await server
+        return health, rejected, invalid, accepted
+
+    health, rejected, invalid, accepted = run(scenario())
+    assert (health['status'], health['mode']) == ('ok', 'webhook')
+    assert (rejected, invalid, accepted) == (403, 400, 200)
+    webhook = telegram.sent('setWebhook')[0]
+    assert webhook['url'] == 'https://milda-bot.example.org' + WEBHOOK_PATH
+    assert webhook['secret_token'] == WEBHOOK_SECRET
+    welcome, next_question = telegram.sent('sendMessage')
+    assert str(welcome['chat_id']) == str(CHAT_ID) and 'Bienvenue' in welcome['text']
+    # The second update reached the same conversation, in its CATEGORY state
+    assert 'décrire votre problème' in next_question['text']
+    assert not application.running